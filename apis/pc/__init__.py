@@ -1,4 +1,4 @@
-from .base import BaseAPI
+from .base import BaseAPI, Page, aiter_pages
 from .feed import FeedAPI
 from .search import SearchAPI
 from .detail import DetailAPI
@@ -6,6 +6,8 @@ from .comment import CommentAPI
 
 __all__ = [
     "BaseAPI",
+    "Page",
+    "aiter_pages",
     "FeedAPI",
     "SearchAPI",
     "DetailAPI",
@@ -1,3 +1,91 @@
+import asyncio
+import time
+from typing import Any, AsyncIterator, Callable, Dict, Iterator, List, NamedTuple, Tuple
+
+import requests
+
+from xhs_utils import metrics, tracing
+from xhs_utils.error_handler import XHSError, parse_response
+
+
+class Page(NamedTuple):
+    """One page of a paginated endpoint.
+
+    ``cursor`` is the value to pass back to the matching ``iter_*`` method to
+    resume after this page, so it can be stored as a checkpoint.
+    """
+    items: List[Any]
+    cursor: Any
+    has_more: bool
+
+
+async def aiter_pages(pages: Iterator[Page]) -> AsyncIterator[Page]:
+    """Consume a blocking ``iter_*`` generator from asyncio without blocking the loop"""
+    sentinel = object()
+    while True:
+        page = await asyncio.to_thread(next, pages, sentinel)
+        if page is sentinel:
+            break
+        yield page
+
+
 class BaseAPI:
     def __init__(self) -> None:
         self.base_url = "https://edith.xiaohongshu.com"
+        # optional xhs_utils.hedge_util.HedgedRequester for note detail fetches
+        self.hedger = None
+        # optional xhs_utils.cache_util.ResponseCache shared by cacheable endpoints
+        self.response_cache = None
+        # optional xhs_utils.retry_util.RateLimiter shared by concurrent fetches
+        self.rate_limiter = None
+
+    def _throttle(self) -> None:
+        """Wait for the shared rate limiter, if any"""
+        if self.rate_limiter is not None:
+            self.rate_limiter.acquire()
+
+    def _request(self, method: str, api: str, url: str, **kwargs: Any) -> requests.Response:
+        """Send ``method`` to ``url`` and record its status, latency and size under ``api``"""
+        with tracing.span('request', method=method, endpoint=api) as span:
+            start = time.perf_counter()
+            try:
+                response = getattr(requests, method.lower())(url, **kwargs)
+            except Exception as e:
+                metrics.record_error(api, e)
+                raise
+            metrics.record_request(api, method, response, time.perf_counter() - start)
+            span.set_attribute('status', getattr(response, 'status_code', ''))
+            return response
+
+    def _parse(self, api: str, response: Any) -> Tuple[bool, str, Any]:
+        """``parse_response`` that counts the raised ``XHSError`` class under ``api``"""
+        with tracing.span('parse', endpoint=api):
+            try:
+                return parse_response(response)
+            except XHSError as e:
+                metrics.record_error(api, e)
+                raise
+
+    def _cached(self, endpoint: str, params: Dict[str, Any], func: Callable[[], Tuple[bool, str, Any]]) -> Tuple[bool, str, Any]:
+        """Serve ``func()`` through the response cache when one is configured"""
+        if self.response_cache is None:
+            return func()
+        return self.response_cache.fetch(endpoint, params, func)
+
+    @staticmethod
+    def _iter_cursor_pages(
+        fetch: Callable[[str], Tuple[bool, str, Any]],
+        items_key: str,
+        cursor: str = "",
+    ) -> Iterator[Page]:
+        """Yield pages of a cursor-paginated endpoint until it runs dry"""
+        while True:
+            success, msg, res_json = fetch(cursor)
+            if not success:
+                raise Exception(msg)
+            items = res_json["data"][items_key]
+            cursor = str(res_json["data"].get("cursor", ""))
+            has_more = bool(res_json["data"].get("has_more", False))
+            yield Page(items, cursor, has_more)
+            if len(items) == 0 or not has_more:
+                break
@@ -1,9 +1,11 @@
 from __future__ import annotations
-from typing import Tuple, List, Dict, Any
+from typing import Tuple, List, Dict, Any, Iterator
+from concurrent.futures import ThreadPoolExecutor
 import urllib
-import requests
+from xhs_utils import tracing
+from xhs_utils.error_handler import decode_json
 from xhs_utils.xhs_util import splice_str, generate_request_params
-from .base import BaseAPI
+from .base import BaseAPI, Page
 
 
 class CommentAPI(BaseAPI):
@@ -28,13 +30,29 @@ class CommentAPI(BaseAPI):
             }
             splice_api = splice_str(api, params)
             headers, cookies, _ = generate_request_params(cookies_str, splice_api)
-            response = requests.get(self.base_url + splice_api, headers=headers, cookies=cookies, proxies=proxies)
-            res_json = response.json()
+            self._throttle()
+            response = self._request("GET", api, self.base_url + splice_api, headers=headers, cookies=cookies, proxies=proxies)
+            res_json = decode_json(response)
             success, msg = res_json["success"], res_json["msg"]
         except Exception as e:
             success, msg = False, str(e)
         return success, msg, res_json
 
+    def iter_note_out_comments(
+        self,
+        note_id: str,
+        xsec_token: str,
+        cookies_str: str,
+        proxies: Dict[str, str] | None = None,
+        cursor: str = "",
+    ) -> Iterator[Page]:
+        """Yield first level comments page by page"""
+        return self._iter_cursor_pages(
+            lambda c: self.get_note_out_comment(note_id, c, xsec_token, cookies_str, proxies),
+            "comments",
+            cursor,
+        )
+
     def get_note_all_out_comment(
         self,
         note_id: str,
@@ -43,18 +61,11 @@ class CommentAPI(BaseAPI):
         proxies: Dict[str, str] | None = None,
     ) -> Tuple[bool, str, List[Any]]:
         """Fetch all first level comments"""
-        cursor = ""
         comment_list: List[Any] = []
         try:
-            while True:
-                success, msg, res_json = self.get_note_out_comment(note_id, cursor, xsec_token, cookies_str, proxies)
-                if not success:
-                    raise Exception(msg)
-                comments = res_json["data"]["comments"]
-                cursor = str(res_json["data"].get("cursor", ""))
-                comment_list.extend(comments)
-                if len(comment_list) == 0 or not res_json["data"].get("has_more", False):
-                    break
+            for page in self.iter_note_out_comments(note_id, xsec_token, cookies_str, proxies):
+                comment_list.extend(page.items)
+            success, msg = True, "success"
         except Exception as e:
             success, msg = False, str(e)
         return success, msg, comment_list
@@ -82,13 +93,31 @@ class CommentAPI(BaseAPI):
             }
             splice_api = splice_str(api, params)
             headers, cookies, _ = generate_request_params(cookies_str, splice_api)
-            response = requests.get(self.base_url + splice_api, headers=headers, cookies=cookies, proxies=proxies)
-            res_json = response.json()
+            self._throttle()
+            response = self._request("GET", api, self.base_url + splice_api, headers=headers, cookies=cookies, proxies=proxies)
+            res_json = decode_json(response)
             success, msg = res_json["success"], res_json["msg"]
         except Exception as e:
             success, msg = False, str(e)
         return success, msg, res_json
 
+    def iter_note_inner_comments(
+        self,
+        comment: Dict[str, Any],
+        xsec_token: str,
+        cookies_str: str,
+        proxies: Dict[str, str] | None = None,
+        cursor: str | None = None,
+    ) -> Iterator[Page]:
+        """Yield the remaining second level comments of a comment page by page"""
+        if cursor is None:
+            cursor = comment["sub_comment_cursor"]
+        return self._iter_cursor_pages(
+            lambda c: self.get_note_inner_comment(comment, c, xsec_token, cookies_str, proxies),
+            "comments",
+            cursor,
+        )
+
     def get_note_all_inner_comment(
         self,
         comment: Dict[str, Any],
@@ -100,25 +129,29 @@ class CommentAPI(BaseAPI):
         try:
             if not comment.get("sub_comment_has_more"):
                 return True, "success", comment
-            cursor = comment["sub_comment_cursor"]
             inner_comment_list: List[Any] = []
-            while True:
-                success, msg, res_json = self.get_note_inner_comment(comment, cursor, xsec_token, cookies_str, proxies)
-                if not success:
-                    raise Exception(msg)
-                comments = res_json["data"]["comments"]
-                cursor = str(res_json["data"].get("cursor", ""))
-                inner_comment_list.extend(comments)
-                if not res_json["data"].get("has_more", False):
-                    break
+            for page in self.iter_note_inner_comments(comment, xsec_token, cookies_str, proxies):
+                inner_comment_list.extend(page.items)
             comment["sub_comments"].extend(inner_comment_list)
             success, msg = True, "success"
         except Exception as e:
             success, msg = False, str(e)
         return success, msg, comment
 
-    def get_note_all_comment(self, url: str, cookies_str: str, proxies: Dict[str, str] | None = None) -> Tuple[bool, str, List[Any]]:
-        """Fetch all comments for a note"""
+    def get_note_all_comment(
+        self,
+        url: str,
+        cookies_str: str,
+        proxies: Dict[str, str] | None = None,
+        max_workers: int = 1,
+    ) -> Tuple[bool, str, List[Any]]:
+        """Fetch all comments for a note
+
+        With ``max_workers > 1`` sub-comment threads are expanded concurrently,
+        starting as soon as each page of root comments arrives.
+        """
+        if max_workers > 1:
+            return self._get_note_all_comment_concurrent(url, cookies_str, proxies, max_workers)
         out_comment_list: List[Any] = []
         try:
             url_parse = urllib.parse.urlparse(url)
@@ -135,14 +168,46 @@ class CommentAPI(BaseAPI):
             success, msg = False, str(e)
         return success, msg, out_comment_list
 
+    def _get_note_all_comment_concurrent(
+        self,
+        url: str,
+        cookies_str: str,
+        proxies: Dict[str, str] | None,
+        max_workers: int,
+    ) -> Tuple[bool, str, List[Any]]:
+        """Page root comments while a pool expands their sub-comments"""
+        out_comment_list: List[Any] = []
+        futures = []
+        with ThreadPoolExecutor(max_workers=max_workers) as executor:
+            try:
+                url_parse = urllib.parse.urlparse(url)
+                note_id = url_parse.path.split("/")[-1]
+                kv_dist = {kv.split("=")[0]: kv.split("=")[1] for kv in url_parse.query.split("&")}
+                xsec_token = kv_dist["xsec_token"]
+                for page in self.iter_note_out_comments(note_id, xsec_token, cookies_str, proxies):
+                    out_comment_list.extend(page.items)
+                    for comment in page.items:
+                        if comment.get("sub_comment_has_more"):
+                            futures.append(executor.submit(tracing.propagate(self.get_note_all_inner_comment), comment, xsec_token, cookies_str, proxies))
+                for future in futures:
+                    success, msg, _ = future.result()
+                    if not success:
+                        raise Exception(msg)
+                success, msg = True, "success"
+            except Exception as e:
+                for future in futures:
+                    future.cancel()
+                success, msg = False, str(e)
+        return success, msg, out_comment_list
+
     def get_unread_message(self, cookies_str: str, proxies: Dict[str, str] | None = None) -> Tuple[bool, str, Any]:
         """Fetch unread message count"""
         res_json = None
         try:
             api = "/api/sns/web/unread_count"
             headers, cookies, _ = generate_request_params(cookies_str, api)
-            response = requests.get(self.base_url + api, headers=headers, cookies=cookies, proxies=proxies)
-            res_json = response.json()
+            response = self._request("GET", api, self.base_url + api, headers=headers, cookies=cookies, proxies=proxies)
+            res_json = decode_json(response)
             success, msg = res_json["success"], res_json["msg"]
         except Exception as e:
             success, msg = False, str(e)
@@ -156,27 +221,24 @@ class CommentAPI(BaseAPI):
             params = {"num": "20", "cursor": cursor}
             splice_api = splice_str(api, params)
             headers, cookies, _ = generate_request_params(cookies_str, splice_api)
-            response = requests.get(self.base_url + splice_api, headers=headers, cookies=cookies, proxies=proxies)
-            res_json = response.json()
+            response = self._request("GET", api, self.base_url + splice_api, headers=headers, cookies=cookies, proxies=proxies)
+            res_json = decode_json(response)
             success, msg = res_json["success"], res_json["msg"]
         except Exception as e:
             success, msg = False, str(e)
         return success, msg, res_json
 
+    def iter_metions(self, cookies_str: str, proxies: Dict[str, str] | None = None, cursor: str = "") -> Iterator[Page]:
+        """Yield mentions page by page"""
+        return self._iter_cursor_pages(lambda c: self.get_metions(c, cookies_str, proxies), "message_list", cursor)
+
     def get_all_metions(self, cookies_str: str, proxies: Dict[str, str] | None = None) -> Tuple[bool, str, List[Any]]:
         """Fetch all mentions"""
-        cursor = ""
         metion_list: List[Any] = []
         try:
-            while True:
-                success, msg, res_json = self.get_metions(cursor, cookies_str, proxies)
-                if not success:
-                    raise Exception(msg)
-                metions = res_json["data"]["message_list"]
-                cursor = str(res_json["data"].get("cursor", ""))
-                metion_list.extend(metions)
-                if not res_json["data"].get("has_more", False):
-                    break
+            for page in self.iter_metions(cookies_str, proxies):
+                metion_list.extend(page.items)
+            success, msg = True, "success"
         except Exception as e:
             success, msg = False, str(e)
         return success, msg, metion_list
@@ -189,27 +251,24 @@ class CommentAPI(BaseAPI):
             params = {"num": "20", "cursor": cursor}
             splice_api = splice_str(api, params)
             headers, cookies, _ = generate_request_params(cookies_str, splice_api)
-            response = requests.get(self.base_url + splice_api, headers=headers, cookies=cookies, proxies=proxies)
-            res_json = response.json()
+            response = self._request("GET", api, self.base_url + splice_api, headers=headers, cookies=cookies, proxies=proxies)
+            res_json = decode_json(response)
             success, msg = res_json["success"], res_json["msg"]
         except Exception as e:
             success, msg = False, str(e)
         return success, msg, res_json
 
+    def iter_likesAndcollects(self, cookies_str: str, proxies: Dict[str, str] | None = None, cursor: str = "") -> Iterator[Page]:
+        """Yield likes and collects page by page"""
+        return self._iter_cursor_pages(lambda c: self.get_likesAndcollects(c, cookies_str, proxies), "message_list", cursor)
+
     def get_all_likesAndcollects(self, cookies_str: str, proxies: Dict[str, str] | None = None) -> Tuple[bool, str, List[Any]]:
         """Fetch all likes and collects"""
-        cursor = ""
         lc_list: List[Any] = []
         try:
-            while True:
-                success, msg, res_json = self.get_likesAndcollects(cursor, cookies_str, proxies)
-                if not success:
-                    raise Exception(msg)
-                lcs = res_json["data"]["message_list"]
-                cursor = str(res_json["data"].get("cursor", ""))
-                lc_list.extend(lcs)
-                if not res_json["data"].get("has_more", False):
-                    break
+            for page in self.iter_likesAndcollects(cookies_str, proxies):
+                lc_list.extend(page.items)
+            success, msg = True, "success"
         except Exception as e:
             success, msg = False, str(e)
         return success, msg, lc_list
@@ -222,27 +281,24 @@ class CommentAPI(BaseAPI):
             params = {"num": "20", "cursor": cursor}
             splice_api = splice_str(api, params)
             headers, cookies, _ = generate_request_params(cookies_str, splice_api)
-            response = requests.get(self.base_url + splice_api, headers=headers, cookies=cookies, proxies=proxies)
-            res_json = response.json()
+            response = self._request("GET", api, self.base_url + splice_api, headers=headers, cookies=cookies, proxies=proxies)
+            res_json = decode_json(response)
             success, msg = res_json["success"], res_json["msg"]
         except Exception as e:
             success, msg = False, str(e)
         return success, msg, res_json
 
+    def iter_new_connections(self, cookies_str: str, proxies: Dict[str, str] | None = None, cursor: str = "") -> Iterator[Page]:
+        """Yield new connections page by page"""
+        return self._iter_cursor_pages(lambda c: self.get_new_connections(c, cookies_str, proxies), "message_list", cursor)
+
     def get_all_new_connections(self, cookies_str: str, proxies: Dict[str, str] | None = None) -> Tuple[bool, str, List[Any]]:
         """Fetch all new connections"""
-        cursor = ""
         connection_list: List[Any] = []
         try:
-            while True:
-                success, msg, res_json = self.get_new_connections(cursor, cookies_str, proxies)
-                if not success:
-                    raise Exception(msg)
-                cons = res_json["data"]["message_list"]
-                cursor = str(res_json["data"].get("cursor", ""))
-                connection_list.extend(cons)
-                if not res_json["data"].get("has_more", False):
-                    break
+            for page in self.iter_new_connections(cookies_str, proxies):
+                connection_list.extend(page.items)
+            success, msg = True, "success"
         except Exception as e:
             success, msg = False, str(e)
         return success, msg, connection_list
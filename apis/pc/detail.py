@@ -1,25 +1,40 @@
 from __future__ import annotations
-from typing import Tuple, List, Dict, Any
+from typing import Tuple, List, Dict, Any, Iterator
 import urllib
 import re
-import requests
 from loguru import logger
 from xhs_utils.xhs_util import splice_str, generate_request_params, get_common_headers
-from xhs_utils.error_handler import parse_response, log_request_details, XHSError
-from .base import BaseAPI
+from xhs_utils.error_handler import decode_json, log_request_details, XHSError
+from .base import BaseAPI, Page
+
+
+def _parse_user_url(user_url: str, default_source: str) -> Tuple[str, str, str]:
+    """Split a profile url into user_id, xsec_token and xsec_source"""
+    url_parse = urllib.parse.urlparse(user_url)
+    user_id = url_parse.path.split("/")[-1]
+    kv_dist = {kv.split("=")[0]: kv.split("=")[1] for kv in url_parse.query.split("&")}
+    return user_id, kv_dist.get("xsec_token", ""), kv_dist.get("xsec_source", default_source)
 
 
 class DetailAPI(BaseAPI):
     def get_user_info(self, user_id: str, cookies_str: str, proxies: Dict[str, str] | None = None) -> Tuple[bool, str, Any]:
         """Get information for a user"""
+        return self._cached(
+            "/api/sns/web/v1/user/otherinfo",
+            {"target_user_id": user_id},
+            lambda: self._fetch_user_info(user_id, cookies_str, proxies),
+        )
+
+    def _fetch_user_info(self, user_id: str, cookies_str: str, proxies: Dict[str, str] | None = None) -> Tuple[bool, str, Any]:
+        """Request user information once"""
         res_json = None
         try:
             api = "/api/sns/web/v1/user/otherinfo"
             params = {"target_user_id": user_id}
             splice_api = splice_str(api, params)
             headers, cookies, _ = generate_request_params(cookies_str, splice_api)
-            response = requests.get(self.base_url + splice_api, headers=headers, cookies=cookies, proxies=proxies)
-            res_json = response.json()
+            response = self._request("GET", api, self.base_url + splice_api, headers=headers, cookies=cookies, proxies=proxies)
+            res_json = decode_json(response)
             success, msg = res_json["success"], res_json["msg"]
         except Exception as e:
             success, msg = False, str(e)
@@ -31,8 +46,8 @@ class DetailAPI(BaseAPI):
         try:
             api = "/api/sns/web/v1/user/selfinfo"
             headers, cookies, _ = generate_request_params(cookies_str, api)
-            response = requests.get(self.base_url + api, headers=headers, cookies=cookies, proxies=proxies)
-            res_json = response.json()
+            response = self._request("GET", api, self.base_url + api, headers=headers, cookies=cookies, proxies=proxies)
+            res_json = decode_json(response)
             success, msg = res_json["success"], res_json["msg"]
         except Exception as e:
             success, msg = False, str(e)
@@ -44,8 +59,8 @@ class DetailAPI(BaseAPI):
         try:
             api = "/api/sns/web/v2/user/me"
             headers, cookies, _ = generate_request_params(cookies_str, api)
-            response = requests.get(self.base_url + api, headers=headers, cookies=cookies, proxies=proxies)
-            res_json = response.json()
+            response = self._request("GET", api, self.base_url + api, headers=headers, cookies=cookies, proxies=proxies)
+            res_json = decode_json(response)
             success, msg = res_json["success"], res_json["msg"]
         except Exception as e:
             success, msg = False, str(e)
@@ -74,32 +89,35 @@ class DetailAPI(BaseAPI):
             }
             splice_api = splice_str(api, params)
             headers, cookies, _ = generate_request_params(cookies_str, splice_api)
-            response = requests.get(self.base_url + splice_api, headers=headers, cookies=cookies, proxies=proxies)
-            res_json = response.json()
+            response = self._request("GET", api, self.base_url + splice_api, headers=headers, cookies=cookies, proxies=proxies)
+            res_json = decode_json(response)
             success, msg = res_json["success"], res_json["msg"]
         except Exception as e:
             success, msg = False, str(e)
         return success, msg, res_json
 
+    def iter_user_notes(
+        self,
+        user_url: str,
+        cookies_str: str,
+        proxies: Dict[str, str] | None = None,
+        cursor: str = "",
+    ) -> Iterator[Page]:
+        """Yield a user's notes page by page"""
+        user_id, xsec_token, xsec_source = _parse_user_url(user_url, "pc_search")
+        return self._iter_cursor_pages(
+            lambda c: self.get_user_note_info(user_id, c, cookies_str, xsec_token, xsec_source, proxies),
+            "notes",
+            cursor,
+        )
+
     def get_user_all_notes(self, user_url: str, cookies_str: str, proxies: Dict[str, str] | None = None) -> Tuple[bool, str, List[Any]]:
         """Fetch all notes for a user"""
-        cursor = ""
         note_list: List[Any] = []
         try:
-            url_parse = urllib.parse.urlparse(user_url)
-            user_id = url_parse.path.split("/")[-1]
-            kv_dist = {kv.split("=")[0]: kv.split("=")[1] for kv in url_parse.query.split("&")}
-            xsec_token = kv_dist.get("xsec_token", "")
-            xsec_source = kv_dist.get("xsec_source", "pc_search")
-            while True:
-                success, msg, res_json = self.get_user_note_info(user_id, cursor, cookies_str, xsec_token, xsec_source, proxies)
-                if not success:
-                    raise Exception(msg)
-                notes = res_json["data"]["notes"]
-                cursor = str(res_json["data"].get("cursor", ""))
-                note_list.extend(notes)
-                if len(notes) == 0 or not res_json["data"].get("has_more", False):
-                    break
+            for page in self.iter_user_notes(user_url, cookies_str, proxies):
+                note_list.extend(page.items)
+            success, msg = True, "success"
         except Exception as e:
             success, msg = False, str(e)
         return success, msg, note_list
@@ -127,32 +145,35 @@ class DetailAPI(BaseAPI):
             }
             splice_api = splice_str(api, params)
             headers, cookies, _ = generate_request_params(cookies_str, splice_api)
-            response = requests.get(self.base_url + splice_api, headers=headers, cookies=cookies, proxies=proxies)
-            res_json = response.json()
+            response = self._request("GET", api, self.base_url + splice_api, headers=headers, cookies=cookies, proxies=proxies)
+            res_json = decode_json(response)
             success, msg = res_json["success"], res_json["msg"]
         except Exception as e:
             success, msg = False, str(e)
         return success, msg, res_json
 
+    def iter_user_like_notes(
+        self,
+        user_url: str,
+        cookies_str: str,
+        proxies: Dict[str, str] | None = None,
+        cursor: str = "",
+    ) -> Iterator[Page]:
+        """Yield a user's liked notes page by page"""
+        user_id, xsec_token, xsec_source = _parse_user_url(user_url, "pc_user")
+        return self._iter_cursor_pages(
+            lambda c: self.get_user_like_note_info(user_id, c, cookies_str, xsec_token, xsec_source, proxies),
+            "notes",
+            cursor,
+        )
+
     def get_user_all_like_note_info(self, user_url: str, cookies_str: str, proxies: Dict[str, str] | None = None) -> Tuple[bool, str, List[Any]]:
         """Fetch all liked notes for a user"""
-        cursor = ""
         note_list: List[Any] = []
         try:
-            url_parse = urllib.parse.urlparse(user_url)
-            user_id = url_parse.path.split("/")[-1]
-            kv_dist = {kv.split("=")[0]: kv.split("=")[1] for kv in url_parse.query.split("&")}
-            xsec_token = kv_dist.get("xsec_token", "")
-            xsec_source = kv_dist.get("xsec_source", "pc_user")
-            while True:
-                success, msg, res_json = self.get_user_like_note_info(user_id, cursor, cookies_str, xsec_token, xsec_source, proxies)
-                if not success:
-                    raise Exception(msg)
-                notes = res_json["data"]["notes"]
-                cursor = str(res_json["data"].get("cursor", ""))
-                note_list.extend(notes)
-                if len(notes) == 0 or not res_json["data"].get("has_more", False):
-                    break
+            for page in self.iter_user_like_notes(user_url, cookies_str, proxies):
+                note_list.extend(page.items)
+            success, msg = True, "success"
         except Exception as e:
             success, msg = False, str(e)
         return success, msg, note_list
@@ -180,38 +201,54 @@ class DetailAPI(BaseAPI):
             }
             splice_api = splice_str(api, params)
             headers, cookies, _ = generate_request_params(cookies_str, splice_api)
-            response = requests.get(self.base_url + splice_api, headers=headers, cookies=cookies, proxies=proxies)
-            res_json = response.json()
+            response = self._request("GET", api, self.base_url + splice_api, headers=headers, cookies=cookies, proxies=proxies)
+            res_json = decode_json(response)
             success, msg = res_json["success"], res_json["msg"]
         except Exception as e:
             success, msg = False, str(e)
         return success, msg, res_json
 
+    def iter_user_collect_notes(
+        self,
+        user_url: str,
+        cookies_str: str,
+        proxies: Dict[str, str] | None = None,
+        cursor: str = "",
+    ) -> Iterator[Page]:
+        """Yield a user's collected notes page by page"""
+        user_id, xsec_token, xsec_source = _parse_user_url(user_url, "pc_search")
+        return self._iter_cursor_pages(
+            lambda c: self.get_user_collect_note_info(user_id, c, cookies_str, xsec_token, xsec_source, proxies),
+            "notes",
+            cursor,
+        )
+
     def get_user_all_collect_note_info(self, user_url: str, cookies_str: str, proxies: Dict[str, str] | None = None) -> Tuple[bool, str, List[Any]]:
         """Fetch all collected notes for a user"""
-        cursor = ""
         note_list: List[Any] = []
         try:
-            url_parse = urllib.parse.urlparse(user_url)
-            user_id = url_parse.path.split("/")[-1]
-            kv_dist = {kv.split("=")[0]: kv.split("=")[1] for kv in url_parse.query.split("&")}
-            xsec_token = kv_dist.get("xsec_token", "")
-            xsec_source = kv_dist.get("xsec_source", "pc_search")
-            while True:
-                success, msg, res_json = self.get_user_collect_note_info(user_id, cursor, cookies_str, xsec_token, xsec_source, proxies)
-                if not success:
-                    raise Exception(msg)
-                notes = res_json["data"]["notes"]
-                cursor = str(res_json["data"].get("cursor", ""))
-                note_list.extend(notes)
-                if len(notes) == 0 or not res_json["data"].get("has_more", False):
-                    break
+            for page in self.iter_user_collect_notes(user_url, cookies_str, proxies):
+                note_list.extend(page.items)
+            success, msg = True, "success"
         except Exception as e:
             success, msg = False, str(e)
         return success, msg, note_list
 
     def get_note_info(self, url: str, cookies_str: str, proxies: Dict[str, str] | None = None) -> Tuple[bool, str, Any]:
-        """Get note details"""
+        """Get note details, served from the response cache or hedged when configured"""
+        note_id = urllib.parse.urlparse(url).path.split("/")[-1]
+
+        def fetch() -> Tuple[bool, str, Any]:
+            if self.hedger is not None:
+                timeout = self.hedger.request_timeout
+                return self.hedger.call(lambda p: self._fetch_note_info(url, cookies_str, p, timeout), proxies)
+            return self._fetch_note_info(url, cookies_str, proxies)
+
+        return self._cached("/api/sns/web/v1/feed", {"source_note_id": note_id}, fetch)
+
+    def _fetch_note_info(self, url: str, cookies_str: str, proxies: Dict[str, str] | None = None,
+                         timeout: float | None = None) -> Tuple[bool, str, Any]:
+        """Request note details once"""
         res_json = None
         try:
             url_parse = urllib.parse.urlparse(url)
@@ -240,9 +277,10 @@ class DetailAPI(BaseAPI):
             headers, cookies, data = generate_request_params(cookies_str, api, data)
             
             log_request_details("POST", self.base_url + api, headers, data)
-            response = requests.post(self.base_url + api, headers=headers, data=data, cookies=cookies, proxies=proxies)
+            response = self._request("POST", api, self.base_url + api, headers=headers, data=data, cookies=cookies,
+                                     proxies=proxies, timeout=timeout)
             
-            success, msg, res_json = parse_response(response)
+            success, msg, res_json = self._parse(api, response)
         except XHSError as e:
             logger.error(f"XHS API error in get_note_info: {e}")
             success, msg, res_json = False, str(e), None
@@ -260,7 +298,8 @@ class DetailAPI(BaseAPI):
         try:
             headers = get_common_headers()
             url = f"https://www.xiaohongshu.com/explore/{note_id}"
-            response = requests.get(url, headers=headers)
+            # a bare BaseAPI keeps this static while still recording metrics, one label for every note page
+            response = BaseAPI()._request("GET", "/explore", url, headers=headers)
             res = response.text
             video_addr = re.findall(r'<meta name="og:video" content="(.*?)">', res)[0]
         except Exception as e:
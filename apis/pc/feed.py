@@ -1,7 +1,7 @@
-from typing import Tuple, List, Dict, Any
-import requests
+from typing import Tuple, List, Dict, Any, Iterator
 from xhs_utils.xhs_util import generate_request_params
-from .base import BaseAPI
+from xhs_utils.error_handler import decode_json
+from .base import BaseAPI, Page
 
 
 class FeedAPI(BaseAPI):
@@ -11,8 +11,8 @@ class FeedAPI(BaseAPI):
         try:
             api = "/api/sns/web/v1/homefeed/category"
             headers, cookies, _ = generate_request_params(cookies_str, api)
-            response = requests.get(self.base_url + api, headers=headers, cookies=cookies, proxies=proxies)
-            res_json = response.json()
+            response = self._request("GET", api, self.base_url + api, headers=headers, cookies=cookies, proxies=proxies)
+            res_json = decode_json(response)
             success, msg = res_json["success"], res_json["msg"]
         except Exception as e:
             success, msg = False, str(e)
@@ -46,19 +46,49 @@ class FeedAPI(BaseAPI):
                 "need_filter_image": False,
             }
             headers, cookies, trans_data = generate_request_params(cookies_str, api, data)
-            response = requests.post(
+            response = self._request(
+                "POST",
+                api,
                 self.base_url + api,
                 headers=headers,
                 data=trans_data,
                 cookies=cookies,
                 proxies=proxies,
             )
-            res_json = response.json()
+            res_json = decode_json(response)
             success, msg = res_json["success"], res_json["msg"]
         except Exception as e:
             success, msg = False, str(e)
         return success, msg, res_json
 
+    def iter_homefeed_recommend(
+        self,
+        category: str,
+        cookies_str: str,
+        proxies: Dict[str, str] | None = None,
+        cursor: Tuple[str, int] = ("", 0),
+    ) -> Iterator[Page]:
+        """Yield recommended notes page by page; the cursor is ``(cursor_score, note_index)``"""
+        cursor_score, note_index = cursor
+        refresh_type = 3 if cursor_score else 1
+        while True:
+            success, msg, res_json = self.get_homefeed_recommend(
+                category,
+                cursor_score,
+                refresh_type,
+                note_index,
+                cookies_str,
+                proxies,
+            )
+            if not success:
+                raise Exception(msg)
+            if "items" not in res_json["data"]:
+                break
+            cursor_score = res_json["data"]["cursor_score"]
+            refresh_type = 3
+            note_index += 20
+            yield Page(res_json["data"]["items"], (cursor_score, note_index), True)
+
     def get_homefeed_recommend_by_num(
         self,
         category: str,
@@ -67,29 +97,13 @@ class FeedAPI(BaseAPI):
         proxies: Dict[str, str] | None = None,
     ) -> Tuple[bool, str, List[Any]]:
         """Fetch a number of recommended notes from the home feed"""
-        cursor_score, refresh_type, note_index = "", 1, 0
         note_list: List[Any] = []
         try:
-            while True:
-                success, msg, res_json = self.get_homefeed_recommend(
-                    category,
-                    cursor_score,
-                    refresh_type,
-                    note_index,
-                    cookies_str,
-                    proxies,
-                )
-                if not success:
-                    raise Exception(msg)
-                if "items" not in res_json["data"]:
-                    break
-                notes = res_json["data"]["items"]
-                note_list.extend(notes)
-                cursor_score = res_json["data"]["cursor_score"]
-                refresh_type = 3
-                note_index += 20
+            for page in self.iter_homefeed_recommend(category, cookies_str, proxies):
+                note_list.extend(page.items)
                 if len(note_list) > require_num:
                     break
+            success, msg = True, "success"
         except Exception as e:
             success, msg = False, str(e)
         if len(note_list) > require_num:
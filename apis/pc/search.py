@@ -1,11 +1,14 @@
-from typing import Tuple, List, Dict, Any
+from typing import Tuple, List, Dict, Any, Iterator, Sequence
+from concurrent.futures import ThreadPoolExecutor
 import json
+import threading
 import urllib
-import requests
 from loguru import logger
+from xhs_utils import tracing
 from xhs_utils.xhs_util import splice_str, generate_request_params, generate_x_b3_traceid
-from xhs_utils.error_handler import parse_response, log_request_details, XHSError
-from .base import BaseAPI
+from xhs_utils.error_handler import decode_json, log_request_details, XHSError
+from xhs_utils.search_filter import item_publish_time
+from .base import BaseAPI, Page
 
 SORT_MAP = {
     1: "time_descending",
@@ -31,6 +34,21 @@ def _build_filters(
     ]
 
 
+def _drop_older(items: List[Any], min_publish_time: float) -> Tuple[List[Any], bool]:
+    """Drop items published before the cutoff; also report whether the whole page was older"""
+    kept: List[Any] = []
+    known = older = 0
+    for item in items:
+        published = item_publish_time(item)
+        if published is not None:
+            known += 1
+            if published < min_publish_time:
+                older += 1
+                continue
+        kept.append(item)
+    return kept, known > 0 and older == known
+
+
 class SearchAPI(BaseAPI):
     def get_search_keyword(self, word: str, cookies_str: str, proxies: Dict[str, str] | None = None) -> Tuple[bool, str, Any]:
         """Fetch search suggestions"""
@@ -42,9 +60,9 @@ class SearchAPI(BaseAPI):
             headers, cookies, _ = generate_request_params(cookies_str, splice_api)
             
             log_request_details("GET", self.base_url + splice_api, headers)
-            response = requests.get(self.base_url + splice_api, headers=headers, cookies=cookies, proxies=proxies)
+            response = self._request("GET", api, self.base_url + splice_api, headers=headers, cookies=cookies, proxies=proxies)
             
-            success, msg, res_json = parse_response(response)
+            success, msg, res_json = self._parse(api, response)
         except XHSError as e:
             logger.error(f"XHS API error in get_search_keyword: {e}")
             success, msg, res_json = False, str(e), None
@@ -67,6 +85,32 @@ class SearchAPI(BaseAPI):
         proxies: Dict[str, str] | None = None,
     ) -> Tuple[bool, str, Any]:
         """Search notes"""
+        params = {
+            "keyword": query,
+            "page": page,
+            "filters": [sort_type_choice, note_type, note_time, note_range, pos_distance],
+            "geo": geo,
+        }
+        return self._cached(
+            "/api/sns/web/v1/search/notes",
+            params,
+            lambda: self._fetch_search_note(query, cookies_str, page, sort_type_choice, note_type, note_time, note_range, pos_distance, geo, proxies),
+        )
+
+    def _fetch_search_note(
+        self,
+        query: str,
+        cookies_str: str,
+        page: int = 1,
+        sort_type_choice: int = 0,
+        note_type: int = 0,
+        note_time: int = 0,
+        note_range: int = 0,
+        pos_distance: int = 0,
+        geo: str | dict = "",
+        proxies: Dict[str, str] | None = None,
+    ) -> Tuple[bool, str, Any]:
+        """Request one page of search results"""
         res_json = None
         filters = _build_filters(sort_type_choice, note_type, note_time, note_range, pos_distance)
         if geo:
@@ -88,7 +132,10 @@ class SearchAPI(BaseAPI):
             headers, cookies, data = generate_request_params(cookies_str, api, data)
             
             log_request_details("POST", self.base_url + api, headers, data)
-            response = requests.post(
+            self._throttle()
+            response = self._request(
+                "POST",
+                api,
                 self.base_url + api,
                 headers=headers,
                 data=data.encode("utf-8"),
@@ -96,7 +143,7 @@ class SearchAPI(BaseAPI):
                 proxies=proxies,
             )
             
-            success, msg, res_json = parse_response(response)
+            success, msg, res_json = self._parse(api, response)
         except XHSError as e:
             logger.error(f"XHS API error in search_note: {e}")
             success, msg, res_json = False, str(e), None
@@ -105,6 +152,60 @@ class SearchAPI(BaseAPI):
             success, msg, res_json = False, f"Unexpected error: {str(e)}", None
         return success, msg, res_json
 
+    def iter_search_notes(
+        self,
+        query: str,
+        cookies_str: str,
+        sort_type_choice: int = 0,
+        note_type: int = 0,
+        note_time: int = 0,
+        note_range: int = 0,
+        pos_distance: int = 0,
+        geo: str | dict = "",
+        proxies: Dict[str, str] | None = None,
+        page: int = 1,
+        min_publish_time: float | None = None,
+        item_filter: Any = None,
+    ) -> Iterator[Page]:
+        """Yield search results page by page; the page cursor is the next page number
+
+        With ``min_publish_time`` (epoch seconds) notes published earlier are
+        dropped, and a time-sorted search (``sort_type_choice=1``) stops
+        requesting pages once a whole page is older than the cutoff. With
+        ``item_filter`` (e.g. ``SearchItemFilter``) pages only keep the notes
+        it accepts, as ``search_notes_fanout`` does.
+        """
+        while True:
+            success, msg, res_json = self.search_note(
+                query,
+                cookies_str,
+                page,
+                sort_type_choice,
+                note_type,
+                note_time,
+                note_range,
+                pos_distance,
+                geo,
+                proxies,
+            )
+            if not success:
+                raise Exception(msg)
+            if "items" not in res_json["data"]:
+                break
+            page += 1
+            has_more = bool(res_json["data"]["has_more"])
+            items = res_json["data"]["items"]
+            if min_publish_time is not None:
+                items, page_expired = _drop_older(items, min_publish_time)
+                if page_expired and sort_type_choice == 1:
+                    logger.info(f"Search '{query}' reached notes older than the cutoff, stopping at page {page - 1}")
+                    has_more = False
+            if item_filter is not None:
+                items = [item for item in items if item.get("model_type") == "note" and item_filter.accept(item)]
+            yield Page(items, page, has_more)
+            if not has_more:
+                break
+
     def search_some_note(
         self,
         query: str,
@@ -117,39 +218,99 @@ class SearchAPI(BaseAPI):
         pos_distance: int = 0,
         geo: str | dict = "",
         proxies: Dict[str, str] | None = None,
+        min_publish_time: float | None = None,
+        item_filter: Any = None,
     ) -> Tuple[bool, str, List[Any]]:
-        """Search a fixed number of notes"""
-        page = 1
+        """Search a fixed number of notes, optionally none older than ``min_publish_time``
+
+        Only notes accepted by ``item_filter`` count toward ``require_num``.
+        """
         note_list: List[Any] = []
         try:
-            while True:
-                success, msg, res_json = self.search_note(
-                    query,
-                    cookies_str,
-                    page,
-                    sort_type_choice,
-                    note_type,
-                    note_time,
-                    note_range,
-                    pos_distance,
-                    geo,
-                    proxies,
-                )
-                if not success:
-                    raise Exception(msg)
-                if "items" not in res_json["data"]:
-                    break
-                notes = res_json["data"]["items"]
-                note_list.extend(notes)
-                page += 1
-                if len(note_list) >= require_num or not res_json["data"]["has_more"]:
+            pages = self.iter_search_notes(
+                query, cookies_str, sort_type_choice, note_type, note_time, note_range, pos_distance, geo, proxies,
+                min_publish_time=min_publish_time, item_filter=item_filter,
+            )
+            for page in pages:
+                note_list.extend(page.items)
+                if len(note_list) >= require_num:
                     break
+            success, msg = True, "success"
         except Exception as e:
             success, msg = False, str(e)
         if len(note_list) > require_num:
             note_list = note_list[:require_num]
         return success, msg, note_list
 
+    def search_notes_fanout(
+        self,
+        queries: Sequence[str],
+        require_num: int,
+        cookies_str: str,
+        sort_type_choices: Sequence[int] = (0,),
+        note_type: int = 0,
+        note_time: int = 0,
+        note_range: int = 0,
+        pos_distance: int = 0,
+        geo: str | dict = "",
+        proxies: Dict[str, str] | None = None,
+        max_workers: int = 4,
+        item_filter: Any = None,
+        min_publish_time: float | None = None,
+    ) -> Tuple[bool, str, List[Any]]:
+        """Search several keywords and sort orders concurrently, merging unique notes
+
+        Every (query, sort) pair pages independently; notes are deduplicated by
+        id and all streams stop once ``require_num`` unique notes are collected.
+        ``item_filter`` (e.g. ``SearchItemFilter``) is applied before counting.
+        Set ``rate_limiter`` to keep the streams within one request rate.
+        """
+        streams = [(query, sort) for query in queries for sort in sort_type_choices]
+        seen: set = set()
+        note_list: List[Any] = []
+        errors: List[str] = []
+        lock = threading.Lock()
+        done = threading.Event()
+
+        def run(query: str, sort: int) -> None:
+            # streams still queued when require_num is reached send no request
+            if done.is_set():
+                return
+            try:
+                pages = self.iter_search_notes(
+                    query, cookies_str, sort, note_type, note_time, note_range, pos_distance, geo, proxies,
+                    min_publish_time=min_publish_time,
+                )
+                for page in pages:
+                    with lock:
+                        for item in page.items:
+                            if done.is_set():
+                                break
+                            if item.get("model_type") != "note" or item.get("id") in seen:
+                                continue
+                            if item_filter is not None and not item_filter.accept(item):
+                                continue
+                            seen.add(item["id"])
+                            note_list.append(item)
+                            if len(note_list) >= require_num:
+                                done.set()
+                                break
+                    if done.is_set():
+                        break
+            except Exception as e:
+                with lock:
+                    errors.append(f"{query}/{SORT_MAP.get(sort, 'general')}: {e}")
+
+        with ThreadPoolExecutor(max_workers=max(1, min(max_workers, len(streams)))) as executor:
+            for query, sort in streams:
+                executor.submit(tracing.propagate(run), query, sort)
+
+        if errors and not note_list:
+            return False, "; ".join(errors), note_list
+        msg = "success" if not errors else f"partial: {'; '.join(errors)}"
+        logger.info(f"Fan-out search over {len(streams)} streams collected {len(note_list)} unique notes")
+        return True, msg, note_list[:require_num]
+
     def search_user(self, query: str, cookies_str: str, page: int = 1, proxies: Dict[str, str] | None = None) -> Tuple[bool, str, Any]:
         """Search users"""
         res_json = None
@@ -166,19 +327,41 @@ class SearchAPI(BaseAPI):
                 }
             }
             headers, cookies, data = generate_request_params(cookies_str, api, data)
-            response = requests.post(
+            response = self._request(
+                "POST",
+                api,
                 self.base_url + api,
                 headers=headers,
                 data=data.encode("utf-8"),
                 cookies=cookies,
                 proxies=proxies,
             )
-            res_json = response.json()
+            res_json = decode_json(response)
             success, msg = res_json["success"], res_json["msg"]
         except Exception as e:
             success, msg = False, str(e)
         return success, msg, res_json
 
+    def iter_search_users(
+        self,
+        query: str,
+        cookies_str: str,
+        proxies: Dict[str, str] | None = None,
+        page: int = 1,
+    ) -> Iterator[Page]:
+        """Yield user search results page by page; the page cursor is the next page number"""
+        while True:
+            success, msg, res_json = self.search_user(query, cookies_str, page, proxies)
+            if not success:
+                raise Exception(msg)
+            if "users" not in res_json["data"]:
+                break
+            page += 1
+            has_more = bool(res_json["data"]["has_more"])
+            yield Page(res_json["data"]["users"], page, has_more)
+            if not has_more:
+                break
+
     def search_some_user(
         self,
         query: str,
@@ -187,20 +370,13 @@ class SearchAPI(BaseAPI):
         proxies: Dict[str, str] | None = None,
     ) -> Tuple[bool, str, List[Any]]:
         """Search a fixed number of users"""
-        page = 1
         user_list: List[Any] = []
         try:
-            while True:
-                success, msg, res_json = self.search_user(query, cookies_str, page, proxies)
-                if not success:
-                    raise Exception(msg)
-                if "users" not in res_json["data"]:
-                    break
-                users = res_json["data"]["users"]
-                user_list.extend(users)
-                page += 1
-                if len(user_list) >= require_num or not res_json["data"]["has_more"]:
+            for page in self.iter_search_users(query, cookies_str, proxies):
+                user_list.extend(page.items)
+                if len(user_list) >= require_num:
                     break
+            success, msg = True, "success"
         except Exception as e:
             success, msg = False, str(e)
         if len(user_list) > require_num:
@@ -1,11 +1,13 @@
-import requests
+from apis.pc.base import BaseAPI
 from xhs_utils.cookie_util import trans_cookies
 from xhs_utils.xhs_creator_util import get_common_headers, generate_xs
 from xhs_utils.xhs_util import generate_x_b3_traceid
+from xhs_utils.error_handler import decode_json
 
 
-class XHS_Creator_Apis():
+class XHS_Creator_Apis(BaseAPI):
     def __init__(self):
+        super().__init__()
         self.base_url = "https://creator.xiaohongshu.com"
 
 
@@ -27,8 +29,8 @@ class XHS_Creator_Apis():
             }
             if page:
                 params["page"] = str(page)
-            response = requests.get(self.base_url + api, headers=headers, cookies=cookies, params=params)
-            res_json = response.json()
+            response = self._request("GET", api, self.base_url + api, headers=headers, cookies=cookies, params=params)
+            res_json = decode_json(response)
             success = res_json["success"]
         except Exception as e:
             success, msg = False, str(e)
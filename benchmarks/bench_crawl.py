@@ -0,0 +1,68 @@
+"""End-to-end crawl benchmarks against the local fake XHS API
+
+Run with ``python -m pytest benchmarks/bench_crawl.py --benchmark-only``;
+see benchmarks/README.md for saving and comparing baselines.
+"""
+import pathlib
+
+import pytest
+
+from xhs_utils.data_util import download_note, save_to_xlsx
+
+
+def _note_urls(server, count):
+    return [server.note_url(f"bench{i}") for i in range(count)]
+
+
+@pytest.mark.parametrize("latency", [0.0, 0.005], ids=["no-latency", "5ms"])
+def test_search_some_note(benchmark, cookies_str, spider, xhs_server, latency):
+    xhs_server.reset(latency=latency, pagination_depth=5)
+    success, msg, notes = benchmark(spider.xhs_apis.search_some_note, "穿搭", 100, cookies_str)
+    assert success, msg
+    assert len(notes) == 100
+
+
+def test_search_some_note_rate_limited(benchmark, cookies_str, spider, xhs_server):
+    """Every 4th request answered with 461: measures how fast a search fails over"""
+    xhs_server.reset(rate_limit_every=4, pagination_depth=10)
+    success, msg, notes = benchmark(spider.xhs_apis.search_some_note, "穿搭", 200, cookies_str)
+    assert xhs_server.rate_limited > 0
+    assert not success and "461" in msg
+
+
+@pytest.mark.parametrize("max_workers", [1, 4])
+def test_get_note_all_comment(benchmark, cookies_str, spider, xhs_server, max_workers):
+    xhs_server.reset(pagination_depth=5)
+    url = xhs_server.note_url("bench-comments")
+    success, msg, comments = benchmark(spider.xhs_apis.get_note_all_comment, url, cookies_str, None, max_workers)
+    assert success, msg
+    assert len(comments) == 50
+    assert sum(len(c["sub_comments"]) for c in comments) == 25 * 20
+
+
+def test_spider_some_note(benchmark, cookies_str, spider, xhs_server, tmp_path, monkeypatch):
+    monkeypatch.chdir(tmp_path)
+    xhs_server.reset(images_per_note=2, media_bytes=16 * 1024)
+    base_path = {"media": str(tmp_path / "media"), "excel": str(tmp_path)}
+    benchmark(spider.spider_some_note, _note_urls(xhs_server, 20), cookies_str, base_path, "all", "bench")
+    assert (tmp_path / "bench.xlsx").exists()
+    assert not (tmp_path / "failed.txt").exists()
+
+
+def test_download_note(benchmark, cookies_str, spider, xhs_server, tmp_path):
+    xhs_server.reset(images_per_note=9, media_bytes=256 * 1024)
+    success, msg, note_info = spider.spider_note(xhs_server.note_url("bench-download"), cookies_str)
+    assert success, msg
+    failed = []
+    save_path = benchmark(download_note, note_info, str(tmp_path), "media", False, failed)
+    assert not failed
+    assert len(list(pathlib.Path(save_path).glob("image_*.jpg"))) == 9
+
+
+def test_save_to_xlsx(benchmark, cookies_str, spider, xhs_server, tmp_path):
+    success, msg, note_info = spider.spider_note(xhs_server.note_url("bench-xlsx"), cookies_str)
+    assert success, msg
+    notes = [dict(note_info, note_id=f"bench-xlsx-{i}") for i in range(2000)]
+    benchmark(save_to_xlsx, notes, str(tmp_path / "notes.xlsx"))
+    assert (tmp_path / "notes.xlsx").stat().st_size > 0
+
@@ -0,0 +1,216 @@
+#!/usr/bin/env python3
+"""Micro-benchmark of response parsing: the previous handlers against the current ones
+
+Run with ``python benchmarks/bench_parsing.py [--notes N] [--comments N]``.
+The previous implementations are copied below as the baseline and every
+result is checked for equality before timing.
+"""
+
+import argparse
+import json
+import os
+import random
+import sys
+import time
+import timeit
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from xhs_utils.data_util import handle_comment_info, handle_note_info, timestamp_to_str
+from xhs_utils.error_handler import decode_json, orjson
+
+
+# --- previous implementations (baseline) ---
+
+def legacy_timestamp_to_str(timestamp):
+    time_local = time.localtime(timestamp / 1000)
+    dt = time.strftime("%Y-%m-%d %H:%M:%S", time_local)
+    return dt
+
+
+def legacy_handle_note_info(data):
+    note_id = data['id']
+    note_url = data['url']
+    note_type = data['note_card']['type']
+    if note_type == 'normal':
+        note_type = 'image_collection'
+    else:
+        note_type = 'video'
+    user_id = data['note_card']['user']['user_id']
+    home_url = f'https://www.xiaohongshu.com/user/profile/{user_id}'
+    nickname = data['note_card']['user']['nickname']
+    avatar = data['note_card']['user']['avatar']
+    title = data['note_card']['title']
+    if title.strip() == '':
+        title = 'Untitled'
+    desc = data['note_card']['desc']
+    liked_count = data['note_card']['interact_info']['liked_count']
+    collected_count = data['note_card']['interact_info']['collected_count']
+    comment_count = data['note_card']['interact_info']['comment_count']
+    share_count = data['note_card']['interact_info']['share_count']
+    image_list_temp = data['note_card']['image_list']
+    image_list = []
+    for image in image_list_temp:
+        try:
+            image_list.append(image['info_list'][1]['url'])
+        except:
+            pass
+    if note_type == 'video':
+        video_cover = image_list[0]
+        video_addr = f"https://sns-video-bd.xhscdn.com/{data['note_card']['video']['consumer']['origin_video_key']}"
+    else:
+        video_cover = None
+        video_addr = None
+    tags_temp = data['note_card']['tag_list']
+    tags = []
+    for tag in tags_temp:
+        try:
+            tags.append(tag['name'])
+        except:
+            pass
+    upload_time = legacy_timestamp_to_str(data['note_card']['time'])
+    if 'ip_location' in data['note_card']:
+        ip_location = data['note_card']['ip_location']
+    else:
+        ip_location = 'unknown'
+    return {
+        'note_id': note_id, 'note_url': note_url, 'note_type': note_type, 'user_id': user_id,
+        'home_url': home_url, 'nickname': nickname, 'avatar': avatar, 'title': title, 'desc': desc,
+        'liked_count': liked_count, 'collected_count': collected_count, 'comment_count': comment_count,
+        'share_count': share_count, 'video_cover': video_cover, 'video_addr': video_addr,
+        'image_list': image_list, 'tags': tags, 'upload_time': upload_time, 'ip_location': ip_location,
+    }
+
+
+def legacy_handle_comment_info(data):
+    note_id = data['note_id']
+    note_url = data['note_url']
+    comment_id = data['id']
+    user_id = data['user_info']['user_id']
+    home_url = f'https://www.xiaohongshu.com/user/profile/{user_id}'
+    nickname = data['user_info']['nickname']
+    avatar = data['user_info']['image']
+    content = data['content']
+    show_tags = data['show_tags']
+    like_count = data['like_count']
+    upload_time = legacy_timestamp_to_str(data['create_time'])
+    try:
+        ip_location = data['ip_location']
+    except Exception:
+        ip_location = 'unknown'
+    pictures = []
+    try:
+        pictures_temp = data['pictures']
+        for picture in pictures_temp:
+            try:
+                pictures.append(picture['info_list'][1]['url'])
+            except:
+                pass
+    except:
+        pass
+    return {
+        'note_id': note_id, 'note_url': note_url, 'comment_id': comment_id, 'user_id': user_id,
+        'home_url': home_url, 'nickname': nickname, 'avatar': avatar, 'content': content,
+        'show_tags': show_tags, 'like_count': like_count, 'upload_time': upload_time,
+        'ip_location': ip_location, 'pictures': pictures,
+    }
+
+
+# --- fixtures ---
+
+def _image(rng, i):
+    return {'width': 1080, 'height': 1440, 'info_list': [
+        {'image_scene': 'WB_PRV', 'url': f'https://sns-webpic-qc.xhscdn.com/prv/{i}'},
+        {'image_scene': 'WB_DFT', 'url': f'https://sns-webpic-qc.xhscdn.com/dft/{i}'},
+    ]}
+
+
+def make_note(rng, i, base_ms):
+    video = i % 4 == 0
+    card = {
+        'type': 'video' if video else 'normal',
+        'user': {'user_id': f'5{i % 997:023x}', 'nickname': f'用户{i % 997}', 'avatar': f'https://sns-avatar/{i % 997}'},
+        'title': f'今日穿搭分享 {i}' if i % 10 else ' ',
+        'desc': '今天分享一套通勤穿搭，简约又显瘦 #穿搭[话题]# #OOTD[话题]#' * 3,
+        'interact_info': {'liked_count': f'{rng.randint(1, 99)}.{rng.randint(0, 9)}万', 'collected_count': '1000+',
+                          'comment_count': str(rng.randint(0, 999)), 'share_count': str(rng.randint(0, 99))},
+        'image_list': [_image(rng, f'{i}-{j}') for j in range(rng.randint(1, 9))],
+        'tag_list': [{'id': str(j), 'name': f'标签{j}', 'type': 'topic'} for j in range(rng.randint(0, 6))],
+        'time': base_ms + rng.randint(0, 30 * 86400) * 1000,
+        'ip_location': rng.choice(['上海', '北京', '广东', '浙江']),
+    }
+    if video:
+        card['video'] = {'consumer': {'origin_video_key': f'pre_post/{i}'}}
+    return {'id': f'6{i:023x}', 'url': f'https://www.xiaohongshu.com/explore/6{i:023x}', 'note_card': card}
+
+
+def make_comment(rng, i, base_ms):
+    comment = {
+        'note_id': f'6{i // 20:023x}', 'note_url': f'https://www.xiaohongshu.com/explore/6{i // 20:023x}',
+        'id': f'c{i:023x}', 'user_info': {'user_id': f'5{i % 4999:023x}', 'nickname': f'评论者{i % 4999}',
+                                          'image': f'https://sns-avatar/{i % 4999}'},
+        'content': '好好看！求链接～' * rng.randint(1, 4), 'show_tags': [], 'like_count': str(rng.randint(0, 500)),
+        # comments on one note arrive close together, which is what the minute cache exploits
+        'create_time': base_ms + (i // 20) * 3_600_000 + rng.randint(0, 1800) * 1000,
+        'ip_location': rng.choice(['上海', '北京', '广东', '浙江']),
+    }
+    if i % 5 == 0:
+        comment['pictures'] = [_image(rng, f'c{i}')]
+    return comment
+
+
+class _Response:
+    """Just enough of ``requests.Response`` for ``decode_json``"""
+
+    def __init__(self, content: bytes):
+        self.content = content
+
+    def json(self):
+        return json.loads(self.content)
+
+
+def _bench(label, baseline, current, number, repeat):
+    before = min(timeit.repeat(baseline, number=number, repeat=repeat))
+    after = min(timeit.repeat(current, number=number, repeat=repeat))
+    print(f"{label:<28}{before * 1e3:>12.1f}{after * 1e3:>12.1f}{before / after:>9.2f}x")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--notes', type=int, default=2000)
+    parser.add_argument('--comments', type=int, default=20000)
+    parser.add_argument('--repeat', type=int, default=5)
+    args = parser.parse_args()
+
+    rng = random.Random(0)
+    base_ms = 1_714_521_600_000
+    notes = [make_note(rng, i, base_ms) for i in range(args.notes)]
+    comments = [make_comment(rng, i, base_ms) for i in range(args.comments)]
+    page = json.dumps({'success': True, 'msg': '成功', 'data': {'comments': comments[:20], 'has_more': True}},
+                      ensure_ascii=False).encode('utf-8')
+    timestamps = [c['create_time'] for c in comments]
+
+    assert all(handle_note_info(n) == legacy_handle_note_info(n) for n in notes)
+    assert all(handle_comment_info(c) == legacy_handle_comment_info(c) for c in comments)
+    assert all(timestamp_to_str(t) == legacy_timestamp_to_str(t) for t in timestamps)
+    assert decode_json(_Response(page)) == json.loads(page)
+
+    print(f"orjson: {'installed' if orjson is not None else 'not installed (stdlib json)'}")
+    print(f"{'':<28}{'before ms':>12}{'after ms':>12}{'speedup':>10}")
+    _bench(f"timestamp_to_str x{len(timestamps)}",
+           lambda: [legacy_timestamp_to_str(t) for t in timestamps],
+           lambda: [timestamp_to_str(t) for t in timestamps], 1, args.repeat)
+    _bench(f"handle_note_info x{len(notes)}",
+           lambda: [legacy_handle_note_info(n) for n in notes],
+           lambda: [handle_note_info(n) for n in notes], 1, args.repeat)
+    _bench(f"handle_comment_info x{len(comments)}",
+           lambda: [legacy_handle_comment_info(c) for c in comments],
+           lambda: [handle_comment_info(c) for c in comments], 1, args.repeat)
+    response = _Response(page)
+    _bench(f"decode 20-comment page x1000",
+           lambda: [response.json() for _ in range(1000)],
+           lambda: [decode_json(response) for _ in range(1000)], 1, args.repeat)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,262 @@
+#!/usr/bin/env python3
+"""Latency and throughput of the JavaScript signing layer
+
+Run with ``python benchmarks/bench_signing.py [--calls N] [--threads N] [--json PATH]``.
+``generate_xs_xs_common``, ``generate_xray_traceid`` and ``generate_headers``
+are timed one call at a time, from a thread pool, and batched into a
+single JavaScript call, for every available execjs runtime and payload
+size. p50/p95/p99 latency and calls/sec are printed as a table and can be
+written as JSON for capacity planning. A case that fails (a runtime that
+cannot load the script, a missing node module) is reported with its error
+instead of aborting the run.
+"""
+
+import argparse
+import contextlib
+import json
+import os
+import platform
+import sys
+import time
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, Callable, Dict, List, Optional
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path.insert(0, ROOT)
+
+import execjs
+
+# imported by main() once the working directory is the repository root
+xhs_util = None
+
+A1 = "18c8f2a36c8ug0kxa4c8q4hmbaxsvfjc0bzt8mw0a50000331395"
+API = "/api/sns/web/v1/search/notes"
+TARGETS = ('xs_xs_common', 'xray_traceid', 'headers')
+# the trace id takes no payload, so it is measured once per mode rather than per size
+PAYLOAD_TARGETS = ('xs_xs_common', 'headers')
+
+BATCH_SOURCE = """
+function __bench_sign_batch(items) {
+    return items.map(function (item) { return get_request_headers_params(item[0], item[1], item[2]); });
+}
+"""
+XRAY_BATCH_SOURCE = """
+function __bench_xray_batch(n) {
+    var ids = [];
+    for (var i = 0; i < n; i++) { ids.push(traceId()); }
+    return ids;
+}
+"""
+
+
+def _read(name: str) -> str:
+    with open(os.path.join(ROOT, 'static', name), 'r', encoding='utf-8') as f:
+        return f.read()
+
+
+def make_payload(size: int, index: int) -> Dict[str, Any]:
+    """A search body padded to roughly ``size`` bytes; ``index`` keeps payloads distinct"""
+    payload = {'keyword': f'穿搭{index}', 'page': 1, 'page_size': 20, 'search_id': f'{index:021x}',
+               'sort': 'general', 'note_type': 0}
+    pad = size - len(json.dumps(payload, separators=(',', ':'), ensure_ascii=False).encode('utf-8'))
+    if pad > 0:
+        payload['ext'] = 'x' * pad
+    return payload
+
+
+def percentile(sorted_values: List[float], q: float) -> float:
+    """Nearest-rank percentile of an already sorted list"""
+    if not sorted_values:
+        return 0.0
+    rank = max(1, int(round(q / 100 * len(sorted_values) + 0.5)))
+    return sorted_values[min(rank, len(sorted_values)) - 1]
+
+
+def summarize(latencies: List[float], wall: float, calls: int) -> Dict[str, float]:
+    latencies = sorted(latencies)
+    return {
+        'p50_ms': percentile(latencies, 50) * 1e3,
+        'p95_ms': percentile(latencies, 95) * 1e3,
+        'p99_ms': percentile(latencies, 99) * 1e3,
+        'mean_ms': sum(latencies) / len(latencies) * 1e3 if latencies else 0.0,
+        'calls_per_sec': calls / wall if wall > 0 else 0.0,
+    }
+
+
+@contextlib.contextmanager
+def use_runtime(js_ctx, xray_ctx, cache_ttl: float):
+    """Point ``xhs_util`` at contexts compiled by one runtime for the duration of a case"""
+    saved = xhs_util.js, xhs_util.xray_js, xhs_util.signature_cache.ttl, xhs_util.signature_cache.maxsize
+    xhs_util.js, xhs_util.xray_js = js_ctx, xray_ctx
+    xhs_util.configure_signature_cache(ttl=cache_ttl, maxsize=saved[3])
+    try:
+        yield
+    finally:
+        xhs_util.js, xhs_util.xray_js = saved[0], saved[1]
+        xhs_util.configure_signature_cache(ttl=saved[2], maxsize=saved[3])
+
+
+def call_for(target: str, size: int) -> Callable[[int], Any]:
+    if target == 'xs_xs_common':
+        return lambda i: xhs_util.generate_xs_xs_common(A1, API, make_payload(size, i))
+    if target == 'xray_traceid':
+        return lambda i: xhs_util.generate_xray_traceid()
+    return lambda i: xhs_util.generate_headers(A1, API, make_payload(size, i))
+
+
+def _timed(fn: Callable[[int], Any], i: int) -> float:
+    start = time.perf_counter()
+    fn(i)
+    return time.perf_counter() - start
+
+
+def run_single(fn, calls: int) -> Dict[str, float]:
+    start = time.perf_counter()
+    latencies = [_timed(fn, i) for i in range(calls)]
+    return summarize(latencies, time.perf_counter() - start, calls)
+
+
+def run_threaded(fn, calls: int, threads: int) -> Dict[str, float]:
+    start = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=threads) as pool:
+        latencies = list(pool.map(lambda i: _timed(fn, i), range(calls)))
+    return summarize(latencies, time.perf_counter() - start, calls)
+
+
+def run_batched(batch_ctx, xray_batch_ctx, target: str, size: int, calls: int, batch: int) -> Dict[str, float]:
+    """One JavaScript call per ``batch`` signatures; latency is the per-item share of each call"""
+    template = xhs_util.get_request_headers_template() if target == 'headers' else None
+    latencies = []
+    start = time.perf_counter()
+    for offset in range(0, calls, batch):
+        n = min(batch, calls - offset)
+        began = time.perf_counter()
+        if target != 'xray_traceid':
+            items = [[API, make_payload(size, offset + i), A1] for i in range(n)]
+            signatures = batch_ctx.call('__bench_sign_batch', items)
+        if target != 'xs_xs_common':
+            trace_ids = xray_batch_ctx.call('__bench_xray_batch', n)
+        if target == 'headers':
+            # headers need a signature and an x-ray trace id each, so both are batched
+            for signature, trace_id in zip(signatures, trace_ids):
+                dict(template, **{'x-s': signature['xs'], 'x-t': str(signature['xt']),
+                                  'x-s-common': signature['xs_common'], 'x-xray-traceid': trace_id,
+                                  'x-b3-traceid': xhs_util.generate_x_b3_traceid()})
+        latencies.extend([(time.perf_counter() - began) / n] * n)
+    return summarize(latencies, time.perf_counter() - start, calls)
+
+
+def compile_runtime(runtime, with_batch: bool) -> Dict[str, Any]:
+    xs_source, xray_source = _read('xhs_xs_xsc_56.js'), _read('xhs_xray.js')
+    contexts = {'js': runtime.compile(xs_source), 'xray': runtime.compile(xray_source)}
+    if with_batch:
+        contexts['batch'] = runtime.compile(xs_source + BATCH_SOURCE)
+        contexts['xray_batch'] = runtime.compile(xray_source + XRAY_BATCH_SOURCE)
+    return contexts
+
+
+def bench_runtime(name: str, runtime, args) -> List[Dict[str, Any]]:
+    results = []
+    try:
+        contexts = compile_runtime(runtime, 'batched' in args.modes)
+    except Exception as e:
+        row = {'runtime': name, 'target': '*', 'mode': '*', 'payload_bytes': None, 'calls': 0,
+               'error': f"{type(e).__name__}: {e}".splitlines()[0]}
+        print_row(row)
+        return [row]
+
+    with use_runtime(contexts['js'], contexts['xray'], args.cache_ttl):
+        for target in args.targets:
+            sizes = args.sizes if target in PAYLOAD_TARGETS else [0]
+            for size in sizes:
+                fn = call_for(target, size)
+                for mode in args.modes:
+                    row = {'runtime': name, 'target': target, 'mode': mode,
+                           'payload_bytes': size if target in PAYLOAD_TARGETS else None, 'calls': args.calls}
+                    try:
+                        fn(-1)  # warm-up, and fail fast before timing
+                        if mode == 'single':
+                            row.update(run_single(fn, args.calls))
+                        elif mode == 'threaded':
+                            row.update(threads=args.threads)
+                            row.update(run_threaded(fn, args.calls, args.threads))
+                        else:
+                            row.update(batch=args.batch)
+                            row.update(run_batched(contexts['batch'], contexts['xray_batch'], target, size,
+                                                   args.calls, args.batch))
+                    except Exception as e:
+                        row['error'] = f"{type(e).__name__}: {e}".splitlines()[0]
+                    results.append(row)
+                    print_row(row)
+    return results
+
+
+def available_runtimes(requested: Optional[List[str]]) -> Dict[str, Any]:
+    runtimes = {name: runtime for name, runtime in execjs.runtimes().items() if runtime.is_available()}
+    if requested:
+        runtimes = {name: runtimes[name] for name in requested if name in runtimes}
+    return runtimes
+
+
+def print_header() -> None:
+    print(f"{'runtime':<14}{'target':<14}{'mode':<10}{'bytes':>7}{'p50 ms':>10}{'p95 ms':>10}"
+          f"{'p99 ms':>10}{'calls/s':>10}")
+
+
+def print_row(row: Dict[str, Any]) -> None:
+    size = '-' if row['payload_bytes'] is None else row['payload_bytes']
+    prefix = f"{row['runtime']:<14}{row['target']:<14}{row['mode']:<10}{size:>7}"
+    if 'error' in row:
+        print(f"{prefix}  error: {row['error'][:80]}")
+    else:
+        print(f"{prefix}{row['p50_ms']:>10.1f}{row['p95_ms']:>10.1f}{row['p99_ms']:>10.1f}"
+              f"{row['calls_per_sec']:>10.1f}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--calls', type=int, default=20, help='signatures per case')
+    parser.add_argument('--threads', type=int, default=4)
+    parser.add_argument('--batch', type=int, default=10, help='signatures per JavaScript call in batched mode')
+    parser.add_argument('--sizes', type=lambda s: [int(v) for v in s.split(',')], default=[128, 4096, 65536],
+                        help='comma separated payload sizes in bytes')
+    parser.add_argument('--targets', nargs='+', choices=TARGETS, default=list(TARGETS))
+    parser.add_argument('--modes', nargs='+', choices=('single', 'threaded', 'batched'),
+                        default=['single', 'threaded', 'batched'])
+    parser.add_argument('--runtimes', nargs='+', help='execjs runtime names; defaults to every available one')
+    parser.add_argument('--cache-ttl', type=float, default=0.0,
+                        help='signature cache ttl while benchmarking; 0 measures every call uncached')
+    parser.add_argument('--json', help='write the results to this file')
+    args = parser.parse_args()
+    if args.json:
+        args.json = os.path.abspath(args.json)
+
+    global xhs_util
+    # the bundled scripts are loaded from paths relative to the repository root
+    os.chdir(ROOT)
+    from xhs_utils import xhs_util
+
+    runtimes = available_runtimes(args.runtimes)
+    if not runtimes:
+        parser.error('no execjs runtime available')
+    print(f"runtimes: {', '.join(runtimes)} (default: {execjs.get().name})")
+    print_header()
+    results = []
+    for name, runtime in runtimes.items():
+        results.extend(bench_runtime(name, runtime, args))
+
+    if args.json:
+        report = {
+            'created': time.strftime('%Y-%m-%dT%H:%M:%S'),
+            'machine': {'platform': platform.platform(), 'python': platform.python_version(),
+                        'cpus': os.cpu_count()},
+            'settings': {k: v for k, v in vars(args).items() if k != 'json'},
+            'results': results,
+        }
+        with open(args.json, 'w', encoding='utf-8') as f:
+            json.dump(report, f, ensure_ascii=False, indent=2)
+        print(f"results written to {args.json}")
+
+
+if __name__ == '__main__':
+    main()
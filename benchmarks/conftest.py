@@ -0,0 +1,81 @@
+"""Fixtures for the pytest-benchmark suite
+
+The suite talks to ``FakeXHSServer`` instead of edith.xiaohongshu.com,
+replaces the JavaScript x-s signature and x-ray trace id with cheap
+deterministic stand-ins, drops DEBUG request logging and disables the politeness delay between note requests, so the numbers
+measure the crawler's own request, parse and write path.
+"""
+import hashlib
+import itertools
+import pathlib
+import sys
+
+sys.path.insert(0, str(pathlib.Path(__file__).resolve().parents[1]))
+
+import pytest
+from loguru import logger
+
+import main
+from benchmarks.fake_xhs import FakeXHSServer
+from main import Data_Spider
+from xhs_utils import xhs_util
+
+COOKIES = "a1=benchmark-a1; web_session=benchmark-session; webId=benchmark"
+_traceids = itertools.count()
+
+
+def fake_signature(a1, api, data=''):
+    """Deterministic x-s/x-t/x-s-common without running the bundled JavaScript"""
+    digest = hashlib.md5(f"{a1}{api}{data}".encode('utf-8')).hexdigest()
+    return f"XYW_{digest}", 1714521600000, f"common_{digest[:16]}"
+
+
+def fake_xray_traceid():
+    return f"{next(_traceids):032x}"
+
+
+@pytest.fixture(scope="session", autouse=True)
+def quiet_logging():
+    """Per-request DEBUG lines would otherwise dominate the timings"""
+    logger.remove()
+    handler_id = logger.add(sys.stderr, level="WARNING")
+    yield
+    logger.remove(handler_id)
+    logger.add(sys.stderr)
+
+
+@pytest.fixture(scope="session")
+def fake_xhs():
+    with FakeXHSServer() as server:
+        yield server
+
+
+@pytest.fixture
+def xhs_server(fake_xhs):
+    """The shared fake server, reset to its defaults for each benchmark"""
+    fake_xhs.reset()
+    yield fake_xhs
+
+
+@pytest.fixture(autouse=True)
+def fake_signing(monkeypatch):
+    monkeypatch.setattr(xhs_util, "generate_xs_xs_common", fake_signature)
+    monkeypatch.setattr(xhs_util, "generate_xray_traceid", fake_xray_traceid)
+    xhs_util.signature_cache.clear()
+
+
+@pytest.fixture(autouse=True)
+def no_pacing(monkeypatch):
+    monkeypatch.setattr(main, "smart_delay", lambda last_request_time, min_interval=2.0: None)
+
+
+@pytest.fixture
+def cookies_str():
+    return COOKIES
+
+
+@pytest.fixture
+def spider(xhs_server):
+    spider = Data_Spider()
+    spider.xhs_apis.base_url = xhs_server.url
+    return spider
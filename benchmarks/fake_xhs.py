@@ -0,0 +1,215 @@
+"""Local stand-in for edith.xiaohongshu.com used by the benchmark suite
+
+``FakeXHSServer`` serves canned search, note feed, comment and media
+payloads from a ``ThreadingHTTPServer`` on 127.0.0.1. Latency, 461
+rate-limit injection and pagination depth are plain attributes that can be
+changed between benchmarks.
+"""
+
+import itertools
+import json
+import threading
+import time
+import urllib.parse
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Any, Dict, Optional
+
+SEARCH_PAGE_SIZE = 20
+COMMENT_PAGE_SIZE = 10
+# A JPEG start-of-image marker followed by filler
+MEDIA_HEADER = b"\xff\xd8\xff\xe0"
+
+
+class FakeXHSServer:
+    """
+    Canned XHS API on an ephemeral port
+
+    Args:
+        latency: Seconds every request waits before it is answered.
+        pagination_depth: Pages served by search, comment and sub-comment
+            endpoints before ``has_more`` turns false.
+        rate_limit_every: Answer every n-th API request with HTTP 461; 0 disables.
+        images_per_note: Images listed in every note detail.
+        media_bytes: Size of every media download.
+    """
+
+    def __init__(self, latency: float = 0.0, pagination_depth: int = 5, rate_limit_every: int = 0,
+                 images_per_note: int = 4, media_bytes: int = 64 * 1024):
+        self.latency = latency
+        self.pagination_depth = pagination_depth
+        self.rate_limit_every = rate_limit_every
+        self.images_per_note = images_per_note
+        self.media_bytes = media_bytes
+        self.requests = 0
+        self.rate_limited = 0
+        self._counter = itertools.count(1)
+        self._lock = threading.Lock()
+        self._httpd: Optional[ThreadingHTTPServer] = None
+        self._thread: Optional[threading.Thread] = None
+
+    @property
+    def url(self) -> str:
+        host, port = self._httpd.server_address[:2]
+        return f"http://{host}:{port}"
+
+    def start(self) -> "FakeXHSServer":
+        self._httpd = ThreadingHTTPServer(("127.0.0.1", 0), _handler_for(self))
+        self._httpd.daemon_threads = True
+        self._thread = threading.Thread(target=self._httpd.serve_forever, name="fake-xhs", daemon=True)
+        self._thread.start()
+        return self
+
+    def stop(self) -> None:
+        if self._httpd is not None:
+            self._httpd.shutdown()
+            self._httpd.server_close()
+            self._httpd = None
+
+    def reset(self, **settings: Any) -> None:
+        """Restore the defaults, apply ``settings`` and clear the counters"""
+        defaults = FakeXHSServer()
+        for name in ('latency', 'pagination_depth', 'rate_limit_every', 'images_per_note', 'media_bytes'):
+            setattr(self, name, settings.pop(name, getattr(defaults, name)))
+        if settings:
+            raise TypeError(f"unknown settings: {', '.join(settings)}")
+        with self._lock:
+            self.requests = self.rate_limited = 0
+            self._counter = itertools.count(1)
+
+    def note_url(self, note_id: str) -> str:
+        return f"https://www.xiaohongshu.com/explore/{note_id}?xsec_token=token-{note_id}&xsec_source=pc_search"
+
+    def __enter__(self) -> "FakeXHSServer":
+        return self.start()
+
+    def __exit__(self, *exc) -> None:
+        self.stop()
+
+    # --- payloads ---
+
+    def _should_rate_limit(self) -> bool:
+        with self._lock:
+            self.requests += 1
+            n = next(self._counter)
+            if self.rate_limit_every and n % self.rate_limit_every == 0:
+                self.rate_limited += 1
+                return True
+        return False
+
+    def search_page(self, keyword: str, page: int) -> Dict[str, Any]:
+        items = [
+            {
+                'id': f"{keyword}-{page}-{i}",
+                'model_type': 'note',
+                'xsec_token': f"token-{keyword}-{page}-{i}",
+                'note_card': {
+                    'type': 'normal',
+                    'display_title': f"{keyword} 笔记 {page}-{i}",
+                    'user': {'user_id': f"user{i}", 'nickname': f"用户{i}"},
+                    'interact_info': {'liked_count': f"{i + 1}.{page}万"},
+                    'corner_tag_info': [{'type': 'publish_time', 'text': '3天前'}],
+                },
+            }
+            for i in range(SEARCH_PAGE_SIZE)
+        ]
+        return {'success': True, 'msg': '成功', 'data': {'items': items, 'has_more': page < self.pagination_depth}}
+
+    def note_detail(self, note_id: str) -> Dict[str, Any]:
+        images = [
+            {'width': 1080, 'height': 1440, 'info_list': [
+                {'image_scene': 'WB_PRV', 'url': f"{self.url}/media/{note_id}/{i}/prv.jpg"},
+                {'image_scene': 'WB_DFT', 'url': f"{self.url}/media/{note_id}/{i}/dft.jpg"},
+            ]}
+            for i in range(self.images_per_note)
+        ]
+        card = {
+            'type': 'normal',
+            'user': {'user_id': f"user-{note_id}", 'nickname': '测试用户', 'avatar': f"{self.url}/media/avatar.jpg"},
+            'title': f"笔记 {note_id}",
+            'desc': '今天分享一套通勤穿搭，简约又显瘦 #穿搭[话题]# #OOTD[话题]#',
+            'interact_info': {'liked_count': '1.2万', 'collected_count': '3000', 'comment_count': '120',
+                              'share_count': '45'},
+            'image_list': images,
+            'tag_list': [{'id': '1', 'name': '穿搭', 'type': 'topic'}, {'id': '2', 'name': 'OOTD', 'type': 'topic'}],
+            'time': 1714521600000,
+            'ip_location': '上海',
+        }
+        return {'success': True, 'msg': '成功', 'data': {'items': [{'id': note_id, 'model_type': 'note', 'note_card': card}]}}
+
+    def comment_page(self, note_id: str, cursor: str, root_id: Optional[str] = None) -> Dict[str, Any]:
+        page = int(cursor or 0) + 1
+        prefix = f"{root_id}-sub" if root_id else f"{note_id}-c"
+        comments = []
+        for i in range(COMMENT_PAGE_SIZE):
+            comment_id = f"{prefix}{page}-{i}"
+            comment = {
+                'id': comment_id, 'note_id': note_id, 'content': '好好看！求链接～', 'like_count': str(i),
+                'create_time': 1714521600000 + i * 1000, 'ip_location': '北京', 'show_tags': [],
+                'user_info': {'user_id': f"commenter{i}", 'nickname': f"评论者{i}", 'image': ''},
+            }
+            if root_id is None:
+                # every other root comment has a second page of replies to expand
+                comment.update({'sub_comments': [], 'sub_comment_count': '3',
+                                'sub_comment_has_more': i % 2 == 0, 'sub_comment_cursor': '0'})
+            comments.append(comment)
+        depth = 2 if root_id else self.pagination_depth
+        return {'success': True, 'msg': '成功',
+                'data': {'comments': comments, 'cursor': str(page), 'has_more': page < depth}}
+
+
+def _handler_for(server: FakeXHSServer):
+    class Handler(BaseHTTPRequestHandler):
+        protocol_version = 'HTTP/1.1'
+        # headers and body go out in separate writes; without this each response stalls on delayed ACK
+        disable_nagle_algorithm = True
+
+        def log_message(self, format, *args):
+            pass
+
+        def _send(self, status: int, body: bytes, content_type: str = 'application/json; charset=utf-8') -> None:
+            self.send_response(status)
+            self.send_header('Content-Type', content_type)
+            self.send_header('Content-Length', str(len(body)))
+            self.end_headers()
+            self.wfile.write(body)
+
+        def _send_json(self, payload: Dict[str, Any]) -> None:
+            self._send(200, json.dumps(payload, ensure_ascii=False).encode('utf-8'))
+
+        def _begin(self) -> Optional[urllib.parse.ParseResult]:
+            if server.latency:
+                time.sleep(server.latency)
+            parsed = urllib.parse.urlparse(self.path)
+            if parsed.path.startswith('/api/') and server._should_rate_limit():
+                self._send(461, b'{"code":300011,"success":false,"msg":"rate limited"}')
+                return None
+            return parsed
+
+        def do_GET(self):
+            parsed = self._begin()
+            if parsed is None:
+                return
+            query = dict(urllib.parse.parse_qsl(parsed.query))
+            if parsed.path == '/api/sns/web/v2/comment/page':
+                self._send_json(server.comment_page(query['note_id'], query.get('cursor', '')))
+            elif parsed.path == '/api/sns/web/v2/comment/sub/page':
+                self._send_json(server.comment_page(query['note_id'], query.get('cursor', ''), query['root_comment_id']))
+            elif parsed.path.startswith('/media/'):
+                self._send(200, MEDIA_HEADER + b'\0' * max(0, server.media_bytes - len(MEDIA_HEADER)), 'image/jpeg')
+            else:
+                self._send(404, b'{"success":false,"msg":"not found"}')
+
+        def do_POST(self):
+            body = self.rfile.read(int(self.headers.get('Content-Length') or 0))
+            parsed = self._begin()
+            if parsed is None:
+                return
+            data = json.loads(body or b'{}')
+            if parsed.path == '/api/sns/web/v1/search/notes':
+                self._send_json(server.search_page(data['keyword'], int(data['page'])))
+            elif parsed.path == '/api/sns/web/v1/feed':
+                self._send_json(server.note_detail(data['source_note_id']))
+            else:
+                self._send(404, b'{"success":false,"msg":"not found"}')
+
+    return Handler
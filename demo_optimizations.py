@@ -23,7 +23,7 @@ try:
 except ImportError as e:
     print(f"❌ Import error: {e}")
     print("Please ensure all optimization dependencies are installed:")
-    print("pip install pyyaml scikit-learn pillow imagehash rich click aiohttp aiofiles")
+    print("pip install pyyaml pillow imagehash rich click aiohttp aiofiles")
     sys.exit(1)
 
 def demo_configuration_management():
@@ -2,63 +2,102 @@ import json
 import os
 import argparse
 import time
+import urllib.parse
 from loguru import logger
 from apis.xhs_pc_apis import XHS_Apis
 from xhs_utils.common_util import init
 from xhs_utils.data_util import (
     handle_note_info,
+    handle_comment_info,
     download_note,
     save_to_xlsx,
     save_failed,
     retry_failed,
     download_media,
 )
-from xhs_utils.retry_util import retry_with_backoff, smart_delay
+from xhs_utils.retry_util import retry_with_backoff, smart_delay, RateLimiter
 from xhs_utils.error_handler import XHSAuthError, XHSRateLimitError, XHSNotFoundError
+from xhs_utils.hedge_util import HedgedRequester
+from xhs_utils.cache_util import ResponseCache
+from xhs_utils.search_filter import SearchItemFilter
+from xhs_utils.frontier import CrawlFrontier
+from xhs_utils import metrics, tracing, xhs_util
+from xhs_utils.profiler import CrawlProfiler, MODES as PROFILE_MODES
 from tqdm import tqdm
 
 
 class Data_Spider():
-    def __init__(self):
+    def __init__(
+        self,
+        hedger: HedgedRequester | None = None,
+        response_cache: ResponseCache | None = None,
+        frontier: CrawlFrontier | None = None,
+    ):
         self.xhs_apis = XHS_Apis()
+        self.xhs_apis.hedger = hedger
+        self.xhs_apis.response_cache = response_cache
+        self.frontier = frontier
         self.last_request_time = 0
+        # save every comment of the crawled notes next to the note Excel file
+        self.crawl_comments = False
+        # pool size expanding sub-comment threads, 1 expands them one by one
+        self.comment_workers = 1
+
+    @staticmethod
+    def _note_id(note_url: str) -> str:
+        return urllib.parse.urlparse(note_url).path.rstrip('/').split('/')[-1]
 
     @retry_with_backoff(max_retries=3, base_delay=2.0)
     def spider_note(self, note_url: str, cookies_str: str, proxies=None):
         """Crawl information for a single note."""
         note_info = None
-        try:
-            # Add intelligent delay between requests
-            smart_delay(self.last_request_time, min_interval=2.0)
-            self.last_request_time = time.time()
+        with tracing.span('spider_note', note_id=self._note_id(note_url)) as span:
+            try:
+                # Add intelligent delay between requests
+                smart_delay(self.last_request_time, min_interval=2.0)
+                self.last_request_time = time.time()
             
-            success, msg, response_data = self.xhs_apis.get_note_info(note_url, cookies_str, proxies)
-            if success and response_data:
-                if 'data' not in response_data or 'items' not in response_data['data']:
-                    raise ValueError(f"Invalid response structure: {response_data}")
+                success, msg, response_data = self.xhs_apis.get_note_info(note_url, cookies_str, proxies)
+                if success and response_data:
+                    if 'data' not in response_data or 'items' not in response_data['data']:
+                        raise ValueError(f"Invalid response structure: {response_data}")
                 
-                items = response_data['data']['items']
-                if not items:
-                    raise ValueError("No items found in response")
+                    items = response_data['data']['items']
+                    if not items:
+                        raise ValueError("No items found in response")
                     
-                note_info = items[0]
-                note_info['url'] = note_url
-                note_info = handle_note_info(note_info)
-            else:
-                raise Exception(msg)
+                    note_info = items[0]
+                    note_info['url'] = note_url
+                    with tracing.span('handle', note_id=note_info.get('id', '')):
+                        note_info = handle_note_info(note_info)
+                else:
+                    raise Exception(msg)
                 
-        except (XHSAuthError, XHSRateLimitError, XHSNotFoundError) as e:
-            success = False
-            msg = str(e)
-            logger.error(f'XHS error crawling note {note_url}: {e}')
-        except Exception as e:
-            success = False
-            msg = str(e)
-            logger.error(f'Unexpected error crawling note {note_url}: {e}')
-            
+            except (XHSAuthError, XHSRateLimitError, XHSNotFoundError) as e:
+                success = False
+                msg = str(e)
+                logger.error(f'XHS error crawling note {note_url}: {e}')
+            except Exception as e:
+                success = False
+                msg = str(e)
+                logger.error(f'Unexpected error crawling note {note_url}: {e}')
+            span.set_attribute('success', success)
+
         logger.info(f'Crawled note info {note_url}: {success}, msg: {msg}')
         return success, msg, note_info
 
+    def spider_note_comments(self, note_url: str, cookies_str: str, proxies=None):
+        """Crawl all comments of a single note, sub-comments included."""
+        comment_list = []
+        success, msg, comments = self.xhs_apis.get_note_all_comment(note_url, cookies_str, proxies, self.comment_workers)
+        if success:
+            for comment in comments:
+                for item in [comment] + comment.get('sub_comments', []):
+                    item['note_url'] = note_url
+                    comment_list.append(handle_comment_info(item))
+        logger.info(f'Crawled {len(comment_list)} comments of {note_url}: {success}, msg: {msg}')
+        return success, msg, comment_list
+
     def spider_some_note(
         self,
         notes: list,
@@ -73,17 +112,40 @@ class Data_Spider():
         if (save_choice == 'all' or save_choice == 'excel') and excel_name == '':
             raise ValueError('excel_name cannot be empty')
         note_list = []
-        for note_url in tqdm(notes, desc="notes"):
+        if self.frontier is not None:
+            pending = [url for url in notes if not self.frontier.seen('note', self._note_id(url))]
+            logger.info(f'Crawl frontier skipped {len(notes) - len(pending)} of {len(notes)} already crawled notes')
+            notes = pending
+        for done, note_url in enumerate(tqdm(notes, desc="notes")):
+            metrics.QUEUE_DEPTH.set(len(notes) - done, queue='notes')
             success, msg, note_info = self.spider_note(note_url, cookies_str, proxies)
             if note_info is not None and success:
                 note_list.append(note_info)
+        metrics.QUEUE_DEPTH.set(0, queue='notes')
         failed = []
-        for note_info in tqdm(note_list, desc="download"):
+        # notes whose media all downloaded; only these are marked as crawled
+        completed = []
+        for done, note_info in enumerate(tqdm(note_list, desc="download")):
+            metrics.QUEUE_DEPTH.set(len(note_list) - done, queue='downloads')
+            failed_before = len(failed)
             if save_choice == 'all' or 'media' in save_choice or 'flat' in save_choice:
-                download_note(note_info, base_path['media'], save_choice, transcode, failed)
+                download_note(note_info, base_path['media'], save_choice, transcode, failed, self.frontier)
+            if len(failed) == failed_before:
+                completed.append(note_info['note_id'])
+        metrics.QUEUE_DEPTH.set(0, queue='downloads')
         if save_choice == 'all' or save_choice == 'excel':
             file_path = os.path.abspath(os.path.join(base_path['excel'], f'{excel_name}.xlsx'))
             save_to_xlsx(note_list, file_path)
+            if self.crawl_comments:
+                comment_list = []
+                for note_info in tqdm(note_list, desc="comments"):
+                    _, _, comments = self.spider_note_comments(note_info['note_url'], cookies_str, proxies)
+                    comment_list.extend(comments)
+                file_path = os.path.abspath(os.path.join(base_path['excel'], f'{excel_name}_comments.xlsx'))
+                save_to_xlsx(comment_list, file_path, type='comment')
+        if self.frontier is not None:
+            for note_id in completed:
+                self.frontier.add('note', note_id)
         save_failed(failed)
 
 
@@ -131,6 +193,8 @@ class Data_Spider():
         excel_name: str = '',
         proxies=None,
         transcode: bool = False,
+        item_filter: SearchItemFilter | None = None,
+        max_age_days: float | None = None,
     ):
         """Search and crawl a fixed number of notes.
 
@@ -143,14 +207,19 @@ class Data_Spider():
         :param note_time: 0 all, 1 within a day, 2 within a week, 3 within half a year
         :param note_range: 0 all, 1 viewed, 2 not viewed, 3 followed
         :param pos_distance: 0 all, 1 same city, 2 nearby (requires geo)
+        :param item_filter: drops search hits before any detail request is made; only accepted hits count toward require_num
+        :param max_age_days: skip older notes; with sort 1 paging stops at the first fully older page
         :return: list of note urls
         """
         note_list = []
         try:
-            success, msg, notes = self.xhs_apis.search_some_note(query, require_num, cookies_str, sort_type_choice, note_type, note_time, note_range, pos_distance, geo, proxies)
+            min_publish_time = time.time() - max_age_days * 86400 if max_age_days else None
+            success, msg, notes = self.xhs_apis.search_some_note(query, require_num, cookies_str, sort_type_choice, note_type, note_time, note_range, pos_distance, geo, proxies, min_publish_time, item_filter)
             if success:
                 notes = list(filter(lambda x: x['model_type'] == "note", notes))
                 logger.info(f'Search "{query}" found {len(notes)} notes')
+                if item_filter is not None:
+                    logger.info(f'Search pre-filter stats: {item_filter.stats}')
                 for note in tqdm(notes, desc="notes"):
                     note_url = f"https://www.xiaohongshu.com/explore/{note['id']}?xsec_token={note['xsec_token']}"
                     note_list.append(note_url)
@@ -163,6 +232,52 @@ class Data_Spider():
         logger.info(f'Search "{query}" result: {success}, msg: {msg}')
         return note_list, success, msg
 
+    def spider_multi_search_note(
+        self,
+        queries: list,
+        require_num: int,
+        cookies_str: str,
+        base_path: dict,
+        save_choice: str,
+        sort_type_choices=(0,),
+        note_type=0,
+        note_time=0,
+        note_range=0,
+        pos_distance=0,
+        geo: dict | None = None,
+        excel_name: str = '',
+        proxies=None,
+        transcode: bool = False,
+        item_filter: SearchItemFilter | None = None,
+        max_workers: int = 4,
+        max_age_days: float | None = None,
+    ):
+        """Search several keywords and sort orders at once and crawl the unique notes.
+
+        Streams page concurrently and stop as soon as ``require_num`` unique
+        notes are collected, e.g. for ``SearchConfig.keywords`` of a preset.
+        """
+        note_list = []
+        try:
+            min_publish_time = time.time() - max_age_days * 86400 if max_age_days else None
+            success, msg, notes = self.xhs_apis.search_notes_fanout(
+                queries, require_num, cookies_str, sort_type_choices, note_type, note_time,
+                note_range, pos_distance, geo, proxies, max_workers, item_filter, min_publish_time,
+            )
+            if success:
+                logger.info(f'Search {queries} found {len(notes)} unique notes')
+                for note in notes:
+                    note_url = f"https://www.xiaohongshu.com/explore/{note['id']}?xsec_token={note['xsec_token']}"
+                    note_list.append(note_url)
+            if (save_choice == 'all' or save_choice == 'excel') and excel_name == '':
+                excel_name = '_'.join(queries)
+            self.spider_some_note(note_list, cookies_str, base_path, save_choice, excel_name, proxies, transcode)
+        except Exception as e:
+            success = False
+            msg = e
+        logger.info(f'Search {queries} result: {success}, msg: {msg}')
+        return note_list, success, msg
+
 def run_examples():
     """Demonstrate typical usage of the spider."""
     cookies_str, base_path = init()
@@ -210,7 +325,9 @@ def cli():
     parser = argparse.ArgumentParser(description="Spider XHS")
     parser.add_argument("--notes", nargs="*", help="note urls")
     parser.add_argument("--user", help="user url")
-    parser.add_argument("--query", help="search keyword")
+    parser.add_argument("--query", nargs="+", help="search keywords, several are searched concurrently")
+    parser.add_argument("--extra-sort", type=int, action="append", default=[],
+                        help="additional sort type searched concurrently with --sort (repeatable)")
     parser.add_argument("--num", type=int, default=10, help="search count")
     parser.add_argument("--save-choice", default="all", help="save choice")
     parser.add_argument("--excel-name", default="", help="excel file name")
@@ -219,40 +336,132 @@ def cli():
     parser.add_argument("--note-time", type=int, default=0)
     parser.add_argument("--note-range", type=int, default=0)
     parser.add_argument("--pos-distance", type=int, default=0)
+    parser.add_argument("--min-likes", type=int, default=0, help="skip search hits with fewer likes")
+    parser.add_argument("--content-type", action="append", default=[], choices=["image", "video"],
+                        help="only crawl search hits of this type (repeatable)")
+    parser.add_argument("--max-age-days", type=float, default=None,
+                        help="skip search hits older than this; stops paging early with --sort 1")
+    parser.add_argument("--exclude-keyword", action="append", default=[], help="skip search hits whose title contains it")
     parser.add_argument("--transcode", action="store_true")
     parser.add_argument("--retry-failed", action="store_true", help="retry failed downloads")
+    parser.add_argument("--hedge-proxy", action="append", default=[],
+                        help="proxy url used to hedge slow note detail requests (repeatable, 'direct' for no proxy)")
+    parser.add_argument("--hedge-ratio", type=float, default=0.1, help="max hedged requests per detail request")
+    parser.add_argument("--hedge-timeout", type=float, default=30.0,
+                        help="seconds before a hedged detail request gives up and frees its worker")
+    parser.add_argument("--cache", action="store_true",
+                        help="reuse note, user and search responses for a few minutes instead of always fetching fresh counts")
+    parser.add_argument("--cache-db", default="", help="sqlite file caching note, user and search responses between runs (implies --cache)")
+    parser.add_argument("--sign-cache-ttl", type=float, default=0,
+                        help="reuse GET request signatures for this many seconds (0 = sign every request)")
+    parser.add_argument("--rate-limit", type=float, default=0, help="max concurrent search/comment requests per minute (0 = off)")
+    parser.add_argument("--comments", action="store_true", help="also save all comments of the crawled notes to <excel>_comments.xlsx")
+    parser.add_argument("--comment-workers", type=int, default=4,
+                        help="threads expanding sub-comment threads concurrently with --comments (1 = one by one)")
+    parser.add_argument("--frontier-dir", default="", help="directory of bloom filters skipping notes and media crawled in earlier runs")
+    parser.add_argument("--frontier-error-rate", type=float, default=0.001, help="false-positive rate of the crawl frontier")
+    parser.add_argument("--metrics-port", type=int, default=0,
+                        help="serve Prometheus metrics on http://127.0.0.1:PORT/metrics while crawling (0 = off)")
+    parser.add_argument("--trace-file", default="", help="append sign/request/parse/download spans to this JSON lines file")
+    parser.add_argument("--trace-format", default="jsonl", choices=tracing.FORMATS,
+                        help="span layout of --trace-file: flat jsonl or OTLP/JSON")
+    parser.add_argument("--profile", action="store_true", help="profile the whole job and print the hottest functions")
+    parser.add_argument("--profile-output", default="profile", help="path prefix of the profile files")
+    parser.add_argument("--profile-mode", default="sampling", choices=PROFILE_MODES,
+                        help="sampling writes collapsed stacks of all threads, cprofile writes pstats of the main thread")
+    parser.add_argument("--profile-dump-interval", type=float, default=0,
+                        help="seconds between intermediate collapsed-stack dumps (sampling mode, 0 = only at the end)")
     args = parser.parse_args()
 
+    if not args.profile:
+        run_cli(args)
+        return
+    with CrawlProfiler(args.profile_output, args.profile_mode, dump_interval=args.profile_dump_interval):
+        run_cli(args)
+
+
+def run_cli(args):
+    """Run the crawl described by the parsed ``cli()`` arguments"""
+    if args.metrics_port:
+        metrics.start_metrics_server(args.metrics_port)
+    if args.trace_file:
+        tracing.configure_tracing(args.trace_file, args.trace_format)
     cookies_str, base_path = init()
-    spider = Data_Spider()
+    if args.sign_cache_ttl > 0:
+        xhs_util.configure_signature_cache(ttl=args.sign_cache_ttl)
+    hedger = None
+    if args.hedge_proxy:
+        alternates = [None if p == 'direct' else {"http": p, "https": p} for p in args.hedge_proxy]
+        hedger = HedgedRequester(alternates, max_hedge_ratio=args.hedge_ratio, request_timeout=args.hedge_timeout)
+    response_cache = ResponseCache(disk_path=args.cache_db or None) if args.cache or args.cache_db else None
+    frontier = CrawlFrontier(args.frontier_dir, error_rate=args.frontier_error_rate) if args.frontier_dir else None
+    spider = Data_Spider(hedger, response_cache, frontier)
+    if args.rate_limit > 0:
+        spider.xhs_apis.rate_limiter = RateLimiter(args.rate_limit)
+    spider.crawl_comments = args.comments
+    spider.comment_workers = args.comment_workers
 
-    if args.retry_failed:
-        records = retry_failed("failed.txt")
-        for item in tqdm(records, desc="retry"):
-            download_media(item["path"], item["name"], item["url"], item["type"])
-        return
+    try:
+        if args.retry_failed:
+            records = retry_failed("failed.txt")
+            for item in tqdm(records, desc="retry"):
+                download_media(item["path"], item["name"], item["url"], item["type"], frontier=frontier)
+            return
 
-    if args.notes:
-        spider.spider_some_note(args.notes, cookies_str, base_path, args.save_choice, args.excel_name, transcode=args.transcode)
-    if args.user:
-        spider.spider_user_all_note(args.user, cookies_str, base_path, args.save_choice, args.excel_name, transcode=args.transcode)
-    if args.query:
-        spider.spider_some_search_note(
-            args.query,
-            args.num,
-            cookies_str,
-            base_path,
-            args.save_choice,
-            args.sort,
-            args.note_type,
-            args.note_time,
-            args.note_range,
-            args.pos_distance,
-            geo=None,
-            excel_name=args.excel_name,
-            proxies=None,
-            transcode=args.transcode,
-        )
+        if args.notes:
+            spider.spider_some_note(args.notes, cookies_str, base_path, args.save_choice, args.excel_name, transcode=args.transcode)
+        if args.user:
+            spider.spider_user_all_note(args.user, cookies_str, base_path, args.save_choice, args.excel_name, transcode=args.transcode)
+        item_filter = SearchItemFilter(args.min_likes, args.content_type, args.exclude_keyword)
+        if args.query and (len(args.query) > 1 or args.extra_sort):
+            spider.spider_multi_search_note(
+                args.query,
+                args.num,
+                cookies_str,
+                base_path,
+                args.save_choice,
+                [args.sort] + args.extra_sort,
+                args.note_type,
+                args.note_time,
+                args.note_range,
+                args.pos_distance,
+                geo=None,
+                excel_name=args.excel_name,
+                proxies=None,
+                transcode=args.transcode,
+                item_filter=item_filter,
+                max_age_days=args.max_age_days,
+            )
+        elif args.query:
+            spider.spider_some_search_note(
+                args.query[0],
+                args.num,
+                cookies_str,
+                base_path,
+                args.save_choice,
+                args.sort,
+                args.note_type,
+                args.note_time,
+                args.note_range,
+                args.pos_distance,
+                geo=None,
+                excel_name=args.excel_name,
+                proxies=None,
+                transcode=args.transcode,
+                item_filter=item_filter,
+                max_age_days=args.max_age_days,
+            )
+    finally:
+        if hedger is not None:
+            logger.info(f'Hedging stats: {hedger.report()}')
+            hedger.shutdown()
+        if response_cache is not None:
+            logger.info(f'Response cache stats: {response_cache.report()}')
+            response_cache.close()
+        if frontier is not None:
+            logger.info(f'Crawl frontier size: {frontier.stats()}')
+            frontier.close()
+        tracing.tracer.shutdown()
 
 
 if __name__ == '__main__':
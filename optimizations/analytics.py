@@ -0,0 +1,289 @@
+"""Incremental analytics for crawled content"""
+
+from datetime import date
+from typing import Any, Dict, Hashable, Iterable, List, Optional, Tuple
+
+import numpy as np
+
+from optimizations.records import NoteBatch
+from optimizations.sketches import HeavyHitters, HyperLogLog, TDigest
+
+
+class TopK:
+    """
+    Exact top-k of counters that only ever increase
+
+    Ranks by count, ties broken by key, so the result depends only on the
+    final counts and not on the order they arrived or shards were merged.
+    The current k-th entry is cached, so an increment costs O(1) unless it
+    changes which entry is k-th; only then are the k entries rescanned.
+    A merge of n counters therefore costs O(n) plus O(k) per replacement.
+    """
+
+    def __init__(self, k: int = 10):
+        self.k = k
+        self.counts: Dict[Hashable, int] = {}
+        self._top: Dict[Hashable, Tuple[int, str]] = {}
+        self._worst: Optional[Hashable] = None  # lowest ranked key of _top, None when stale
+
+    def _rank(self, key: Hashable) -> Tuple[int, str]:
+        # smaller ranks first: higher count, then lower key
+        return -self.counts[key], str(key)
+
+    def add(self, key: Hashable, count: int = 1) -> None:
+        self.counts[key] = self.counts.get(key, 0) + count
+        rank = self._rank(key)
+        if key in self._top or len(self._top) < self.k:
+            # a ranked key only moves up, so the cache holds unless it was the last one
+            if key == self._worst or key not in self._top:
+                self._worst = None
+            self._top[key] = rank
+            return
+        if self._worst is None:
+            self._worst = max(self._top, key=self._top.get)
+        if rank < self._top[self._worst]:
+            del self._top[self._worst]
+            self._top[key] = rank
+            self._worst = None
+
+    def top(self) -> List[Tuple[Hashable, int]]:
+        ranked = sorted(self._top.items(), key=lambda kv: kv[1])
+        return [(key, -rank[0]) for key, rank in ranked]
+
+    def merge(self, other: "TopK") -> "TopK":
+        """Add ``other``'s counts; both must keep the same ``k``"""
+        if other.k != self.k:
+            raise ValueError(f"cannot merge top-{other.k} counts into top-{self.k} counts")
+        for key, count in other.counts.items():
+            self.add(key, count)
+        return self
+
+    def to_dict(self) -> Dict[str, Any]:
+        return {'k': self.k, 'counts': [[key, count] for key, count in self.counts.items()]}
+
+    @classmethod
+    def from_dict(cls, data: Dict[str, Any]) -> "TopK":
+        top = cls(data['k'])
+        for key, count in data['counts']:
+            top.add(key, count)
+        return top
+
+
+class AnalyticsAggregator:
+    """
+    Running totals behind ``SmartCrawler.generate_analytics_report``
+
+    Every metric is updated in O(1) per item as it is added, so the report
+    is available at any time without keeping the items.
+
+    In ``'sketch'`` mode author counts are replaced by fixed-size sketches:
+    HyperLogLog for distinct authors and hashtags, Count-Min heavy hitters
+    for top authors, hashtags and ip locations, and t-digests for like and
+    comment percentiles.
+    """
+
+    MODES = ('exact', 'sketch')
+
+    def __init__(self, top_authors: int = 10, mode: str = 'exact'):
+        if mode not in self.MODES:
+            raise ValueError(f"unknown analytics mode {mode!r}")
+        self.mode = mode
+        self.top_k = top_authors
+        self.total_items = 0
+        self.quality_sum = 0.0
+        self.quality_count = 0
+        self.total_likes = 0
+        self.total_comments = 0
+        self.category_counts: Dict[str, int] = {}
+        self.authors = TopK(top_authors)
+        self.date_counts: Dict[Any, int] = {}
+        self.quality_breakdown = {'high_quality': 0, 'medium_quality': 0, 'low_quality': 0}
+        if mode == 'sketch':
+            self.authors = HeavyHitters(top_authors)
+            self.distinct_authors = HyperLogLog()
+            self.distinct_hashtags = HyperLogLog()
+            self.top_hashtags = HeavyHitters(top_authors)
+            self.top_ip_locations = HeavyHitters(top_authors)
+            self.likes_digest = TDigest()
+            self.comments_digest = TDigest()
+
+    def add(self, item) -> None:
+        """Account for one ``ContentItem``"""
+        self.total_items += 1
+        for category in item.categories:
+            self.category_counts[category] = self.category_counts.get(category, 0) + 1
+        score = item.quality_score
+        if score > 0:
+            self.quality_sum += score
+            self.quality_count += 1
+        if score >= 0.8:
+            self.quality_breakdown['high_quality'] += 1
+        elif score >= 0.5:
+            self.quality_breakdown['medium_quality'] += 1
+        else:
+            self.quality_breakdown['low_quality'] += 1
+        self.total_likes += item.likes
+        self.total_comments += item.comments
+        self.authors.add(item.author)
+        if self.mode == 'sketch':
+            self.distinct_authors.add(item.author_id or item.author)
+            for tag in item.hashtags:
+                tag = tag.lstrip('#').lower()
+                self.distinct_hashtags.add(tag)
+                self.top_hashtags.add(tag)
+            if getattr(item, 'ip_location', ''):
+                self.top_ip_locations.add(item.ip_location)
+            self.likes_digest.add(item.likes)
+            self.comments_digest.add(item.comments)
+        if item.publish_time:
+            day = item.publish_time.date()
+            self.date_counts[day] = self.date_counts.get(day, 0) + 1
+
+    def add_many(self, items: Iterable) -> None:
+        """Account for ``ContentItem``/``NoteRecord`` objects or a whole ``NoteBatch``"""
+        if isinstance(items, NoteBatch) and self.mode == 'exact':
+            self._add_columns(items)
+            return
+        for item in items:
+            self.add(item)
+
+    def _add_columns(self, batch: NoteBatch) -> None:
+        """``add`` for every note of a batch, working on its columns"""
+        if not len(batch):
+            return
+        self.total_items += len(batch)
+        for categories in batch.values('categories'):
+            for category in categories:
+                self.category_counts[category] = self.category_counts.get(category, 0) + 1
+        scores = batch.column('quality_score')
+        # cumsum adds in item order, so the float total matches adding one by one
+        self.quality_sum = float(np.cumsum(np.concatenate(([self.quality_sum], scores[scores > 0])))[-1])
+        self.quality_count += int(np.count_nonzero(scores > 0))
+        high = int(np.count_nonzero(scores >= 0.8))
+        medium = int(np.count_nonzero(scores >= 0.5)) - high
+        self.quality_breakdown['high_quality'] += high
+        self.quality_breakdown['medium_quality'] += medium
+        self.quality_breakdown['low_quality'] += len(batch) - high - medium
+        self.total_likes += int(batch.column('likes').sum())
+        self.total_comments += int(batch.column('comments').sum())
+
+        counts = np.bincount(batch.codes('author'), minlength=len(batch.strings))
+        for code in np.flatnonzero(counts).tolist():
+            self.authors.add(batch.strings[code], int(counts[code]))
+
+        # local dates only change on whole minutes, so convert each distinct minute once
+        minutes = np.sort(batch.column('publish_ts')[batch.column('publish_ts') > 0] // 60)
+        if len(minutes):
+            starts = np.flatnonzero(np.concatenate(([True], minutes[1:] != minutes[:-1])))
+            runs = np.diff(np.append(starts, len(minutes)))
+            for minute, run in zip(minutes[starts].tolist(), runs.tolist()):
+                day = date.fromtimestamp(minute * 60)
+                self.date_counts[day] = self.date_counts.get(day, 0) + run
+
+    def report(self, processing_stats: Optional[Dict[str, int]] = None) -> Dict[str, Any]:
+        """Analytics report in the ``generate_analytics_report`` format"""
+        total_items = self.total_items
+        avg_quality = self.quality_sum / self.quality_count if self.quality_count else 0
+        report = {
+            'summary': {
+                'total_items': total_items,
+                'average_quality_score': round(avg_quality, 2),
+                'average_likes': round(self.total_likes / total_items, 1) if total_items else 0,
+                'average_comments': round(self.total_comments / total_items, 1) if total_items else 0,
+                'total_engagement': self.total_likes + self.total_comments
+            },
+            'category_distribution': dict(self.category_counts),
+            'top_authors': self.authors.top(),
+            'time_distribution': {day.strftime('%Y-%m-%d'): count for day, count in self.date_counts.items()},
+            'processing_stats': processing_stats if processing_stats is not None else {},
+            'quality_breakdown': dict(self.quality_breakdown)
+        }
+        if self.mode == 'sketch':
+            report['sketches'] = {
+                'distinct_authors': self.distinct_authors.count(),
+                'distinct_hashtags': self.distinct_hashtags.count(),
+                'top_hashtags': self.top_hashtags.top(),
+                'top_ip_locations': self.top_ip_locations.top(),
+                'likes_percentiles': self._percentiles(self.likes_digest),
+                'comments_percentiles': self._percentiles(self.comments_digest),
+            }
+        return report
+
+    def _percentiles(self, digest: TDigest) -> Dict[str, float]:
+        if not self.total_items:
+            return {}
+        return {f'p{q}': round(digest.quantile(q / 100), 1) for q in (50, 90, 99)}
+
+    # Sketch attributes and their types, used by merge and (de)serialization
+    _SKETCHES = {
+        'distinct_authors': HyperLogLog,
+        'distinct_hashtags': HyperLogLog,
+        'top_hashtags': HeavyHitters,
+        'top_ip_locations': HeavyHitters,
+        'likes_digest': TDigest,
+        'comments_digest': TDigest,
+    }
+
+    def merge(self, other: "AnalyticsAggregator") -> "AnalyticsAggregator":
+        """
+        Fold ``other`` into this aggregator
+
+        Merging is associative, so partial aggregates from workers or daily
+        shards can be combined in any grouping. Exact top authors stay exact;
+        in sketch mode the merged sketches carry their usual error bounds.
+        Both sides must use the same mode and ``top_k``.
+        """
+        if other.mode != self.mode:
+            raise ValueError(f"cannot merge {other.mode} analytics into {self.mode} analytics")
+        if other.top_k != self.top_k:
+            raise ValueError(f"cannot merge top-{other.top_k} analytics into top-{self.top_k} analytics")
+        self.total_items += other.total_items
+        self.quality_sum += other.quality_sum
+        self.quality_count += other.quality_count
+        self.total_likes += other.total_likes
+        self.total_comments += other.total_comments
+        for counts, theirs in ((self.category_counts, other.category_counts),
+                               (self.date_counts, other.date_counts),
+                               (self.quality_breakdown, other.quality_breakdown)):
+            for key, count in theirs.items():
+                counts[key] = counts.get(key, 0) + count
+        self.authors.merge(other.authors)
+        if self.mode == 'sketch':
+            for name in self._SKETCHES:
+                getattr(self, name).merge(getattr(other, name))
+        return self
+
+    def to_dict(self) -> Dict[str, Any]:
+        """Complete aggregator state as JSON-compatible data"""
+        state = {
+            'mode': self.mode,
+            'top_k': self.top_k,
+            'total_items': self.total_items,
+            'quality_sum': self.quality_sum,
+            'quality_count': self.quality_count,
+            'total_likes': self.total_likes,
+            'total_comments': self.total_comments,
+            'category_counts': dict(self.category_counts),
+            'date_counts': {day.isoformat(): count for day, count in self.date_counts.items()},
+            'quality_breakdown': dict(self.quality_breakdown),
+            'authors': self.authors.to_dict(),
+        }
+        if self.mode == 'sketch':
+            state['sketches'] = {name: getattr(self, name).to_dict() for name in self._SKETCHES}
+        return state
+
+    @classmethod
+    def from_dict(cls, state: Dict[str, Any]) -> "AnalyticsAggregator":
+        aggregator = cls(state['top_k'], state['mode'])
+        for name in ('total_items', 'quality_sum', 'quality_count', 'total_likes', 'total_comments'):
+            setattr(aggregator, name, state[name])
+        aggregator.category_counts = dict(state['category_counts'])
+        aggregator.date_counts = {date.fromisoformat(day): count for day, count in state['date_counts'].items()}
+        aggregator.quality_breakdown.update(state['quality_breakdown'])
+        if aggregator.mode == 'sketch':
+            aggregator.authors = HeavyHitters.from_dict(state['authors'])
+            for name, sketch_type in cls._SKETCHES.items():
+                setattr(aggregator, name, sketch_type.from_dict(state['sketches'][name]))
+        else:
+            aggregator.authors = TopK.from_dict(state['authors'])
+        return aggregator
@@ -7,6 +7,8 @@ from typing import Dict, List, Optional, Any
 from dataclasses import dataclass, asdict
 from datetime import datetime
 
+from optimizations.keyword_matcher import DEFAULT_CATEGORIES, DEFAULT_SPAM_INDICATORS
+
 
 @dataclass
 class SearchConfig:
@@ -57,15 +59,26 @@ class FilterConfig:
     """Content filtering configuration"""
     enable_duplicate_detection: bool = True
     similarity_threshold: float = 0.85
+    text_dedup_method: str = 'exact'  # exact (MD5), minhash or simhash near-duplicates
+    simhash_distance: int = 3  # max SimHash bit difference counted as duplicate
+    image_hash_distance: int = 4  # max pHash bit difference counted as duplicate
+    image_index_path: str = ''  # .npz file keeping image hashes across runs
+    image_hash_draft: bool = False  # faster JPEG decode, but pHash may drift up to ~4 bits
     enable_quality_filter: bool = True
     enable_spam_detection: bool = True
     min_content_length: int = 10
     language_filter: List[str] = None
     quality_threshold: float = 0.5
+    categories: Dict[str, List[str]] = None  # category -> keywords
+    spam_indicators: List[str] = None
     
     def __post_init__(self):
         if self.language_filter is None:
             self.language_filter = ['zh', 'en']
+        if self.categories is None:
+            self.categories = {k: list(v) for k, v in DEFAULT_CATEGORIES.items()}
+        if self.spam_indicators is None:
+            self.spam_indicators = list(DEFAULT_SPAM_INDICATORS)
 
 
 @dataclass
@@ -79,6 +92,7 @@ class ExportConfig:
     organize_by_date: bool = False
     export_comments: bool = False
     export_analytics: bool = True
+    analytics_mode: str = 'exact'  # exact, sketch (bounded memory for very large crawls)
 
 
 @dataclass
@@ -22,6 +22,8 @@ sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
 try:
     from optimizations.config_manager import ConfigManager, SearchPresets, CrawlerConfig
     from optimizations.smart_crawler import SmartCrawler, ContentItem
+    from optimizations.analytics import AnalyticsAggregator
+    from xhs_utils.profiler import CrawlProfiler, MODES as PROFILE_MODES
 except ImportError as e:
     print(f"Import error: {e}")
     print("Please ensure optimization dependencies are installed")
@@ -222,12 +224,20 @@ def cli():
 @click.option('--gallery/--no-gallery', default=False, 
               help='Create HTML gallery')
 @click.option('--interactive', '-i', is_flag=True, help='Interactive configuration')
+@click.option('--profile-run', is_flag=True, help='Profile the crawl and print the hottest functions')
+@click.option('--profile-mode', default='sampling', type=click.Choice(PROFILE_MODES),
+              help='Sampling profiler (collapsed stacks) or cProfile (pstats)')
+@click.option('--profile-output', default=None, help='Profile path prefix (default: <output>/profile)')
 def crawl(profile, keywords, count, output, format, quality_filter, 
-          duplicates, analytics, gallery, interactive):
+          duplicates, analytics, gallery, interactive, profile_run, profile_mode, profile_output):
     """🚀 Start intelligent crawling with advanced features"""
     
     cli_handler = EnhancedCLI()
     cli_handler.show_welcome()
+    profiler = None
+    if profile_run:
+        profiler = CrawlProfiler(profile_output or str(Path(output) / 'profile'), profile_mode)
+        profiler.start()
     
     try:
         # Configuration setup
@@ -304,8 +314,7 @@ def crawl(profile, keywords, count, output, format, quality_filter,
         
         if config.export.export_analytics:
             analytics_file = output_path / "analytics.json"
-            with open(analytics_file, 'w', encoding='utf-8') as f:
-                json.dump(analytics, f, indent=2, ensure_ascii=False, default=str)
+            crawler.export_analytics(str(analytics_file))
             console.print(f"📊 Analytics saved to {analytics_file}")
         
         if gallery:
@@ -317,6 +326,10 @@ def crawl(profile, keywords, count, output, format, quality_filter,
         console.print("\n⚠️  Crawling interrupted by user", style="yellow")
     except Exception as e:
         console.print(f"\n❌ Error: {e}", style="red")
+    finally:
+        if profiler is not None:
+            files = profiler.stop()
+            console.print(f"\n🔥 Profile saved to {', '.join(files.values())}")
 
 
 @cli.command()
@@ -391,6 +404,44 @@ def analyze(analytics_file):
         console.print("💡 Consider targeting more popular keywords")
 
 
+@cli.command('merge-analytics')
+@click.argument('shard_files', nargs=-1, required=True, type=click.Path(exists=True))
+@click.option('--output', '-o', default='merged_analytics.json', help='Merged analytics file')
+def merge_analytics(shard_files, output):
+    """🧩 Merge analytics shards from parallel workers or daily runs"""
+    merged = None
+    merged_count = 0
+    processing_stats = {}
+    # one shard in memory at a time
+    for shard_file in shard_files:
+        with open(shard_file, 'r', encoding='utf-8') as f:
+            shard = json.load(f)
+        if 'state' not in shard:
+            console.print(f"⚠️  Skipping {shard_file}: no mergeable state", style="yellow")
+            continue
+        partial = AnalyticsAggregator.from_dict(shard['state'])
+        try:
+            merged = partial if merged is None else merged.merge(partial)
+        except ValueError as e:
+            raise click.ClickException(f"{shard_file}: {e}")
+        merged_count += 1
+        for key, value in shard.get('processing_stats', {}).items():
+            processing_stats[key] = processing_stats.get(key, 0) + value
+    
+    if merged is None:
+        raise click.ClickException("No mergeable analytics found")
+    
+    analytics = merged.report(processing_stats)
+    analytics['state'] = merged.to_dict()
+    with open(output, 'w', encoding='utf-8') as f:
+        json.dump(analytics, f, indent=2, ensure_ascii=False, default=str)
+    
+    cli_handler = EnhancedCLI()
+    cli_handler.show_stats_table(analytics)
+    cli_handler.show_category_distribution(analytics)
+    console.print(f"📊 Merged {merged_count} of {len(shard_files)} shards into {output}")
+
+
 @cli.command()
 def presets():
     """📋 Show available search presets"""
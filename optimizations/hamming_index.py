@@ -0,0 +1,109 @@
+"""Multi-index hashing for Hamming-distance lookups over perceptual and SimHash fingerprints"""
+
+from pathlib import Path
+from typing import Dict, Hashable, List, Optional, Tuple, Union
+
+import numpy as np
+
+
+class HammingIndex:
+    """
+    Index of fixed-width hashes answering "all entries within distance r"
+
+    The hash is split into ``max_distance + 1`` disjoint chunks. Two hashes
+    within ``max_distance`` bits must agree exactly on at least one chunk, so
+    a query only verifies entries sharing a chunk value instead of scanning
+    every stored hash.
+
+    Args:
+        max_distance: Largest Hamming distance counted as a match
+        bits: Width of the indexed hashes
+        label: Free-form tag saved with the index, e.g. how the hashes were made
+    """
+
+    def __init__(self, max_distance: int = 4, bits: int = 64, label: str = ''):
+        if not 0 <= max_distance < bits:
+            raise ValueError(f"max_distance must be in [0, {bits})")
+        self.max_distance = max_distance
+        self.bits = bits
+        self.label = label
+        chunks = max_distance + 1
+        widths = [bits // chunks + (1 if i < bits % chunks else 0) for i in range(chunks)]
+        self._chunks: List[Tuple[int, int]] = []
+        shift = 0
+        for width in widths:
+            self._chunks.append((shift, (1 << width) - 1))
+            shift += width
+        self._tables: List[Dict[int, List[int]]] = [{} for _ in self._chunks]
+        self._keys: List[Hashable] = []
+        self._hashes: List[Optional[int]] = []
+        self._slots: Dict[Hashable, int] = {}
+
+    def __len__(self) -> int:
+        return len(self._slots)
+
+    def __contains__(self, key: Hashable) -> bool:
+        return key in self._slots
+
+    def get(self, key: Hashable) -> Optional[int]:
+        slot = self._slots.get(key)
+        return None if slot is None else self._hashes[slot]
+
+    def items(self) -> List[Tuple[Hashable, int]]:
+        """Live ``(key, hash)`` pairs in insertion order"""
+        return [(self._keys[slot], self._hashes[slot]) for slot in self._slots.values()]
+
+    def add(self, key: Hashable, value: Union[int, str]) -> None:
+        """Store ``value`` (int or hex string) under ``key``, replacing any earlier value"""
+        value = int(value, 16) if isinstance(value, str) else value
+        old = self._slots.get(key)
+        if old is not None:
+            if self._hashes[old] == value:
+                return
+            # leave a tombstone; the stale slot is skipped by queries
+            self._hashes[old] = None
+        slot = len(self._hashes)
+        self._keys.append(key)
+        self._hashes.append(value)
+        self._slots[key] = slot
+        for table, (shift, mask) in zip(self._tables, self._chunks):
+            table.setdefault((value >> shift) & mask, []).append(slot)
+
+    def query(self, value: Union[int, str], max_distance: Optional[int] = None) -> List[Tuple[Hashable, int]]:
+        """Entries within ``max_distance`` bits of ``value`` as (key, distance), closest first"""
+        value = int(value, 16) if isinstance(value, str) else value
+        max_distance = self.max_distance if max_distance is None else max_distance
+        if max_distance > self.max_distance:
+            # the chunk guarantee no longer holds
+            slots = range(len(self._hashes))
+        else:
+            slots = set()
+            for table, (shift, mask) in zip(self._tables, self._chunks):
+                slots.update(table.get((value >> shift) & mask, ()))
+        matches = []
+        for slot in slots:
+            stored = self._hashes[slot]
+            if stored is None:
+                continue
+            distance = (stored ^ value).bit_count()
+            if distance <= max_distance:
+                matches.append((self._keys[slot], distance))
+        return sorted(matches, key=lambda m: m[1])
+
+    def save(self, path: Union[str, Path]) -> None:
+        """Write the live entries to an ``.npz`` file"""
+        live = self.items()
+        keys = np.array([str(k) for k, _ in live], dtype=str)
+        hashes = np.array([h for _, h in live], dtype=np.uint64)
+        with open(path, 'wb') as f:
+            np.savez(f, keys=keys, hashes=hashes, max_distance=self.max_distance, bits=self.bits, label=self.label)
+
+    @classmethod
+    def load(cls, path: Union[str, Path]) -> "HammingIndex":
+        """Rebuild an index written by :meth:`save`; keys come back as strings"""
+        with np.load(path) as data:
+            label = str(data['label']) if 'label' in data.files else ''
+            index = cls(int(data['max_distance']), int(data['bits']), label)
+            for key, value in zip(data['keys'].tolist(), data['hashes'].tolist()):
+                index.add(key, value)
+        return index
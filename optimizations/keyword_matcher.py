@@ -0,0 +1,155 @@
+"""Aho–Corasick keyword matching for content categories and spam indicators"""
+
+from collections import deque
+from typing import Dict, Iterable, List, Set
+
+import numpy as np
+
+DEFAULT_CATEGORIES: Dict[str, List[str]] = {
+    'fashion': ['穿搭', '时尚', 'outfit', 'fashion', 'ootd', '搭配'],
+    'food': ['美食', '食谱', 'food', 'recipe', 'cooking', '做菜'],
+    'travel': ['旅行', 'travel', '景点', 'destination', '旅游'],
+    'beauty': ['化妆', '美妆', 'makeup', 'beauty', '护肤'],
+}
+
+DEFAULT_SPAM_INDICATORS: List[str] = ['点击', '关注', '私信', 'follow', 'click']
+
+# Below this many unfinished texts the batch scan finishes them one by one
+_LOCKSTEP_MIN_ACTIVE = 64
+
+
+class KeywordMatcher:
+    """
+    Find every labelled keyword occurring in a text in one pass
+
+    The keywords are compiled once into an Aho–Corasick automaton expanded to
+    a full transition table over the characters that occur in any keyword;
+    all other characters reset to the root. :meth:`match` walks one text,
+    :meth:`match_batch` advances many texts through the table in lockstep
+    with NumPy.
+
+    Args:
+        keywords: Keyword lists by label, e.g. ``{'food': ['美食', 'recipe']}``.
+            Matching is case-sensitive, so pass lower-case keywords and text.
+    """
+
+    def __init__(self, keywords: Dict[str, Iterable[str]]):
+        self.labels: Dict[str, List[str]] = {label: [k for k in words if k] for label, words in keywords.items()}
+        self.keywords: List[str] = list(dict.fromkeys(k for words in self.labels.values() for k in words))
+        self._keyword_labels: Dict[str, Set[str]] = {k: set() for k in self.keywords}
+        for label, words in self.labels.items():
+            for k in words:
+                self._keyword_labels[k].add(label)
+
+        goto: List[Dict[str, int]] = [{}]
+        outputs: List[Set[int]] = [set()]
+        for index, keyword in enumerate(self.keywords):
+            state = 0
+            for ch in keyword:
+                if ch not in goto[state]:
+                    goto.append({})
+                    outputs.append(set())
+                    goto[state][ch] = len(goto) - 1
+                state = goto[state][ch]
+            outputs[state].add(index)
+
+        alphabet = sorted({ch for keyword in self.keywords for ch in keyword})
+        self._symbols = {ch: i + 1 for i, ch in enumerate(alphabet)}
+        self._alphabet_codes = np.array([ord(ch) for ch in alphabet], dtype=np.uint32)
+        delta = np.zeros((len(goto), len(alphabet) + 1), dtype=np.int32)
+        fail = [0] * len(goto)
+        queue = deque()
+        for ch, child in goto[0].items():
+            delta[0, self._symbols[ch]] = child
+            queue.append(child)
+        while queue:
+            state = queue.popleft()
+            outputs[state] |= outputs[fail[state]]
+            delta[state] = delta[fail[state]]
+            for ch, child in goto[state].items():
+                symbol = self._symbols[ch]
+                fail[child] = delta[fail[state], symbol]
+                delta[state, symbol] = child
+                queue.append(child)
+
+        self._delta = delta
+        self._delta_rows = delta.tolist()
+        self._outputs = [frozenset(o) for o in outputs]
+        self._has_output = np.array([bool(o) for o in outputs], dtype=bool)
+
+    def _scan(self, symbols: Iterable[int], state: int = 0) -> Set[int]:
+        found: Set[int] = set()
+        rows, outputs = self._delta_rows, self._outputs
+        for symbol in symbols:
+            state = rows[state][symbol]
+            if outputs[state]:
+                found |= outputs[state]
+        return found
+
+    def _group(self, found: Iterable[int]) -> Dict[str, Set[str]]:
+        matches: Dict[str, Set[str]] = {}
+        for index in found:
+            keyword = self.keywords[index]
+            for label in self._keyword_labels[keyword]:
+                matches.setdefault(label, set()).add(keyword)
+        return matches
+
+    def find(self, text: str) -> Set[str]:
+        """Keywords occurring in ``text``"""
+        symbols = self._symbols
+        return {self.keywords[i] for i in self._scan(symbols.get(ch, 0) for ch in text)}
+
+    def match(self, text: str) -> Dict[str, Set[str]]:
+        """Matched keywords grouped by label; labels without a match are absent"""
+        symbols = self._symbols
+        return self._group(self._scan(symbols.get(ch, 0) for ch in text))
+
+    def match_exact(self, word: str) -> Set[str]:
+        """Labels whose keyword list contains ``word`` itself, e.g. a hashtag"""
+        return self._keyword_labels.get(word, set())
+
+    def match_batch(self, texts: List[str]) -> List[Dict[str, Set[str]]]:
+        """:meth:`match` for many texts, advancing all of them one character per step"""
+        n = len(texts)
+        if n == 0 or not self.keywords:
+            return [{} for _ in texts]
+        lengths = np.fromiter(map(len, texts), dtype=np.int64, count=n)
+        codes = np.frombuffer(''.join(texts).encode('utf-32-le'), dtype=np.uint32)
+        symbols = np.searchsorted(self._alphabet_codes, codes)
+        in_alphabet = symbols < len(self._alphabet_codes)
+        in_alphabet[in_alphabet] = self._alphabet_codes[symbols[in_alphabet]] == codes[in_alphabet]
+        symbols = np.where(in_alphabet, symbols + 1, 0)
+
+        starts = np.concatenate(([0], np.cumsum(lengths)[:-1]))
+        order = np.argsort(-lengths, kind='stable')
+        sorted_lengths, sorted_starts = lengths[order], starts[order]
+        # texts are sorted longest first, so the unfinished ones at each step are a prefix
+        active_counts = np.searchsorted(-sorted_lengths, -np.arange(sorted_lengths[0]), side='left').tolist()
+        state = np.zeros(n, dtype=np.int32)
+        hit_rows, hit_states = [], []
+        found: Dict[int, Set[int]] = {}
+        for step, active in enumerate(active_counts):
+            if active < _LOCKSTEP_MIN_ACTIVE:
+                for row in range(active):
+                    start, length = sorted_starts[row], sorted_lengths[row]
+                    tail = symbols[start + step:start + length].tolist()
+                    matched = self._scan(tail, int(state[row]))
+                    if matched:
+                        found.setdefault(row, set()).update(matched)
+                break
+            current = self._delta[state[:active], symbols[sorted_starts[:active] + step]]
+            state[:active] = current
+            hit = self._has_output[current]
+            if hit.any():
+                hit_rows.append(np.flatnonzero(hit))
+                hit_states.append(current[hit])
+
+        if hit_rows:
+            keys = np.sort(np.concatenate(hit_rows) * len(self._outputs) + np.concatenate(hit_states))
+            keys = keys[np.concatenate(([True], keys[1:] != keys[:-1]))]
+            for row, s in zip(*divmod(keys, len(self._outputs))):
+                found.setdefault(int(row), set()).update(self._outputs[s])
+        matches: List[Dict[str, Set[str]]] = [{} for _ in texts]
+        for row, indices in found.items():
+            matches[order[row]] = self._group(indices)
+        return matches
@@ -0,0 +1,207 @@
+"""Compact note records for holding very large crawls in memory
+
+``NoteRecord`` is a slotted drop-in for ``ContentItem``: the same attribute
+names, but interned author/user ids, integer counts and an epoch-second
+timestamp instead of a ``datetime``. ``NoteBatch`` stores many notes column
+by column in typed arrays for bulk operations.
+"""
+
+import sys
+from array import array
+from datetime import datetime
+from typing import Any, Dict, Iterable, Iterator, List, Optional
+
+import numpy as np
+
+from xhs_utils.search_filter import parse_count
+
+
+def _intern(value: Optional[str]) -> str:
+    return sys.intern(value) if value else ''
+
+
+def to_epoch(value: Any) -> int:
+    """Epoch seconds from a ``datetime``, a (millisecond) timestamp or a ``timestamp_to_str`` string; 0 if unknown"""
+    if not value:
+        return 0
+    if isinstance(value, datetime):
+        return int(value.timestamp())
+    if isinstance(value, (int, float)):
+        # the API reports milliseconds
+        return int(value // 1000 if value > 1e11 else value)
+    try:
+        return int(datetime.strptime(value, '%Y-%m-%d %H:%M:%S').timestamp())
+    except (TypeError, ValueError):
+        return 0
+
+
+class NoteRecord:
+    """
+    A ``ContentItem`` without the per-instance ``__dict__`` and lists
+
+    Accepted wherever ``SmartCrawler`` and ``AnalyticsAggregator`` take a
+    ``ContentItem``. ``publish_time`` is derived from ``publish_ts`` on
+    access; list fields are stored as tuples.
+    """
+
+    __slots__ = (
+        'id', 'url', 'title', 'content', 'author', 'author_id', 'publish_ts',
+        'likes', 'comments', 'shares', 'collects', 'note_type', 'ip_location',
+        'media_urls', 'media_types', 'hashtags', 'categories',
+        'sentiment_score', 'quality_score', 'duplicate_hash',
+    )
+
+    def __init__(self, id: str, url: str = '', title: str = '', content: str = '', author: str = '',
+                 author_id: str = '', publish_ts: int = 0, likes: Any = 0, comments: Any = 0,
+                 shares: Any = 0, collects: Any = 0, note_type: str = '', ip_location: str = '',
+                 media_urls: Iterable[str] = (), media_types: Iterable[str] = (),
+                 hashtags: Iterable[str] = (), categories: Iterable[str] = (),
+                 sentiment_score: float = 0.0, quality_score: float = 0.0, duplicate_hash: str = ''):
+        self.id = id
+        self.url = url
+        self.title = title
+        self.content = content
+        self.author = _intern(author)
+        self.author_id = _intern(author_id)
+        self.publish_ts = int(publish_ts)
+        self.likes = parse_count(likes)
+        self.comments = parse_count(comments)
+        self.shares = parse_count(shares)
+        self.collects = parse_count(collects)
+        self.note_type = _intern(note_type)
+        self.ip_location = _intern(ip_location)
+        self.media_urls = tuple(media_urls)
+        self.media_types = tuple(map(_intern, media_types))
+        self.hashtags = tuple(map(_intern, hashtags))
+        self.categories = tuple(map(_intern, categories))
+        self.sentiment_score = sentiment_score
+        self.quality_score = quality_score
+        self.duplicate_hash = duplicate_hash
+
+    @property
+    def publish_time(self) -> Optional[datetime]:
+        return datetime.fromtimestamp(self.publish_ts) if self.publish_ts else None
+
+    @publish_time.setter
+    def publish_time(self, value: Optional[datetime]) -> None:
+        self.publish_ts = to_epoch(value)
+
+    @classmethod
+    def from_note_info(cls, note: Dict[str, Any]) -> "NoteRecord":
+        """Build from a ``handle_note_info`` dict"""
+        media_urls = list(note.get('image_list') or [])
+        media_types = ['image'] * len(media_urls)
+        if note.get('video_addr'):
+            media_urls.append(note['video_addr'])
+            media_types.append('video')
+        return cls(
+            id=note['note_id'], url=note.get('note_url', ''), title=note.get('title', ''),
+            content=note.get('desc', ''), author=note.get('nickname', ''), author_id=note.get('user_id', ''),
+            publish_ts=to_epoch(note.get('upload_time')), likes=note.get('liked_count'),
+            comments=note.get('comment_count'), shares=note.get('share_count'),
+            collects=note.get('collected_count'), note_type=note.get('note_type', ''),
+            ip_location=note.get('ip_location', ''), media_urls=media_urls, media_types=media_types,
+            hashtags=note.get('tags') or (),
+        )
+
+    @classmethod
+    def from_content_item(cls, item) -> "NoteRecord":
+        return cls(
+            id=item.id, url=item.url, title=item.title, content=item.content, author=item.author,
+            author_id=item.author_id, publish_ts=to_epoch(item.publish_time), likes=item.likes,
+            comments=item.comments, shares=item.shares, ip_location=getattr(item, 'ip_location', ''),
+            media_urls=item.media_urls, media_types=item.media_types, hashtags=item.hashtags,
+            categories=item.categories, sentiment_score=item.sentiment_score,
+            quality_score=item.quality_score, duplicate_hash=item.duplicate_hash,
+        )
+
+    def __repr__(self) -> str:
+        return f"NoteRecord(id={self.id!r}, author={self.author!r}, likes={self.likes}, publish_ts={self.publish_ts})"
+
+
+class NoteBatch:
+    """
+    Notes stored column by column
+
+    Counts and timestamps live in ``array('q')`` columns, scores in
+    ``array('d')``, and low-cardinality strings (author, ids, location, note
+    type) as ``array('I')`` codes into one shared string table. Indexing or
+    iterating yields ``NoteRecord`` copies; :meth:`column` and :meth:`codes`
+    give NumPy arrays for bulk work.
+    """
+
+    CODED_COLUMNS = ('author', 'author_id', 'ip_location', 'note_type')
+    INT_COLUMNS = ('publish_ts', 'likes', 'comments', 'shares', 'collects')
+    FLOAT_COLUMNS = ('sentiment_score', 'quality_score')
+    OBJECT_COLUMNS = ('id', 'url', 'title', 'content', 'duplicate_hash',
+                      'media_urls', 'media_types', 'hashtags', 'categories')
+
+    def __init__(self, records: Iterable = ()):
+        """``records`` may be ``NoteRecord`` or ``ContentItem`` objects"""
+        self.strings: List[str] = []
+        self._string_codes: Dict[str, int] = {}
+        self._columns: Dict[str, Any] = {}
+        for name in self.CODED_COLUMNS:
+            self._columns[name] = array('I')
+        for name in self.INT_COLUMNS:
+            self._columns[name] = array('q')
+        for name in self.FLOAT_COLUMNS:
+            self._columns[name] = array('d')
+        for name in self.OBJECT_COLUMNS:
+            self._columns[name] = []
+        self.extend(records)
+
+    def _code(self, value: str) -> int:
+        code = self._string_codes.get(value)
+        if code is None:
+            code = self._string_codes[value] = len(self.strings)
+            self.strings.append(value)
+        return code
+
+    def append(self, record) -> None:
+        if not isinstance(record, NoteRecord):
+            record = NoteRecord.from_content_item(record)
+        columns = self._columns
+        for name in self.CODED_COLUMNS:
+            columns[name].append(self._code(getattr(record, name)))
+        for name in self.INT_COLUMNS + self.FLOAT_COLUMNS:
+            columns[name].append(getattr(record, name))
+        for name in self.OBJECT_COLUMNS:
+            value = getattr(record, name)
+            columns[name].append(tuple(value) if isinstance(value, list) else value)
+
+    def extend(self, records: Iterable) -> None:
+        for record in records:
+            self.append(record)
+
+    def __len__(self) -> int:
+        return len(self._columns['id'])
+
+    def __getitem__(self, index: int) -> NoteRecord:
+        columns, strings = self._columns, self.strings
+        record = NoteRecord.__new__(NoteRecord)
+        for name in self.CODED_COLUMNS:
+            setattr(record, name, strings[columns[name][index]])
+        for name in self.INT_COLUMNS + self.FLOAT_COLUMNS + self.OBJECT_COLUMNS:
+            setattr(record, name, columns[name][index])
+        return record
+
+    def __iter__(self) -> Iterator[NoteRecord]:
+        for index in range(len(self)):
+            yield self[index]
+
+    def column(self, name: str) -> np.ndarray:
+        """A numeric column as a NumPy array (a copy, so the batch can keep growing)"""
+        if name in self.CODED_COLUMNS:
+            return np.array([self.strings[code] for code in self._columns[name]], dtype=object)
+        if name in self.OBJECT_COLUMNS:
+            return np.array(self._columns[name], dtype=object)
+        return np.array(self._columns[name])
+
+    def codes(self, name: str) -> np.ndarray:
+        """String-table codes of a coded column; decode with ``batch.strings[code]``"""
+        return np.array(self._columns[name], dtype=np.int64)
+
+    def values(self, name: str) -> List[Any]:
+        """An object column, e.g. ``'hashtags'`` or ``'categories'``, as the stored list"""
+        return self._columns[name]
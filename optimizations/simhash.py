@@ -0,0 +1,71 @@
+"""64-bit SimHash fingerprints for mixed Chinese/Latin note and comment text"""
+
+import hashlib
+import re
+from collections import Counter
+from typing import Any, Dict, Iterable, List, Optional, Union
+
+import numpy as np
+
+_LATIN_RE = re.compile(r'[a-z0-9]+')
+_CJK_RE = re.compile(r'[\u3400-\u4dbf\u4e00-\u9fff\uf900-\ufaff]+')
+_BITS = np.arange(63, -1, -1, dtype=np.uint64)
+
+
+def tokenize(text: str) -> List[str]:
+    """Latin words and digits as whole tokens, Chinese runs as character bigrams
+
+    Punctuation, emoji and whitespace are dropped, so variations in them do
+    not change the fingerprint.
+    """
+    text = text.lower()
+    tokens = _LATIN_RE.findall(text)
+    for run in _CJK_RE.findall(text):
+        if len(run) == 1:
+            tokens.append(run)
+        else:
+            tokens.extend(run[i:i + 2] for i in range(len(run) - 1))
+    return tokens
+
+
+def _token_hash(token: str) -> int:
+    return int.from_bytes(hashlib.blake2b(token.encode('utf-8'), digest_size=8).digest(), 'big')
+
+
+def simhash(text: Union[str, Iterable[str]]) -> Optional[int]:
+    """64-bit SimHash of ``text`` (or of pre-tokenized input), weighted by token counts
+
+    Returns None when there are no tokens, e.g. for empty, emoji-only or
+    punctuation-only text; such texts carry nothing to compare.
+    """
+    counts = Counter(tokenize(text) if isinstance(text, str) else text)
+    if not counts:
+        return None
+    hashes = np.array([_token_hash(t) for t in counts], dtype=np.uint64)
+    weights = np.array(list(counts.values()), dtype=np.int64)
+    bits = ((hashes[:, None] >> _BITS) & np.uint64(1)).astype(np.int64)
+    votes = weights @ (2 * bits - 1)
+    value = 0
+    for bit in votes > 0:
+        value = (value << 1) | int(bit)
+    return value
+
+
+def note_simhash(note: Dict[str, Any]) -> Optional[int]:
+    """Fingerprint of a note's ``title`` and ``desc`` (``handle_note_info`` output)"""
+    return simhash(f"{note.get('title') or ''} {note.get('desc') or ''}")
+
+
+def comment_simhash(comment: Dict[str, Any]) -> Optional[int]:
+    """Fingerprint of a comment's ``content`` (``handle_comment_info`` output)"""
+    return simhash(comment.get('content') or '')
+
+
+def to_signed64(value: int) -> int:
+    """Map an unsigned fingerprint into SQLite's signed INTEGER range"""
+    return value - (1 << 64) if value >= 1 << 63 else value
+
+
+def from_signed64(value: int) -> int:
+    """Inverse of :func:`to_signed64`"""
+    return value + (1 << 64) if value < 0 else value
@@ -13,10 +13,20 @@ import json
 
 import aiohttp
 import aiofiles
+import numpy as np
 from PIL import Image
-import imagehash
-from sklearn.feature_extraction.text import TfidfVectorizer
-from sklearn.metrics.pairwise import cosine_similarity
+
+from xhs_utils.search_filter import SearchItemFilter
+from optimizations.text_dedup import MinHashLSH
+from optimizations.hamming_index import HammingIndex
+from optimizations.image_hashing import phash_files, phash_paths
+from optimizations.simhash import simhash
+from optimizations.keyword_matcher import KeywordMatcher, DEFAULT_CATEGORIES, DEFAULT_SPAM_INDICATORS
+from optimizations.analytics import AnalyticsAggregator
+from optimizations.records import NoteBatch
+
+# Label of the spam indicators inside the shared keyword matcher
+SPAM_LABEL = '__spam__'
 
 
 @dataclass
@@ -39,6 +49,7 @@ class ContentItem:
     sentiment_score: float = 0.0
     quality_score: float = 0.0
     duplicate_hash: str = ""
+    ip_location: str = ""
     
     def __post_init__(self):
         if self.media_urls is None:
@@ -54,11 +65,32 @@ class ContentItem:
 class DuplicateDetector:
     """Advanced duplicate detection using multiple methods"""
     
-    def __init__(self, similarity_threshold: float = 0.85):
+    def __init__(self, similarity_threshold: float = 0.85, image_hash_distance: int = 4,
+                 image_index_path: Optional[str] = None, simhash_distance: int = 3,
+                 image_hash_draft: bool = False):
         self.similarity_threshold = similarity_threshold
-        self.text_vectorizer = TfidfVectorizer(stop_words='english', max_features=1000)
+        self.image_hash_draft = image_hash_draft
         self.seen_hashes: Set[str] = set()
-        self.image_hashes: Dict[str, str] = {}
+        self.text_index = MinHashLSH(threshold=similarity_threshold)
+        self.simhash_index = HammingIndex(max_distance=simhash_distance)
+        self.image_index_path = image_index_path
+        # draft and exact hashes of one image can differ, so never share an index
+        label = 'phash-draft' if image_hash_draft else 'phash'
+        if image_index_path and Path(image_index_path).exists():
+            self.image_index = HammingIndex.load(image_index_path)
+            if self.image_index.label != label:
+                raise ValueError(
+                    f"{image_index_path} holds {self.image_index.label or 'unlabelled'} hashes, "
+                    f"expected {label}; use another image_index_path"
+                )
+            if self.image_index.max_distance != image_hash_distance:
+                # the chunk layout depends on max_distance, so re-index the saved hashes
+                loaded = self.image_index
+                self.image_index = HammingIndex(image_hash_distance, loaded.bits, label)
+                for key, value in loaded.items():
+                    self.image_index.add(key, value)
+        else:
+            self.image_index = HammingIndex(max_distance=image_hash_distance, label=label)
     
     def compute_text_hash(self, content: str) -> str:
         """Compute hash for text content"""
@@ -67,11 +99,11 @@ class DuplicateDetector:
     
     def compute_image_hash(self, image_path: str) -> str:
         """Compute perceptual hash for images"""
-        try:
-            with Image.open(image_path) as img:
-                return str(imagehash.phash(img))
-        except Exception:
-            return ""
+        return phash_paths([image_path], draft=self.image_hash_draft)[0]
+    
+    def compute_image_hashes(self, image_paths: List[str], max_workers: Optional[int] = 1) -> List[str]:
+        """Compute perceptual hashes for many images in batches, across processes with max_workers > 1"""
+        return phash_files(image_paths, max_workers=max_workers, draft=self.image_hash_draft)
     
     def is_duplicate_text(self, content: str) -> bool:
         """Check if text content is duplicate"""
@@ -81,39 +113,78 @@ class DuplicateDetector:
         self.seen_hashes.add(text_hash)
         return False
     
-    def is_duplicate_image(self, image_path: str, content_id: str) -> bool:
+    def is_near_duplicate_text(self, content: str, content_id: Optional[str] = None) -> bool:
+        """Check if text is within similarity_threshold of any earlier content"""
+        signature = self.text_index.signature(content)
+        if self.text_index.query(content, signature):
+            return True
+        key = content_id if content_id is not None else len(self.text_index)
+        self.text_index.insert(key, content, signature)
+        return False
+    
+    def is_duplicate_simhash(self, content: str, content_id: Optional[str] = None,
+                             fingerprint: Optional[int] = None) -> bool:
+        """Check if the text's SimHash is within simhash_distance bits of earlier content
+
+        Text without any tokens has no fingerprint and is never a duplicate.
+        """
+        fingerprint = simhash(content) if fingerprint is None else fingerprint
+        if fingerprint is None:
+            return False
+        if any(key != content_id for key, _ in self.simhash_index.query(fingerprint)):
+            return True
+        key = content_id if content_id is not None else len(self.simhash_index)
+        self.simhash_index.add(key, fingerprint)
+        return False
+    
+    def is_duplicate_image(self, image_path: str, content_id: str, img_hash: Optional[str] = None) -> bool:
         """Check if image is duplicate using perceptual hashing"""
-        img_hash = self.compute_image_hash(image_path)
+        if img_hash is None:
+            img_hash = self.compute_image_hash(image_path)
         if not img_hash:
             return False
         
-        # Check against existing hashes
-        for existing_id, existing_hash in self.image_hashes.items():
-            if existing_id != content_id:
-                # Compare hashes (lower difference = more similar)
-                diff = bin(int(img_hash, 16) ^ int(existing_hash, 16)).count('1')
-                if diff < 5:  # Very similar images
-                    return True
+        # Only hashes sharing an exact chunk with img_hash are compared
+        if any(existing_id != content_id for existing_id, _ in self.image_index.query(img_hash)):
+            return True
         
-        self.image_hashes[content_id] = img_hash
+        self.image_index.add(content_id, img_hash)
         return False
     
-    def compute_content_similarity(self, contents: List[str]) -> List[List[float]]:
-        """Compute text similarity matrix"""
-        if len(contents) < 2:
-            return [[1.0]]
-        
-        tfidf_matrix = self.text_vectorizer.fit_transform(contents)
-        similarity_matrix = cosine_similarity(tfidf_matrix)
-        return similarity_matrix.tolist()
+    def save_image_index(self):
+        """Persist image hashes so later runs detect duplicates of earlier downloads"""
+        if self.image_index_path:
+            self.image_index.save(self.image_index_path)
+    
+    def find_similar_pairs(self, contents: List[str]) -> List[Tuple[int, int, float]]:
+        """Index pairs ``(i, j, similarity)`` with ``i < j`` of texts within similarity_threshold
+        
+        Only texts sharing a MinHash LSH band are compared, instead of every pair.
+        """
+        index = MinHashLSH(threshold=self.similarity_threshold)
+        pairs = []
+        for j, content in enumerate(contents):
+            signature = index.signature(content)
+            pairs.extend((i, j, similarity) for i, similarity in index.query(content, signature))
+            index.insert(j, content, signature)
+        return sorted(pairs)
+
+
+# Lookup of the code points str.split() treats as whitespace; all are below
+# U+3001 and larger code points map to the final False entry
+_WHITESPACE_TABLE = np.array([chr(c).isspace() for c in range(0x3002)], dtype=bool)
 
 
 class ContentQualityAnalyzer:
     """Analyze and score content quality"""
     
-    def __init__(self):
+    def __init__(self, spam_indicators: Optional[List[str]] = None,
+                 categories: Optional[Dict[str, List[str]]] = None):
         self.min_content_length = 10
         self.min_image_resolution = (500, 500)
+        self.spam_indicators = list(DEFAULT_SPAM_INDICATORS if spam_indicators is None else spam_indicators)
+        # Category keywords share the automaton so one pass finds both
+        self.keyword_matcher = KeywordMatcher({**(categories or {}), SPAM_LABEL: self.spam_indicators})
     
     def score_text_quality(self, content: str) -> float:
         """Score text content quality (0-1)"""
@@ -134,8 +205,7 @@ class ContentQualityAnalyzer:
             score += 0.2
         
         # No spam indicators
-        spam_indicators = ['点击', '关注', '私信', 'follow', 'click']
-        spam_count = sum(1 for indicator in spam_indicators if indicator in content.lower())
+        spam_count = len(self.keyword_matcher.match(content.lower()).get(SPAM_LABEL, ()))
         if spam_count == 0:
             score += 0.3
         elif spam_count == 1:
@@ -192,19 +262,107 @@ class ContentQualityAnalyzer:
         # Weight the scores
         overall_score = (text_score * 0.4 + engagement_score * 0.6)
         return overall_score
+    
+    def score_text_quality_batch(self, contents: List[str],
+                                 matches: Optional[List[Dict[str, Set[str]]]] = None) -> np.ndarray:
+        """Vectorized ``score_text_quality`` over many texts, identical results
+
+        ``matches`` may pass in ``keyword_matcher.match_batch`` results for
+        the lowered contents when the caller already has them.
+        """
+        n = len(contents)
+        if n == 0:
+            return np.zeros(0)
+        rows = np.arange(n)
+        
+        # All items joined by '\x00' separators, decoded once to code points
+        lengths = np.fromiter(map(len, contents), dtype=np.int64, count=n)
+        joined = '\x00'.join(contents)
+        codes = np.frombuffer(joined.encode('utf-32-le'), dtype=np.uint32)
+        owner = np.repeat(rows, lengths + 1)[:-1]
+        separator = np.zeros(len(codes), dtype=bool)
+        separator[np.cumsum(lengths + 1)[:-1] - 1] = True
+        
+        lowered = joined.lower()
+        lowered_owner, lowered_separator = owner, separator
+        if len(lowered) != len(joined):
+            # a few characters lower-case to several code points
+            lowered_lengths = np.fromiter((len(c.lower()) for c in contents), dtype=np.int64, count=n)
+            lowered = '\x00'.join(c.lower() for c in contents)
+            lowered_owner = np.repeat(rows, lowered_lengths + 1)[:-1]
+            lowered_separator = np.zeros(len(lowered), dtype=bool)
+            lowered_separator[np.cumsum(lowered_lengths + 1)[:-1] - 1] = True
+        lowered_codes = np.frombuffer(lowered.encode('utf-32-le'), dtype=np.uint32)
+        
+        # Character variety: distinct (item, code point) keys of the lowered text
+        keys = np.sort(((lowered_owner << 21) | lowered_codes)[~lowered_separator])
+        distinct = np.ones(len(keys), dtype=bool)
+        distinct[1:] = keys[1:] != keys[:-1]
+        unique_chars = np.bincount(keys[distinct] >> 21, minlength=n)
+        
+        # Word count: non-space characters following a space or an item start
+        is_space = _WHITESPACE_TABLE[np.minimum(codes, len(_WHITESPACE_TABLE) - 1)] | separator
+        word_start = ~is_space
+        word_start[1:] &= is_space[:-1]
+        word_counts = np.bincount(owner[word_start], minlength=n)
+        
+        # Spam indicators, from the keyword matcher
+        if matches is None:
+            matches = self.keyword_matcher.match_batch([content.lower() for content in contents])
+        spam_counts = np.fromiter((len(m.get(SPAM_LABEL, ())) for m in matches), dtype=np.int64, count=n)
+        
+        # Same additions in the same order as score_text_quality
+        score = np.zeros(n)
+        score += np.where(lengths >= self.min_content_length, 0.3, 0.0)
+        score += np.where(unique_chars > 10, 0.2, 0.0)
+        score += np.where(word_counts >= 5, 0.2, 0.0)
+        score += np.select([spam_counts == 0, spam_counts == 1], [0.3, 0.1], 0.0)
+        return np.minimum(score, 1.0)
+    
+    def score_engagement_quality_batch(self, likes: np.ndarray, comments: np.ndarray) -> np.ndarray:
+        """Vectorized ``score_engagement_quality`` with estimated views"""
+        views = np.maximum(likes * 10, 100)
+        engagement_rate = (likes + comments * 2) / views
+        return np.select(
+            [engagement_rate > 0.1, engagement_rate > 0.05, engagement_rate > 0.02, engagement_rate > 0.01],
+            [1.0, 0.8, 0.6, 0.4],
+            0.2,
+        )
+    
+    def score_batch(self, items: List[ContentItem],
+                    matches: Optional[List[Dict[str, Set[str]]]] = None) -> np.ndarray:
+        """Compute ``compute_overall_quality`` for a whole batch as one array"""
+        text_scores = self.score_text_quality_batch([item.content for item in items], matches)
+        likes = np.fromiter((item.likes for item in items), dtype=np.int64, count=len(items))
+        comments = np.fromiter((item.comments for item in items), dtype=np.int64, count=len(items))
+        engagement_scores = self.score_engagement_quality_batch(likes, comments)
+        return text_scores * 0.4 + engagement_scores * 0.6
 
 
 class SmartCrawler:
     """Enhanced crawler with intelligence and optimization"""
     
-    def __init__(self, config, max_workers: int = 5):
+    def __init__(self, config, max_workers: int = 5, keep_items: bool = True):
         self.config = config
         self.max_workers = max_workers
-        self.duplicate_detector = DuplicateDetector(config.filters.similarity_threshold)
-        self.quality_analyzer = ContentQualityAnalyzer()
+        self.duplicate_detector = DuplicateDetector(
+            config.filters.similarity_threshold,
+            getattr(config.filters, 'image_hash_distance', 4),
+            getattr(config.filters, 'image_index_path', '') or None,
+            getattr(config.filters, 'simhash_distance', 3),
+            getattr(config.filters, 'image_hash_draft', False),
+        )
+        self.categories = getattr(config.filters, 'categories', None) or DEFAULT_CATEGORIES
+        self.quality_analyzer = ContentQualityAnalyzer(
+            getattr(config.filters, 'spam_indicators', None), self.categories
+        )
         self.executor = ThreadPoolExecutor(max_workers=max_workers)
         self.session = None
-        self.downloaded_items: List[ContentItem] = []
+        # With keep_items=False only the running analytics are kept
+        self.keep_items = keep_items
+        self.analytics_mode = getattr(config.export, 'analytics_mode', 'exact')
+        self.analytics = AnalyticsAggregator(mode=self.analytics_mode)
+        self._downloaded_items: List[ContentItem] = []
         self.stats = {
             'total_found': 0,
             'duplicates_filtered': 0,
@@ -213,6 +371,22 @@ class SmartCrawler:
             'failed_downloads': 0
         }
     
+    @property
+    def downloaded_items(self) -> List[ContentItem]:
+        return self._downloaded_items
+    
+    @downloaded_items.setter
+    def downloaded_items(self, items: List[ContentItem]):
+        """Replace the tracked items and rebuild the analytics from them; a ``NoteBatch`` is kept as is"""
+        self.analytics = AnalyticsAggregator(mode=self.analytics_mode)
+        self.analytics.add_many(items)
+        if not self.keep_items:
+            self._downloaded_items = []
+        elif isinstance(items, NoteBatch):
+            self._downloaded_items = items
+        else:
+            self._downloaded_items = list(items)
+    
     async def __aenter__(self):
         self.session = aiohttp.ClientSession(
             timeout=aiohttp.ClientTimeout(total=self.config.download.timeout_seconds),
@@ -223,51 +397,43 @@ class SmartCrawler:
     async def __aexit__(self, exc_type, exc_val, exc_tb):
         if self.session:
             await self.session.close()
+        self.duplicate_detector.save_image_index()
     
-    def categorize_content(self, item: ContentItem) -> List[str]:
-        """Auto-categorize content based on keywords and hashtags"""
-        categories = []
-        content_lower = item.content.lower()
-        hashtags_lower = [tag.lower() for tag in item.hashtags]
-        
-        # Fashion keywords
-        fashion_keywords = ['穿搭', '时尚', 'outfit', 'fashion', 'ootd', '搭配']
-        if any(keyword in content_lower for keyword in fashion_keywords) or \
-           any(keyword in hashtags_lower for keyword in fashion_keywords):
-            categories.append('fashion')
-        
-        # Food keywords
-        food_keywords = ['美食', '食谱', 'food', 'recipe', 'cooking', '做菜']
-        if any(keyword in content_lower for keyword in food_keywords) or \
-           any(keyword in hashtags_lower for keyword in food_keywords):
-            categories.append('food')
-        
-        # Travel keywords
-        travel_keywords = ['旅行', 'travel', '景点', 'destination', '旅游']
-        if any(keyword in content_lower for keyword in travel_keywords) or \
-           any(keyword in hashtags_lower for keyword in travel_keywords):
-            categories.append('travel')
-        
-        # Beauty keywords
-        beauty_keywords = ['化妆', '美妆', 'makeup', 'beauty', '护肤']
-        if any(keyword in content_lower for keyword in beauty_keywords) or \
-           any(keyword in hashtags_lower for keyword in beauty_keywords):
-            categories.append('beauty')
+    def categorize_content(self, item: ContentItem,
+                           matches: Optional[Dict[str, Set[str]]] = None) -> List[str]:
+        """Auto-categorize content based on keywords and hashtags
+
+        Keywords match anywhere in the content and hashtags match a keyword
+        exactly. ``matches`` may pass in the matcher result for the lowered
+        content.
+        """
+        matcher = self.quality_analyzer.keyword_matcher
+        if matches is None:
+            matches = matcher.match(item.content.lower())
+        matched = set(matches)
+        for tag in item.hashtags:
+            matched |= matcher.match_exact(tag.lower())
+        categories = [category for category in self.categories if category in matched]
         
         return categories if categories else ['general']
     
-    def filter_by_quality(self, item: ContentItem) -> bool:
-        """Filter content by quality score"""
+    def filter_by_quality(self, item: ContentItem, quality_score: Optional[float] = None) -> bool:
+        """Filter content by quality score, computing it unless precomputed"""
         if not self.config.filters.enable_quality_filter:
             return True
         
-        quality_score = self.quality_analyzer.compute_overall_quality(item)
+        if quality_score is None:
+            quality_score = self.quality_analyzer.compute_overall_quality(item)
         item.quality_score = quality_score
         
         # Use a default threshold if not set
         threshold = getattr(self.config.filters, 'quality_threshold', 0.5)
         return quality_score >= threshold
     
+    def build_search_filter(self) -> SearchItemFilter:
+        """Filter applying the search config to raw search items before detail fetches"""
+        return SearchItemFilter.from_search_config(self.config.search)
+    
     def filter_by_engagement(self, item: ContentItem) -> bool:
         """Filter by engagement thresholds"""
         return (item.likes >= self.config.search.min_likes and 
@@ -290,11 +456,22 @@ class SmartCrawler:
         
         return False
     
-    def should_include_content(self, item: ContentItem) -> bool:
+    def should_include_content(self, item: ContentItem, quality_score: Optional[float] = None) -> bool:
         """Comprehensive content filtering"""
         # Check duplicates
         if self.config.filters.enable_duplicate_detection:
-            if self.duplicate_detector.is_duplicate_text(item.content):
+            method = getattr(self.config.filters, 'text_dedup_method', 'exact')
+            if method == 'minhash':
+                duplicate = self.duplicate_detector.is_near_duplicate_text(item.content, item.id)
+            elif method == 'simhash':
+                text = f"{item.title} {item.content}"
+                fingerprint = simhash(text)
+                if fingerprint is not None:
+                    item.duplicate_hash = format(fingerprint, '016x')
+                duplicate = self.duplicate_detector.is_duplicate_simhash(text, item.id, fingerprint)
+            else:
+                duplicate = self.duplicate_detector.is_duplicate_text(item.content)
+            if duplicate:
                 self.stats['duplicates_filtered'] += 1
                 return False
         
@@ -307,7 +484,7 @@ class SmartCrawler:
             return False
         
         # Check quality
-        if not self.filter_by_quality(item):
+        if not self.filter_by_quality(item, quality_score):
             self.stats['quality_filtered'] += 1
             return False
         
@@ -334,96 +511,42 @@ class SmartCrawler:
         return False
     
     def process_batch(self, items: List[ContentItem]) -> List[ContentItem]:
-        """Process a batch of content items"""
+        """Process a batch of content items, ``NoteRecord``s, or a ``NoteBatch`` (returned as a ``NoteBatch``)"""
+        batch = items if isinstance(items, NoteBatch) else None
+        if batch is not None:
+            items = list(batch)
         processed_items = []
         
-        for item in items:
+        # One keyword pass and one scoring pass for the whole batch
+        matches = self.quality_analyzer.keyword_matcher.match_batch([item.content.lower() for item in items])
+        quality_scores = [None] * len(items)
+        if self.config.filters.enable_quality_filter:
+            quality_scores = self.quality_analyzer.score_batch(items, matches).tolist()
+        
+        for item, item_matches, quality_score in zip(items, matches, quality_scores):
             self.stats['total_found'] += 1
             
             # Auto-categorize
-            item.categories = self.categorize_content(item)
+            item.categories = self.categorize_content(item, item_matches)
             
             # Apply filters
-            if self.should_include_content(item):
+            if self.should_include_content(item, quality_score):
                 processed_items.append(item)
+                self.analytics.add(item)
+                if self.keep_items:
+                    self._downloaded_items.append(item)
         
-        return processed_items
+        return NoteBatch(processed_items) if batch is not None else processed_items
     
     def generate_analytics_report(self) -> Dict[str, Any]:
-        """Generate comprehensive analytics report"""
-        total_items = len(self.downloaded_items)
-        
-        if total_items == 0:
-            return {
-                'summary': {
-                    'total_items': 0,
-                    'average_quality_score': 0,
-                    'average_likes': 0,
-                    'average_comments': 0,
-                    'total_engagement': 0
-                },
-                'category_distribution': {},
-                'top_authors': [],
-                'time_distribution': {},
-                'processing_stats': self.stats,
-                'quality_breakdown': {
-                    'high_quality': 0,
-                    'medium_quality': 0,
-                    'low_quality': 0
-                }
-            }
-        
-        # Category distribution
-        category_counts = {}
-        for item in self.downloaded_items:
-            for category in item.categories:
-                category_counts[category] = category_counts.get(category, 0) + 1
-        
-        # Quality distribution
-        quality_scores = [item.quality_score for item in self.downloaded_items if item.quality_score > 0]
-        avg_quality = sum(quality_scores) / len(quality_scores) if quality_scores else 0
-        
-        # Engagement stats
-        total_likes = sum(item.likes for item in self.downloaded_items)
-        total_comments = sum(item.comments for item in self.downloaded_items)
-        avg_likes = total_likes / total_items
-        avg_comments = total_comments / total_items
-        
-        # Top authors
-        author_counts = {}
-        for item in self.downloaded_items:
-            author_counts[item.author] = author_counts.get(item.author, 0) + 1
-        top_authors = sorted(author_counts.items(), key=lambda x: x[1], reverse=True)[:10]
-        
-        # Time distribution
-        time_distribution = {}
-        for item in self.downloaded_items:
-            if item.publish_time:
-                date_key = item.publish_time.strftime('%Y-%m-%d')
-                time_distribution[date_key] = time_distribution.get(date_key, 0) + 1
-        
-        return {
-            'summary': {
-                'total_items': total_items,
-                'average_quality_score': round(avg_quality, 2),
-                'average_likes': round(avg_likes, 1),
-                'average_comments': round(avg_comments, 1),
-                'total_engagement': total_likes + total_comments
-            },
-            'category_distribution': category_counts,
-            'top_authors': top_authors,
-            'time_distribution': time_distribution,
-            'processing_stats': self.stats,
-            'quality_breakdown': {
-                'high_quality': len([i for i in self.downloaded_items if i.quality_score >= 0.8]),
-                'medium_quality': len([i for i in self.downloaded_items if 0.5 <= i.quality_score < 0.8]),
-                'low_quality': len([i for i in self.downloaded_items if i.quality_score < 0.5])
-            }
-        }
+        """Generate comprehensive analytics report from the running aggregates"""
+        return self.analytics.report(self.stats)
     
     def export_analytics(self, output_path: str):
         """Export analytics to JSON file"""
         analytics = self.generate_analytics_report()
+        # mergeable state, combined across shards by `enhanced_cli merge-analytics`
+        analytics['state'] = self.analytics.to_dict()
         
         with open(output_path, 'w', encoding='utf-8') as f:
             json.dump(analytics, f, indent=2, ensure_ascii=False, default=str)
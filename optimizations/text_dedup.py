@@ -0,0 +1,113 @@
+"""Near-duplicate text detection with character-shingle MinHash and LSH banding"""
+
+import hashlib
+import re
+from typing import Dict, Hashable, List, Optional, Tuple
+
+import numpy as np
+
+_MERSENNE_PRIME = np.uint64((1 << 61) - 1)
+_MAX_HASH = np.uint64((1 << 32) - 1)
+_WHITESPACE_RE = re.compile(r'\s+')
+
+
+def _false_probabilities(threshold: float, bands: int, rows: int) -> Tuple[float, float]:
+    """Probability mass of false positives below and false negatives above ``threshold``"""
+    below = np.linspace(0.0, threshold, 200)
+    above = np.linspace(threshold, 1.0, 200)
+    false_positive = np.mean(1 - (1 - below ** rows) ** bands) * threshold
+    false_negative = np.mean((1 - above ** rows) ** bands) * (1 - threshold)
+    return float(false_positive), float(false_negative)
+
+
+def optimal_bands(threshold: float, num_perm: int) -> Tuple[int, int]:
+    """Pick (bands, rows) with bands * rows <= num_perm minimising both error masses"""
+    best, best_error = (1, num_perm), float('inf')
+    for bands in range(1, num_perm + 1):
+        rows = num_perm // bands
+        false_positive, false_negative = _false_probabilities(threshold, bands, rows)
+        error = false_positive + false_negative
+        if error < best_error:
+            best, best_error = (bands, rows), error
+    return best
+
+
+def shingles(text: str, size: int = 3) -> List[str]:
+    """Overlapping character n-grams of the normalised text"""
+    text = _WHITESPACE_RE.sub(' ', text.lower()).strip()
+    if len(text) <= size:
+        return [text] if text else []
+    return [text[i:i + size] for i in range(len(text) - size + 1)]
+
+
+class MinHashLSH:
+    """
+    Streaming near-duplicate index over MinHash signatures
+
+    Texts are split into character shingles, which works for Chinese text
+    without a tokenizer. Each signature is cut into bands; texts sharing any
+    band are candidates, and candidates are confirmed by their estimated
+    Jaccard similarity. Inserts are incremental and a query only looks at the
+    buckets of its own bands.
+
+    Args:
+        threshold: Minimum estimated Jaccard similarity counted as duplicate
+        num_perm: Number of hash permutations per signature
+        shingle_size: Characters per shingle
+        seed: Seed of the permutation parameters
+    """
+
+    def __init__(self, threshold: float = 0.85, num_perm: int = 128, shingle_size: int = 3, seed: int = 1):
+        self.threshold = threshold
+        self.num_perm = num_perm
+        self.shingle_size = shingle_size
+        self.bands, self.rows = optimal_bands(threshold, num_perm)
+        rng = np.random.RandomState(seed)
+        self._a = rng.randint(1, 1 << 32, size=num_perm, dtype=np.uint64)
+        self._b = rng.randint(0, 1 << 32, size=num_perm, dtype=np.uint64)
+        self._buckets: List[Dict[bytes, List[Hashable]]] = [{} for _ in range(self.bands)]
+        self._signatures: Dict[Hashable, bytes] = {}
+
+    def __len__(self) -> int:
+        return len(self._signatures)
+
+    def __contains__(self, key: Hashable) -> bool:
+        return key in self._signatures
+
+    def signature(self, text: str) -> np.ndarray:
+        """MinHash signature of ``text`` as uint32 values"""
+        grams = shingles(text, self.shingle_size)
+        if not grams:
+            return np.full(self.num_perm, _MAX_HASH, dtype=np.uint32)
+        hashes = np.fromiter(
+            (int.from_bytes(hashlib.blake2b(g.encode('utf-8'), digest_size=4).digest(), 'little') for g in set(grams)),
+            dtype=np.uint64,
+        )
+        permuted = (np.outer(hashes, self._a) + self._b) % _MERSENNE_PRIME & _MAX_HASH
+        return permuted.min(axis=0).astype(np.uint32)
+
+    def _band_keys(self, signature: np.ndarray) -> List[bytes]:
+        return [signature[i * self.rows:(i + 1) * self.rows].tobytes() for i in range(self.bands)]
+
+    def insert(self, key: Hashable, text: str, signature: Optional[np.ndarray] = None) -> None:
+        """Add ``text`` under ``key``; a precomputed ``signature`` skips hashing"""
+        if key in self._signatures:
+            return
+        signature = self.signature(text) if signature is None else signature
+        self._signatures[key] = signature.tobytes()
+        for bucket, band in zip(self._buckets, self._band_keys(signature)):
+            bucket.setdefault(band, []).append(key)
+
+    def query(self, text: str, signature: Optional[np.ndarray] = None) -> List[Tuple[Hashable, float]]:
+        """Indexed keys whose estimated similarity to ``text`` reaches the threshold, best first"""
+        signature = self.signature(text) if signature is None else signature
+        candidates = set()
+        for bucket, band in zip(self._buckets, self._band_keys(signature)):
+            candidates.update(bucket.get(band, ()))
+        matches = []
+        for key in candidates:
+            stored = np.frombuffer(self._signatures[key], dtype=np.uint32)
+            similarity = float(np.mean(stored == signature))
+            if similarity >= self.threshold:
+                matches.append((key, similarity))
+        return sorted(matches, key=lambda m: m[1], reverse=True)
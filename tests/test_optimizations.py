@@ -107,7 +107,189 @@ class TestDuplicateDetector(unittest.TestCase):
         self.assertFalse(self.detector.is_duplicate_text(content3))
         
         print("✓ Text duplicate detection working correctly")
-    
+
+    def test_near_duplicate_text_detection(self):
+        """Test MinHash/LSH near-duplicate detection"""
+        original = "今天分享一个超级好看的穿搭，OOTD来啦！这套搭配非常适合春天，既时尚又舒适。"
+        edited = "今天分享一个超级好看的穿搭，OOTD来啦！这套搭配非常适合春天，既时尚又舒适～"
+        unrelated = "周末去了一家新开的火锅店，味道很不错，推荐给大家。"
+
+        self.assertFalse(self.detector.is_near_duplicate_text(original, "a"))
+        self.assertTrue(self.detector.is_near_duplicate_text(edited, "b"))
+        self.assertFalse(self.detector.is_near_duplicate_text(unrelated, "c"))
+        self.assertEqual(len(self.detector.text_index), 2)
+
+        print("✓ Near-duplicate text detection working correctly")
+
+    def test_find_similar_pairs(self):
+        """Test LSH-backed similar pair search and the exact default"""
+        contents = [
+            "今天分享一个超级好看的穿搭，OOTD来啦！这套搭配非常适合春天，既时尚又舒适。",
+            "周末去了一家新开的火锅店，味道很不错，推荐给大家。",
+            "今天分享一个超级好看的穿搭，OOTD来啦！这套搭配非常适合春天，既时尚又舒适～",
+        ]
+        pairs = self.detector.find_similar_pairs(contents)
+        self.assertEqual([(i, j) for i, j, _ in pairs], [(0, 2)])
+        self.assertGreaterEqual(pairs[0][2], 0.85)
+        self.assertEqual(FilterConfig().text_dedup_method, 'exact')
+
+        print("✓ Similar pair search working correctly")
+
+    def test_simhash_duplicate_detection(self):
+        """Test SimHash fingerprints and their Hamming index"""
+        from optimizations.simhash import simhash, tokenize, to_signed64, from_signed64
+
+        original = "今天分享一个超级好看的穿搭，OOTD来啦！这套搭配非常适合春天，既时尚又舒适。"
+        spaced = "今天分享一个超级好看的穿搭  OOTD来啦!! 这套搭配非常适合春天，既时尚又舒适～"
+        unrelated = "周末去了一家新开的火锅店，味道很不错，推荐给大家。"
+
+        self.assertEqual(tokenize("今天 OOTD好"), ["ootd", "今天", "好"])
+        fingerprint = simhash(original)
+        self.assertEqual(from_signed64(to_signed64(fingerprint)), fingerprint)
+        self.assertLess(abs(to_signed64(fingerprint)), 1 << 63)
+
+        self.assertFalse(self.detector.is_duplicate_simhash(original, "a"))
+        self.assertTrue(self.detector.is_duplicate_simhash(spaced, "b"))
+        self.assertFalse(self.detector.is_duplicate_simhash(unrelated, "c"))
+        # texts without tokens have no fingerprint and never match each other
+        self.assertIsNone(simhash("🎉🎉！！"))
+        self.assertFalse(self.detector.is_duplicate_simhash("", "d"))
+        self.assertFalse(self.detector.is_duplicate_simhash("😀😀😀", "e"))
+
+        print("✓ SimHash duplicate detection working correctly")
+
+    def test_hamming_index_matches_linear_scan(self):
+        """Test multi-index hashing against brute force and persistence"""
+        import random
+        from optimizations.hamming_index import HammingIndex
+
+        rng = random.Random(7)
+        index = HammingIndex(max_distance=4)
+        stored = {}
+        base = rng.getrandbits(64)
+        for i in range(2000):
+            value = rng.getrandbits(64) if i % 2 else base ^ (1 << rng.randrange(64)) ^ (1 << rng.randrange(64))
+            stored[f"img{i}"] = value
+            index.add(f"img{i}", value)
+
+        probe = base ^ 1
+        expected = sorted(k for k, v in stored.items() if (v ^ probe).bit_count() <= 4)
+        self.assertEqual(sorted(k for k, _ in index.query(probe)), expected)
+
+        path = os.path.join(tempfile.mkdtemp(), "images.npz")
+        index.save(path)
+        self.assertEqual(sorted(k for k, _ in HammingIndex.load(path).query(probe)), expected)
+
+        print("✓ Hamming index lookups match a linear scan")
+
+    def test_image_duplicate_detection(self):
+        """Test perceptual image duplicate detection"""
+        from PIL import Image, ImageDraw
+
+        temp_dir = tempfile.mkdtemp()
+        paths = []
+        for name, box in (("a", (10, 10, 60, 60)), ("b", (10, 10, 60, 60)), ("c", (0, 40, 100, 100))):
+            img = Image.new("RGB", (100, 100), "white")
+            ImageDraw.Draw(img).rectangle(box, fill="black")
+            path = os.path.join(temp_dir, f"{name}.png")
+            img.save(path)
+            paths.append(path)
+
+        self.assertFalse(self.detector.is_duplicate_image(paths[0], "a"))
+        self.assertTrue(self.detector.is_duplicate_image(paths[1], "b"))
+        self.assertFalse(self.detector.is_duplicate_image(paths[2], "c"))
+
+        print("✓ Image duplicate detection working correctly")
+
+    def test_image_index_keeps_draft_and_exact_hashes_apart(self):
+        """Test that a persisted image index only reloads with the same hashing mode"""
+        path = os.path.join(tempfile.mkdtemp(), "images.npz")
+        exact = DuplicateDetector(image_index_path=path)
+        exact.image_index.add("a", "ff00ff00ff00ff00")
+        exact.save_image_index()
+
+        self.assertEqual(len(DuplicateDetector(image_index_path=path).image_index), 1)
+        with self.assertRaises(ValueError):
+            DuplicateDetector(image_index_path=path, image_hash_draft=True)
+
+        print("✓ Draft and exact image hashes kept in separate indexes")
+
+    def test_image_index_reloads_with_configured_distance(self):
+        """Test that a saved image index follows the current image_hash_distance"""
+        path = os.path.join(tempfile.mkdtemp(), "images.npz")
+        strict = DuplicateDetector(image_hash_distance=0, image_index_path=path)
+        strict.image_index.add("a", "ff00ff00ff00ff00")
+        strict.save_image_index()
+
+        loose = DuplicateDetector(image_hash_distance=4, image_index_path=path)
+        self.assertEqual(loose.image_index.max_distance, 4)
+        self.assertEqual(loose.image_index.items(), [("a", 0xff00ff00ff00ff00)])
+        # three bits apart only matches under the new distance
+        self.assertTrue(loose.is_duplicate_image("", "b", "ff00ff00ff00ff07"))
+
+        print("✓ Saved image index rebuilt for the configured distance")
+
+    def test_batch_image_hashing_matches_imagehash(self):
+        """Test batched pHash output against imagehash.phash"""
+        import imagehash
+        from PIL import Image, ImageDraw
+
+        temp_dir = tempfile.mkdtemp()
+        paths = []
+        for i in range(6):
+            img = Image.new("RGB", (320, 240), "white")
+            ImageDraw.Draw(img).ellipse((i * 20, 10, 200 + i * 10, 200), fill="red")
+            path = os.path.join(temp_dir, f"{i}.png")
+            img.save(path)
+            paths.append(path)
+        paths.insert(3, os.path.join(temp_dir, "missing.png"))
+
+        expected = []
+        for path in paths:
+            if os.path.exists(path):
+                with Image.open(path) as img:
+                    expected.append(str(imagehash.phash(img)))
+            else:
+                expected.append("")
+
+        self.assertEqual(self.detector.compute_image_hashes(paths), expected)
+        self.assertEqual(self.detector.compute_image_hash(paths[0]), expected[0])
+
+        print("✓ Batched image hashing matches imagehash")
+
+    def test_jpeg_draft_hashing_stays_close_to_imagehash(self):
+        """Test draft-decoded JPEG pHash against imagehash.phash"""
+        import imagehash
+        import numpy as np
+        from PIL import Image, ImageFilter
+        from optimizations.image_hashing import phash_paths
+
+        temp_dir = tempfile.mkdtemp()
+        rng = np.random.RandomState(0)
+        paths = []
+        for i in range(8):
+            noise = (rng.rand(96, 128, 3) * 255).astype("uint8")
+            img = Image.fromarray(noise).resize((1280, 960), Image.BICUBIC).filter(ImageFilter.GaussianBlur(3))
+            path = os.path.join(temp_dir, f"{i}.jpg")
+            img.save(path, quality=85)
+            paths.append(path)
+
+        expected = []
+        for path in paths:
+            with Image.open(path) as img:
+                expected.append(imagehash.phash(img))
+
+        # without draft decoding the hashes are identical
+        exact = phash_paths(paths, draft=False)
+        self.assertEqual(exact, [str(h) for h in expected])
+        # draft decoding scales the JPEG down first and may flip a few bits,
+        # staying within the default image_hash_distance of 4
+        drafted = phash_paths(paths, draft=True)
+        distances = [e - imagehash.hex_to_hash(h) for e, h in zip(expected, drafted)]
+        self.assertLessEqual(max(distances), 4)
+
+        print("✓ Draft-decoded JPEG hashes stay close to imagehash")
+
     def test_text_hash_generation(self):
         """Test text hash generation"""
         content = "Test content for hashing"
@@ -170,6 +352,29 @@ class TestContentQualityAnalyzer(unittest.TestCase):
         
         print(f"✓ Engagement scoring: High={high_engagement:.2f}, Medium={medium_engagement:.2f}, Low={low_engagement:.2f}")
 
+    def test_batch_scoring_matches_per_item(self):
+        """Test vectorized batch scoring against compute_overall_quality"""
+        import random
+
+        rng = random.Random(3)
+        pieces = ["点击", "关注 ", "私信", "follow", "CLICK", " ", "\t", "穿搭", "今天分享好看的搭配",
+                  "hello ", "World", "İ", "x", "\n", "　"]
+        items = [
+            ContentItem(
+                id=str(i), url="", title="", author="", author_id="", publish_time=datetime.now(),
+                content="".join(rng.choice(pieces) for _ in range(rng.randrange(0, 20))),
+                likes=rng.randrange(0, 1000), comments=rng.randrange(0, 100),
+            )
+            for i in range(500)
+        ]
+        items[0].content = ""
+
+        expected = [self.analyzer.compute_overall_quality(item) for item in items]
+        self.assertEqual(self.analyzer.score_batch(items).tolist(), expected)
+        self.assertEqual(len(self.analyzer.score_batch([])), 0)
+
+        print("✓ Batch quality scoring matches per-item scores")
+
 
 class TestSmartCrawler(unittest.TestCase):
     """Test smart crawler functionality"""
@@ -217,6 +422,32 @@ class TestSmartCrawler(unittest.TestCase):
         self.assertIn("food", categories)
         
         print("✓ Content categorization working correctly")
+
+    def test_keyword_matcher_from_config(self):
+        """Test Aho-Corasick matching against substring scans"""
+        import random
+        from optimizations.keyword_matcher import KeywordMatcher
+
+        keywords = {"x": ["ab", "b", "abc", "bca", "穿搭", "搭时"], "y": ["abc", "aaaa", "尚"]}
+        matcher = KeywordMatcher(keywords)
+        rng = random.Random(5)
+        texts = ["".join(rng.choice("abc穿搭时尚 ") for _ in range(rng.randrange(0, 200))) for _ in range(300)]
+        expected = [
+            {label: {k for k in words if k in text} for label, words in keywords.items() if any(k in text for k in words)}
+            for text in texts
+        ]
+        self.assertEqual([matcher.match(text) for text in texts], expected)
+        self.assertEqual(matcher.match_batch(texts), expected)
+
+        self.config.filters.categories = {"pets": ["猫咪", "cat"], "food": ["美食"]}
+        crawler = SmartCrawler(self.config, max_workers=1)
+        item = ContentItem(
+            id="1", url="", title="", content="我家CAT今天很乖", author="", author_id="",
+            publish_time=datetime.now(), hashtags=["#美食", "美食"],
+        )
+        self.assertEqual(crawler.categorize_content(item), ["pets", "food"])
+
+        print("✓ Keyword matcher working correctly")
     
     def test_quality_filtering(self):
         """Test content quality filtering"""
@@ -296,6 +527,203 @@ class TestSmartCrawler(unittest.TestCase):
         print(f"  - Average quality: {summary['average_quality_score']:.2f}")
         print(f"  - Categories found: {len(analytics['category_distribution'])}")
 
+    def test_streaming_analytics(self):
+        """Test incremental analytics without keeping items"""
+        items = [
+            ContentItem(
+                id=str(i), url="", title="", content=f"第{i}条内容，分享今天的穿搭和美食，欢迎大家一起交流",
+                author=f"user{i % 4}", author_id=str(i % 4), publish_time=datetime(2024, 5, 1 + i % 3),
+                likes=100 + i, comments=i,
+            )
+            for i in range(12)
+        ]
+        self.config.filters.enable_duplicate_detection = False
+        streaming = SmartCrawler(self.config, max_workers=1, keep_items=False)
+        processed = streaming.process_batch(items)
+        self.assertEqual(streaming.downloaded_items, [])
+
+        rebuilt = SmartCrawler(self.config, max_workers=1)
+        rebuilt.downloaded_items = processed
+        self.assertEqual(streaming.generate_analytics_report()['summary'], rebuilt.generate_analytics_report()['summary'])
+
+        analytics = streaming.generate_analytics_report()
+        self.assertEqual(analytics['summary']['total_items'], len(processed))
+        # ties are broken by author, like sorting the full author counts by (-count, author)
+        author_counts = {}
+        for item in processed:
+            author_counts[item.author] = author_counts.get(item.author, 0) + 1
+        expected_top = sorted(author_counts.items(), key=lambda x: (-x[1], x[0]))[:10]
+        self.assertEqual(analytics['top_authors'], expected_top)
+        self.assertEqual(sum(analytics['time_distribution'].values()), len(processed))
+
+        print("✓ Streaming analytics working correctly")
+
+    def test_sketch_analytics(self):
+        """Test sketch-mode analytics and sketch merging"""
+        import base64
+        from optimizations.sketches import CountMinSketch, HeavyHitters, HyperLogLog, TDigest
+        self.config.export.analytics_mode = 'sketch'
+        items = [
+            ContentItem(
+                id=str(i), url="", title="", content="", author=f"user{i % 50}", author_id=str(i % 50),
+                publish_time=datetime(2024, 5, 1), likes=i, comments=i % 7,
+                hashtags=[f"#Tag{i % 20}", "#穿搭"], ip_location="上海" if i % 3 else "北京",
+            )
+            for i in range(1000)
+        ]
+        crawler = SmartCrawler(self.config, max_workers=1)
+        crawler.downloaded_items = items
+        sketches = crawler.generate_analytics_report()['sketches']
+        self.assertAlmostEqual(sketches['distinct_authors'], 50, delta=2)
+        self.assertAlmostEqual(sketches['distinct_hashtags'], 21, delta=1)
+        self.assertEqual(sketches['top_hashtags'][0], ('穿搭', 1000))
+        self.assertEqual(sketches['top_ip_locations'][0][0], '上海')
+        self.assertAlmostEqual(sketches['likes_percentiles']['p50'], 500, delta=10)
+
+        # merging per-worker sketches matches one sketch over all the items
+        halves = [(HyperLogLog(), HeavyHitters(5), TDigest()) for _ in range(2)]
+        for i, item in enumerate(items):
+            hll, heavy, digest = halves[i % 2]
+            hll.add(item.author)
+            heavy.add(item.author, item.likes)
+            digest.add(item.likes)
+        hll, heavy, digest = (HyperLogLog.from_dict(halves[0][0].to_dict()),
+                              HeavyHitters.from_dict(halves[0][1].to_dict()),
+                              TDigest.from_dict(halves[0][2].to_dict()))
+        hll.merge(halves[1][0])
+        heavy.merge(halves[1][1])
+        digest.merge(halves[1][2])
+        self.assertAlmostEqual(hll.count(), 50, delta=2)
+        self.assertEqual([author for author, _ in heavy.top()], [f"user{i}" for i in range(49, 44, -1)])
+        self.assertAlmostEqual(digest.quantile(0.99), 990, delta=10)
+
+        # the Count-Min table is compressed for JSON, older uncompressed shards still load
+        state = heavy.to_dict()['sketch']
+        self.assertLess(len(state['table']), 20000)
+        plain = dict(state, table=base64.b64encode(heavy.sketch.table.tobytes()).decode('ascii'))
+        del plain['compressed']
+        self.assertTrue((CountMinSketch.from_dict(plain).table == heavy.sketch.table).all())
+
+        print("✓ Sketch analytics working correctly")
+
+    def test_merge_analytics_shards(self):
+        """Test merging serialized analytics from several workers"""
+        import json
+        from click.testing import CliRunner
+        from optimizations.analytics import AnalyticsAggregator, TopK
+        from optimizations.enhanced_cli import cli
+
+        items = [
+            ContentItem(
+                id=str(i), url="", title="", content="", author=f"user{i % 7}", author_id=str(i % 7),
+                publish_time=datetime(2024, 5, 1 + i % 5), likes=i * 3, comments=i % 4,
+                categories=["fashion" if i % 2 else "food"], quality_score=(i % 10) / 10,
+            )
+            for i in range(90)
+        ]
+        whole = SmartCrawler(self.config, max_workers=1)
+        whole.downloaded_items = items
+
+        temp_dir = tempfile.mkdtemp()
+        shard_files = []
+        for shard in range(3):
+            worker = SmartCrawler(self.config, max_workers=1)
+            worker.downloaded_items = items[shard::3]
+            shard_files.append(os.path.join(temp_dir, f"shard{shard}.json"))
+            worker.export_analytics(shard_files[-1])
+
+        partials = []
+        for path in shard_files:
+            with open(path, encoding='utf-8') as f:
+                partials.append(AnalyticsAggregator.from_dict(json.load(f)['state']))
+        merged = partials[0].merge(partials[1]).merge(partials[2]).report()
+        expected = whole.analytics.report()
+        for section in ('summary', 'category_distribution', 'time_distribution', 'quality_breakdown'):
+            self.assertEqual(merged[section], expected[section])
+        self.assertEqual(dict(merged['top_authors']), dict(expected['top_authors']))
+
+        # ties at the top-k cutoff do not depend on the merge order
+        small = []
+        for shard in ({"a": 2, "b": 1}, {"c": 1, "d": 1}, {"b": 1, "e": 2}):
+            top = TopK(2)
+            for key, count in shard.items():
+                top.add(key, count)
+            small.append(top)
+        orders = [(0, 1, 2), (2, 1, 0), (1, 2, 0)]
+        tops = [TopK.from_dict(small[i].to_dict()).merge(small[j]).merge(small[k]).top() for i, j, k in orders]
+        self.assertEqual(tops, [[("a", 2), ("b", 2)]] * 3)
+        with self.assertRaises(ValueError):
+            TopK(2).merge(TopK(3))
+
+        # the cached k-th entry must track a brute-force ranking
+        import random
+        rng = random.Random(3)
+        top = TopK(5)
+        for _ in range(3000):
+            top.add(f"k{rng.randrange(40)}", rng.randint(1, 3))
+        brute = sorted(top.counts.items(), key=lambda kv: (-kv[1], kv[0]))[:5]
+        self.assertEqual(top.top(), brute)
+
+        output = os.path.join(temp_dir, "merged.json")
+        no_state = os.path.join(temp_dir, "no_state.json")
+        with open(no_state, 'w', encoding='utf-8') as f:
+            json.dump({'summary': {}}, f)
+        result = CliRunner().invoke(cli, ['merge-analytics', *shard_files, no_state, '--output', output])
+        self.assertEqual(result.exit_code, 0, result.output)
+        self.assertIn("Merged 3 of 4 shards", result.output)
+        with open(output, encoding='utf-8') as f:
+            self.assertEqual(json.load(f)['summary']['total_items'], 90)
+        result = CliRunner().invoke(cli, ['merge-analytics', no_state, '--output', output])
+        self.assertEqual(result.exit_code, 1)
+
+        print("✓ Analytics shard merging working correctly")
+
+    def test_compact_note_records(self):
+        """Test NoteRecord/NoteBatch in place of ContentItem"""
+        from optimizations.records import NoteBatch, NoteRecord
+
+        record = NoteRecord.from_note_info({
+            'note_id': 'n1', 'note_url': 'https://www.xiaohongshu.com/explore/n1', 'note_type': 'video',
+            'user_id': 'u1', 'nickname': 'user1', 'title': '穿搭', 'desc': '今天的穿搭分享',
+            'liked_count': '1.2万', 'collected_count': '10+', 'comment_count': '35', 'share_count': '',
+            'video_addr': 'https://sns-video-bd.xhscdn.com/v', 'image_list': ['https://img/a'],
+            'tags': ['穿搭'], 'upload_time': '2024-05-01 12:00:00', 'ip_location': '上海',
+        })
+        self.assertEqual((record.likes, record.collects, record.comments, record.shares), (12000, 10, 35, 0))
+        self.assertEqual(record.publish_time, datetime(2024, 5, 1, 12))
+        self.assertEqual(record.media_types, ('image', 'video'))
+        self.assertFalse(hasattr(record, '__dict__'))
+
+        items = [
+            ContentItem(
+                id=str(i), url="", title="", content=f"第{i}条内容，分享今天的穿搭和美食，欢迎大家一起交流",
+                author=f"user{i % 4}", author_id=str(i % 4), publish_time=datetime(2024, 5, 1 + i % 3),
+                likes=100 + i, comments=i, media_types=["image"],
+            )
+            for i in range(12)
+        ]
+        self.config.filters.enable_duplicate_detection = False
+        expected = SmartCrawler(self.config, max_workers=1)
+        expected.process_batch(items)
+
+        batch = NoteBatch(items)
+        self.assertEqual(len(batch), 12)
+        self.assertEqual(batch[3].author, "user3")
+        self.assertEqual(batch.column('likes').sum(), sum(item.likes for item in items))
+
+        crawler = SmartCrawler(self.config, max_workers=1)
+        processed = crawler.process_batch(batch)
+        self.assertIsInstance(processed, NoteBatch)
+        report = crawler.generate_analytics_report()
+        self.assertEqual(report, expected.generate_analytics_report())
+
+        rebuilt = SmartCrawler(self.config, max_workers=1)
+        rebuilt.downloaded_items = processed
+        self.assertEqual(rebuilt.generate_analytics_report()['summary'], report['summary'])
+        self.assertEqual(rebuilt.generate_analytics_report()['top_authors'], report['top_authors'])
+
+        print("✓ Compact note records working correctly")
+
 
 class TestIntegration(unittest.TestCase):
     """Integration tests for the complete optimization system"""
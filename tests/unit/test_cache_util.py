@@ -0,0 +1,77 @@
+import sys, pathlib; sys.path.insert(0, str(pathlib.Path(__file__).resolve().parents[2]))
+from freezegun import freeze_time
+
+from xhs_utils.cache_util import ResponseCache, make_cache_key
+from apis.xhs_pc_apis import XHS_Apis
+
+
+def test_cache_key_ignores_volatile_params():
+    a = make_cache_key("/api", {"keyword": "k", "page": 1, "search_id": "x"})
+    b = make_cache_key("/api", {"page": 1, "keyword": "k", "search_id": "y"})
+    assert a == b
+    assert a != make_cache_key("/api", {"keyword": "k", "page": 2})
+
+
+def test_ttl_and_lru_eviction():
+    cache = ResponseCache(memory_size=2, ttls={"/a": 10})
+    with freeze_time("2024-01-01 00:00:00"):
+        cache.set("/a", {"id": 1}, "one")
+        cache.set("/a", {"id": 2}, "two")
+        cache.set("/a", {"id": 3}, "three")
+        assert cache.get("/a", {"id": 1}) == (False, None)
+        assert cache.get("/a", {"id": 3}) == (True, "three")
+    with freeze_time("2024-01-01 00:00:11"):
+        assert cache.get("/a", {"id": 3}) == (False, None)
+    assert cache.report()["memory_hits"] == 1
+
+
+def test_disk_tier_survives_new_cache(tmp_path):
+    db = str(tmp_path / "cache.db")
+    first = ResponseCache(disk_path=db)
+    first.set("/api/sns/web/v1/feed", {"source_note_id": "n1"}, {"data": 1})
+    first.close()
+    second = ResponseCache(disk_path=db)
+    assert second.get("/api/sns/web/v1/feed", {"source_note_id": "n1"}) == (True, {"data": 1})
+    assert second.stats["disk_hits"] == 1
+    second.close()
+
+
+def test_get_user_info_skips_network_on_hit(monkeypatch):
+    api = XHS_Apis()
+    api.response_cache = ResponseCache()
+    calls = []
+
+    def fake_fetch(user_id, cookies_str, proxies=None):
+        calls.append(user_id)
+        return True, "success", {"data": {"user_id": user_id}}
+
+    monkeypatch.setattr(api, "_fetch_user_info", fake_fetch)
+    api.get_user_info("u1", "a1=x")
+    success, msg, data = api.get_user_info("u1", "a1=x")
+    assert success and data == {"data": {"user_id": "u1"}}
+    assert calls == ["u1"]
+
+
+def test_memory_hits_are_isolated_from_caller_mutation():
+    cache = ResponseCache()
+    note = {"items": [{"id": "n1"}]}
+    cache.set("/api/sns/web/v1/feed", {"source_note_id": "n1"}, note)
+    note["url"] = "changed"
+    _, first = cache.get("/api/sns/web/v1/feed", {"source_note_id": "n1"})
+    first["items"].append({"id": "n2"})
+    assert cache.get("/api/sns/web/v1/feed", {"source_note_id": "n1"}) == (True, {"items": [{"id": "n1"}]})
+
+
+def test_disk_tier_evicts_oldest_in_batches(tmp_path):
+    cache = ResponseCache(memory_size=1, disk_path=str(tmp_path / "cache.db"), disk_size=10)
+    for i in range(11):
+        with freeze_time(f"2024-01-01 00:00:{i:02d}"):
+            cache.set("/api/sns/web/v1/feed", {"source_note_id": i}, {"n": i})
+    # the eleventh insert trims the table to 90% of its limit
+    assert len(cache.disk) == 9
+    with freeze_time("2024-01-01 00:01:00"):
+        assert cache.get("/api/sns/web/v1/feed", {"source_note_id": 1}) == (False, None)
+        assert cache.get("/api/sns/web/v1/feed", {"source_note_id": 10}) == (True, {"n": 10})
+        cache.set("/api/sns/web/v1/feed", {"source_note_id": 10}, {"n": 10})
+    assert len(cache.disk) == 9
+    cache.close()
@@ -0,0 +1,88 @@
+import sys, pathlib; sys.path.insert(0, str(pathlib.Path(__file__).resolve().parents[2]))
+import threading
+import time
+
+from apis.xhs_pc_apis import XHS_Apis
+from xhs_utils.retry_util import RateLimiter
+
+URL = "https://www.xiaohongshu.com/explore/n1?xsec_token=tok"
+
+
+def _root_page(cursor):
+    page = int(cursor or 0)
+    comments = [
+        {"note_id": "n1", "id": f"c{page}{i}", "sub_comment_has_more": True,
+         "sub_comment_cursor": "", "sub_comments": []}
+        for i in range(3)
+    ]
+    return True, "ok", {"data": {"comments": comments, "cursor": str(page + 1), "has_more": page < 1}}
+
+
+def test_concurrent_expansion_matches_serial(monkeypatch):
+    active, peak = [0], [0]
+    lock = threading.Lock()
+
+    def fake_inner(comment, cursor, xsec_token, cookies_str, proxies=None):
+        with lock:
+            active[0] += 1
+            peak[0] = max(peak[0], active[0])
+        time.sleep(0.02)
+        with lock:
+            active[0] -= 1
+        return True, "ok", {"data": {"comments": [{"id": comment["id"] + "-sub"}], "has_more": False}}
+
+    def run(max_workers):
+        api = XHS_Apis()
+        monkeypatch.setattr(api, "get_note_out_comment", lambda note_id, cursor, *a, **k: _root_page(cursor))
+        monkeypatch.setattr(api, "get_note_inner_comment", fake_inner)
+        return api.get_note_all_comment(URL, "a1=x", max_workers=max_workers)
+
+    serial = run(1)
+    peak[0] = 0
+    concurrent = run(4)
+    assert concurrent[0] and concurrent == serial
+    assert [c["sub_comments"][0]["id"] for c in concurrent[2]] == [c["id"] + "-sub" for c in concurrent[2]]
+    assert peak[0] > 1
+
+
+def test_concurrent_expansion_reports_failure(monkeypatch):
+    api = XHS_Apis()
+    monkeypatch.setattr(api, "get_note_out_comment", lambda note_id, cursor, *a, **k: _root_page(cursor))
+    monkeypatch.setattr(api, "get_note_inner_comment", lambda *a, **k: (False, "boom", None))
+    success, msg, _ = api.get_note_all_comment(URL, "a1=x", max_workers=3)
+    assert not success and msg == "boom"
+
+
+def test_rate_limiter_spaces_calls():
+    limiter = RateLimiter(rate_per_minute=1200)  # 50ms apart
+    start = time.monotonic()
+    threads = [threading.Thread(target=limiter.acquire) for _ in range(4)]
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+    assert time.monotonic() - start >= 0.14
+
+
+def test_spider_note_comments_uses_comment_workers(monkeypatch):
+    from main import Data_Spider
+
+    spider = Data_Spider()
+    spider.comment_workers = 3
+    calls = []
+
+    def comment(cid):
+        return {"note_id": "n1", "id": cid, "content": cid, "show_tags": [], "like_count": "0",
+                "create_time": 1609459200000, "user_info": {"user_id": "u1", "nickname": "n", "image": "a"}}
+
+    def fake_all_comment(url, cookies_str, proxies=None, max_workers=1):
+        calls.append(max_workers)
+        root = comment("c1")
+        root["sub_comments"] = [comment("c1-sub")]
+        return True, "success", [root]
+
+    monkeypatch.setattr(spider.xhs_apis, "get_note_all_comment", fake_all_comment)
+    success, msg, comments = spider.spider_note_comments(URL, "a1=x")
+    assert success and calls == [3]
+    assert [c["comment_id"] for c in comments] == ["c1", "c1-sub"]
+    assert all(c["note_url"] == URL for c in comments)
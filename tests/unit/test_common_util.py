@@ -1,9 +1,13 @@
 import sys, pathlib; sys.path.insert(0, str(pathlib.Path(__file__).resolve().parents[2]))
 import requests_mock
 
+from datetime import timedelta, timezone
+
 from xhs_utils.data_util import (
     norm_str,
     timestamp_to_str,
+    handle_comment_info,
+    handle_note_info,
     check_and_create_path,
     save_failed,
     retry_failed,
@@ -26,6 +30,44 @@ def test_timestamp_to_str():
     assert timestamp_to_str(ts) == "2021-01-01 00:00:00"
 
 
+def test_timestamp_to_str_timezone():
+    ts = 1609459259999  # 2021-01-01 00:00:59.999 UTC
+    assert timestamp_to_str(ts, timezone.utc) == "2021-01-01 00:00:59"
+    assert timestamp_to_str(ts, timezone(timedelta(hours=8))) == "2021-01-01 08:00:59"
+    assert timestamp_to_str(ts - 59000, timezone(timedelta(hours=8))) == "2021-01-01 08:00:00"
+
+
+def test_handle_comment_info_skips_broken_pictures():
+    comment = {
+        "note_id": "n1", "note_url": "u", "id": "c1", "content": "hi", "show_tags": [], "like_count": "3",
+        "user_info": {"user_id": "u1", "nickname": "nick", "image": "img"}, "create_time": 1609459200000,
+        "pictures": [{"info_list": [{"url": "a"}, {"url": "b"}]}, {"info_list": [{"url": "c"}]}],
+    }
+    info = handle_comment_info(comment)
+    assert info["pictures"] == ["b"]
+    assert info["ip_location"] == "unknown"
+    del comment["pictures"]
+    assert handle_comment_info(comment)["pictures"] == []
+
+
+def test_handle_note_info_tolerates_odd_tags():
+    note = {
+        "id": "n1", "url": "u",
+        "note_card": {
+            "type": "normal", "title": "t", "desc": "d", "time": 1609459200000,
+            "user": {"user_id": "u1", "nickname": "nick", "avatar": "a"},
+            "interact_info": {"liked_count": "1", "collected_count": "2", "comment_count": "3", "share_count": "4"},
+            "image_list": [{"info_list": [{"url": "a"}, {"url": "b"}]}],
+            "tag_list": [{"name": "ootd"}, None, "raw", {"id": "x"}],
+        },
+    }
+    assert handle_note_info(note)["tags"] == ["ootd"]
+    note["note_card"]["tag_list"] = None
+    assert handle_note_info(note)["tags"] == []
+    del note["note_card"]["tag_list"]
+    assert handle_note_info(note)["tags"] == []
+
+
 def test_trans_cookies():
     cookies = trans_cookies("a=1; b=2")
     assert cookies == {"a": "1", "b": "2"}
@@ -75,3 +117,18 @@ def test_download_media_video(tmp_path):
     assert result
     assert (tmp_path / "vid.mp4").exists()
 
+
+
+def test_download_media_error_status_is_retried(tmp_path):
+    from xhs_utils.frontier import CrawlFrontier
+
+    frontier = CrawlFrontier(str(tmp_path / "frontier"))
+    failed = []
+    url = "http://example.com/expired.jpg"
+    with requests_mock.Mocker() as m:
+        m.get(url, status_code=403, content=b"<html>forbidden</html>")
+        assert not download_media(str(tmp_path), "img", url, "image", failed, frontier)
+    assert not (tmp_path / "img.jpg").exists()
+    assert not frontier.seen("media", url)
+    assert failed == [{"path": str(tmp_path), "name": "img", "url": url, "type": "image"}]
+    frontier.close()
@@ -0,0 +1,73 @@
+import sys, pathlib; sys.path.insert(0, str(pathlib.Path(__file__).resolve().parents[2]))
+
+from xhs_utils.frontier import CrawlFrontier, ScalableBloomFilter
+
+
+def test_scalable_bloom_grows_and_persists(tmp_path):
+    bloom = ScalableBloomFilter(str(tmp_path), "note", initial_capacity=100, error_rate=0.01)
+    keys = [f"note-{i}" for i in range(1000)]
+    for k in keys:
+        bloom.add(k)
+    assert len(bloom.filters) > 1
+    assert all(k in bloom for k in keys)
+    assert not bloom.add(keys[0])
+    bloom.close()
+
+    reopened = ScalableBloomFilter(str(tmp_path), "note", initial_capacity=100, error_rate=0.01)
+    assert all(k in reopened for k in keys)
+    false_positives = sum(f"other-{i}" in reopened for i in range(10000))
+    assert false_positives / 10000 < 0.02
+    reopened.close()
+
+
+def test_spider_skips_seen_notes(tmp_path, monkeypatch):
+    from main import Data_Spider
+
+    frontier = CrawlFrontier(str(tmp_path / "frontier"))
+    frontier.add("note", "seen1")
+    spider = Data_Spider(frontier=frontier)
+    requested = []
+    monkeypatch.setattr(spider, "spider_note", lambda url, *a, **k: (requested.append(url), (False, "x", None))[1])
+    urls = [
+        "https://www.xiaohongshu.com/explore/seen1?xsec_token=a",
+        "https://www.xiaohongshu.com/explore/new1?xsec_token=b",
+    ]
+    spider.spider_some_note(urls, "a1=x", {"media": str(tmp_path), "excel": str(tmp_path)}, "media")
+    assert requested == [urls[1]]
+    frontier.close()
+
+
+def test_failed_download_is_not_marked_as_crawled(tmp_path, monkeypatch):
+    import main
+    from main import Data_Spider
+
+    frontier = CrawlFrontier(str(tmp_path / "frontier"))
+    spider = Data_Spider(frontier=frontier)
+    monkeypatch.setattr(spider, "spider_note",
+                        lambda url, *a, **k: (True, "ok", {"note_id": Data_Spider._note_id(url)}))
+
+    def fake_download(note_info, path, save_choice, transcode=False, failed=None, frontier=None):
+        assert not frontier.seen("note", note_info["note_id"])
+        if note_info["note_id"] == "bad":
+            failed.append({"url": "u", "path": path, "name": "bad", "type": "image"})
+
+    monkeypatch.setattr(main, "download_note", fake_download)
+    monkeypatch.chdir(tmp_path)
+    urls = [f"https://www.xiaohongshu.com/explore/{n}?xsec_token=a" for n in ("good", "bad")]
+    spider.spider_some_note(urls, "a1=x", {"media": str(tmp_path), "excel": str(tmp_path)}, "media")
+    assert frontier.seen("note", "good")
+    assert not frontier.seen("note", "bad")
+    frontier.close()
+
+
+def test_retry_failed_closes_frontier_and_cache(tmp_path, monkeypatch):
+    import main
+
+    closed = []
+    monkeypatch.setattr(main, "init", lambda: ("a1=x", {"media": str(tmp_path), "excel": str(tmp_path)}))
+    monkeypatch.setattr(main, "retry_failed", lambda path: [])
+    monkeypatch.setattr(main.CrawlFrontier, "close", lambda self: closed.append("frontier"))
+    monkeypatch.setattr(main.ResponseCache, "close", lambda self: closed.append("cache"))
+    monkeypatch.setattr(sys, "argv", ["main.py", "--retry-failed", "--cache", "--frontier-dir", str(tmp_path / "frontier")])
+    main.cli()
+    assert sorted(closed) == ["cache", "frontier"]
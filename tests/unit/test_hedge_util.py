@@ -0,0 +1,86 @@
+import sys, pathlib; sys.path.insert(0, str(pathlib.Path(__file__).resolve().parents[2]))
+import threading
+import time
+
+from xhs_utils.hedge_util import HedgedRequester, percentile
+from apis.xhs_pc_apis import XHS_Apis
+
+
+def test_percentile():
+    values = list(range(1, 101))
+    assert percentile(values, 50) == 50
+    assert percentile(values, 99) == 99
+    assert percentile([], 95) == 0.0
+
+
+def test_hedge_wins_on_slow_primary():
+    slow, fast = {"https": "slow"}, {"https": "fast"}
+
+    def fetch(proxies):
+        time.sleep(0.5 if proxies == slow else 0.01)
+        return True, "ok", proxies
+
+    hedger = HedgedRequester([fast], initial_delay=0.05, max_hedge_ratio=1.0)
+    start = time.perf_counter()
+    success, msg, used = hedger.call(fetch, slow)
+    assert success and used == fast
+    assert time.perf_counter() - start < 0.4
+    assert hedger.stats["hedges_won"] == 1
+    hedger.shutdown()
+
+
+def test_hedge_ratio_cap():
+    def fetch(proxies):
+        time.sleep(0.02)
+        return True, "ok", proxies
+
+    hedger = HedgedRequester([None], initial_delay=0.005, max_hedge_ratio=0.1)
+    for _ in range(10):
+        hedger.call(fetch, {"https": "p"})
+    # the budget only reaches one hedge on the tenth request
+    assert hedger.stats["hedges_sent"] == 1
+    assert hedger.stats["hedges_skipped"] == 9
+    report = hedger.report()
+    assert set(report["latency"]) == {"primary", "effective"}
+    hedger.shutdown()
+
+    hedger = HedgedRequester([None], initial_delay=0.005, max_hedge_ratio=0)
+    for _ in range(3):
+        hedger.call(fetch, {"https": "p"})
+    assert hedger.stats["hedges_sent"] == 0
+    hedger.shutdown()
+
+
+def test_abandoned_losers_block_new_hedges():
+    release = threading.Event()
+
+    def fetch(proxies):
+        if proxies == {"https": "hung"}:
+            release.wait(5)
+        return True, "ok", proxies
+
+    hedger = HedgedRequester([None], initial_delay=0.01, max_hedge_ratio=1.0)
+    for _ in range(2):
+        assert hedger.call(fetch, {"https": "hung"})[2] is None
+    # two hung primaries hold half of the four workers, so the third is not hedged
+    assert hedger.stats["abandoned"] == 2
+    threading.Timer(0.2, release.set).start()
+    assert hedger.call(fetch, {"https": "hung"})[2] == {"https": "hung"}
+    assert hedger.stats["hedges_skipped"] == 1
+    hedger.shutdown()
+
+
+def test_get_note_info_uses_hedger(monkeypatch):
+    api = XHS_Apis()
+    calls = []
+
+    class FakeHedger:
+        request_timeout = 5.0
+
+        def call(self, func, proxies):
+            calls.append(proxies)
+            return True, "ok", {"hedged": True}
+
+    api.hedger = FakeHedger()
+    assert api.get_note_info("https://x.com/explore/n1?xsec_token=t", "a1=x", {"https": "p"})[2] == {"hedged": True}
+    assert calls == [{"https": "p"}]
@@ -0,0 +1,98 @@
+import sys, pathlib; sys.path.insert(0, str(pathlib.Path(__file__).resolve().parents[2]))
+import urllib.request
+
+import pytest
+import requests_mock
+
+from xhs_utils import metrics, xhs_util
+from xhs_utils.data_util import download_media
+from xhs_utils.metrics import MetricsRegistry, start_metrics_server
+from apis.xhs_pc_apis import XHS_Apis
+
+
+@pytest.fixture(autouse=True)
+def clean_registry():
+    metrics.registry.clear()
+    yield
+    metrics.registry.clear()
+
+
+def test_render_text_format():
+    registry = MetricsRegistry()
+    requests_total = registry.counter('requests_total', 'Requests', ('endpoint',))
+    latency = registry.histogram('latency_seconds', 'Latency', buckets=(0.1, 1.0))
+    requests_total.inc(endpoint='/a"b')
+    requests_total.inc(2, endpoint='/a"b')
+    latency.observe(0.05)
+    latency.observe(0.5)
+    text = registry.render()
+    assert '# TYPE requests_total counter' in text
+    assert 'requests_total{endpoint="/a\\"b"} 3' in text
+    assert 'latency_seconds_bucket{le="0.1"} 1' in text
+    assert 'latency_seconds_bucket{le="1.0"} 2' in text
+    assert 'latency_seconds_bucket{le="+Inf"} 2' in text
+    assert 'latency_seconds_count 2' in text
+    with pytest.raises(ValueError):
+        requests_total.inc(status=200)
+    with pytest.raises(ValueError):
+        registry.gauge('requests_total', 'Requests')
+
+
+def test_api_request_and_error_counters(monkeypatch):
+    monkeypatch.setattr(xhs_util, "generate_xs_xs_common", lambda a1, api, data='': ("xs", 1, "xsc"))
+    monkeypatch.setattr(xhs_util, "generate_xray_traceid", lambda: "trace")
+    xhs_util.signature_cache.clear()
+    api = XHS_Apis()
+    endpoint = '/api/sns/web/v1/feed'
+    url = 'https://www.xiaohongshu.com/explore/abc?xsec_token=t'
+    with requests_mock.Mocker() as m:
+        m.post(api.base_url + endpoint, [
+            {'json': {'success': True, 'msg': 'ok', 'data': {'items': []}}},
+            {'status_code': 461, 'json': {'success': False}},
+        ])
+        assert api._fetch_note_info(url, 'a1=demo')[0]
+        assert not api._fetch_note_info(url, 'a1=demo')[0]
+    assert metrics.REQUESTS.value(endpoint=endpoint, method='POST', status=200) == 1
+    assert metrics.REQUESTS.value(endpoint=endpoint, method='POST', status=461) == 1
+    assert metrics.REQUEST_SECONDS.count(endpoint=endpoint) == 2
+    assert metrics.RESPONSE_BYTES.value(endpoint=endpoint) > 0
+    assert metrics.ERRORS.value(endpoint=endpoint, error='XHSRateLimitError') == 1
+
+
+def test_video_page_and_creator_requests_are_counted(monkeypatch):
+    from apis import xhs_creator_apis
+    from apis.xhs_creator_apis import XHS_Creator_Apis
+
+    monkeypatch.setattr(xhs_creator_apis, "generate_xs", lambda a1, api, data='': ("xs", 1, "xsc"))
+    creator = XHS_Creator_Apis()
+    with requests_mock.Mocker() as m:
+        m.get('https://www.xiaohongshu.com/explore/n1', text='<meta name="og:video" content="http://v/1.mp4">')
+        m.get(creator.base_url + '/api/galaxy/creator/note/user/posted', json={'success': True, 'data': {}})
+        assert XHS_Apis().get_note_no_water_video('n1') == (True, 'ok', 'http://v/1.mp4')
+        # still a staticmethod, so callers using the class keep working
+        assert XHS_Apis.get_note_no_water_video('n1') == (True, 'ok', 'http://v/1.mp4')
+        assert creator.get_publish_note_info(None, 'a1=demo')[0]
+    assert metrics.REQUESTS.value(endpoint='/explore', method='GET', status=200) == 2
+    assert metrics.REQUESTS.value(endpoint='/api/galaxy/creator/note/user/posted', method='GET', status=200) == 1
+
+
+def test_download_metrics_and_server(tmp_path):
+    with requests_mock.Mocker() as m:
+        m.get('http://example.com/img.jpg', content=b'x' * 1000)
+        m.get('http://example.com/missing.jpg', exc=ConnectionError)
+        download_media(str(tmp_path), 'img', 'http://example.com/img.jpg', 'image')
+        download_media(str(tmp_path), 'missing', 'http://example.com/missing.jpg', 'image')
+    assert metrics.DOWNLOAD_BYTES.value(type='image') == 1000
+    assert metrics.DOWNLOADS.value(type='image', result='failed') == 1
+
+    server = start_metrics_server(0)
+    try:
+        url = f"http://127.0.0.1:{server.server_address[1]}/metrics"
+        with urllib.request.urlopen(url) as response:
+            body = response.read().decode('utf-8')
+            assert response.headers['Content-Type'].startswith('text/plain')
+    finally:
+        server.shutdown()
+        server.server_close()
+    assert 'xhs_download_bytes_total{type="image"} 1000' in body
+    assert 'xhs_downloads_total{type="image",result="ok"} 1' in body
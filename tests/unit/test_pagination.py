@@ -0,0 +1,92 @@
+import sys, pathlib; sys.path.insert(0, str(pathlib.Path(__file__).resolve().parents[2]))
+import asyncio
+
+from apis.xhs_pc_apis import XHS_Apis
+from apis.pc import aiter_pages
+
+USER_URL = "https://www.xiaohongshu.com/user/profile/u1?xsec_token=tok&xsec_source=pc_feed"
+
+
+def _fake_user_notes(user_id, cursor, cookies_str, xsec_token="", xsec_source="", proxies=None):
+    index = int(cursor or 0)
+    notes = [{"note_id": f"n{index}-{i}"} for i in range(2)]
+    return True, "ok", {"data": {"notes": notes, "cursor": str(index + 1), "has_more": index < 2}}
+
+
+def test_iter_user_notes_yields_pages_with_cursor(monkeypatch):
+    api = XHS_Apis()
+    monkeypatch.setattr(api, "get_user_note_info", _fake_user_notes)
+    pages = list(api.iter_user_notes(USER_URL, "a1=x"))
+    assert [p.cursor for p in pages] == ["1", "2", "3"]
+    assert pages[-1].has_more is False
+
+    resumed = list(api.iter_user_notes(USER_URL, "a1=x", cursor=pages[0].cursor))
+    assert [p.items for p in resumed] == [p.items for p in pages[1:]]
+
+    success, msg, notes = api.get_user_all_notes(USER_URL, "a1=x")
+    assert success and len(notes) == 6
+
+
+def test_iter_search_notes_is_lazy(monkeypatch):
+    api = XHS_Apis()
+    requested = []
+
+    def fake_search(query, cookies_str, page=1, *args, **kwargs):
+        requested.append(page)
+        return True, "ok", {"data": {"items": [{"id": f"{page}-{i}"} for i in range(20)], "has_more": True}}
+
+    monkeypatch.setattr(api, "search_note", fake_search)
+    first = next(api.iter_search_notes("q", "a1=x"))
+    assert first.cursor == 2 and requested == [1]
+
+    success, msg, notes = api.search_some_note("q", 30, "a1=x")
+    assert success and len(notes) == 30
+    assert requested == [1, 1, 2]
+
+
+def test_aiter_pages(monkeypatch):
+    api = XHS_Apis()
+    monkeypatch.setattr(api, "get_user_note_info", _fake_user_notes)
+
+    async def collect():
+        return [page.cursor async for page in aiter_pages(api.iter_user_notes(USER_URL, "a1=x"))]
+
+    assert asyncio.run(collect()) == ["1", "2", "3"]
+
+
+def test_search_notes_fanout_dedups_and_stops(monkeypatch):
+    api = XHS_Apis()
+    requested = []
+
+    def fake_search(query, cookies_str, page=1, sort_type_choice=0, *args, **kwargs):
+        requested.append((query, sort_type_choice, page))
+        # both keywords share half of their hits
+        items = [{"id": f"shared-{page}-{i}", "model_type": "note"} for i in range(5)]
+        items += [{"id": f"{query}-{sort_type_choice}-{page}-{i}", "model_type": "note"} for i in range(5)]
+        items.append({"id": "hot", "model_type": "hot_query"})
+        return True, "ok", {"data": {"items": items, "has_more": True}}
+
+    monkeypatch.setattr(api, "search_note", fake_search)
+    success, msg, notes = api.search_notes_fanout(["a", "b"], 25, "a1=x", sort_type_choices=(0, 1))
+    ids = [n["id"] for n in notes]
+    assert success and len(ids) == 25 and len(set(ids)) == 25
+    assert "hot" not in ids
+    assert len(requested) < 12
+
+
+def test_search_notes_fanout_skips_queued_streams(monkeypatch):
+    api = XHS_Apis()
+    requested = []
+
+    def fake_search(query, cookies_str, page=1, sort_type_choice=0, *args, **kwargs):
+        requested.append((query, sort_type_choice, page))
+        items = [{"id": f"{query}-{sort_type_choice}-{page}-{i}", "model_type": "note"} for i in range(20)]
+        return True, "ok", {"data": {"items": items, "has_more": True}}
+
+    monkeypatch.setattr(api, "search_note", fake_search)
+    success, msg, notes = api.search_notes_fanout(
+        ["a", "b", "c"], 15, "a1=x", sort_type_choices=(0, 1), max_workers=1,
+    )
+    assert success and len(notes) == 15
+    # the first page fills require_num, so the five queued streams never fetch
+    assert requested == [("a", 0, 1)]
@@ -0,0 +1,79 @@
+import sys, pathlib; sys.path.insert(0, str(pathlib.Path(__file__).resolve().parents[2]))
+import pstats
+import re
+import time
+
+import pytest
+
+import main
+from xhs_utils.profiler import CrawlProfiler
+
+
+def _busy_signing(seconds):
+    end = time.perf_counter() + seconds
+    total = 0
+    while time.perf_counter() < end:
+        total += sum(range(200))
+    return total
+
+
+def test_sampling_profile_finds_hot_function(tmp_path):
+    output = tmp_path / "run" / "profile"
+    with CrawlProfiler(str(output), interval=0.002, top=10) as profiler:
+        _busy_signing(0.3)
+    collapsed = (tmp_path / "run" / "profile.collapsed").read_text(encoding="utf-8")
+    assert "test_profiler.py:_busy_signing" in collapsed
+    assert all(line.rsplit(" ", 1)[1].isdigit() for line in collapsed.splitlines())
+    top = profiler.sampler.top(10)
+    assert any("_busy_signing" in label for _, label, _, _ in top)
+    assert "_busy_signing" in (tmp_path / "run" / "profile.txt").read_text(encoding="utf-8")
+
+
+def test_sampling_summary_is_per_thread_and_skips_idle_workers(tmp_path):
+    from concurrent.futures import ThreadPoolExecutor
+
+    with ThreadPoolExecutor(max_workers=4, thread_name_prefix="workers") as pool:
+        list(pool.map(lambda _: None, range(8)))
+        # the workers now sit idle waiting for more work
+        with CrawlProfiler(str(tmp_path / "profile"), interval=0.002) as profiler:
+            _busy_signing(0.3)
+    summary = (tmp_path / "profile.txt").read_text(encoding="utf-8")
+    percents = [float(p) for p in re.findall(r"([\d.]+)%", summary)]
+    assert percents and max(percents) <= 100.0
+    threads = profiler.sampler.threads()
+    pool_samples, pool_idle = threads["workers"]
+    assert pool_idle == pool_samples
+    top = profiler.sampler.top(10)
+    assert top[0][0] == "MainThread" and "_busy_signing" in top[0][1]
+    assert all(group == "MainThread" for group, _, _, _ in top)
+
+
+def test_cprofile_mode_writes_pstats(tmp_path):
+    output = tmp_path / "profile"
+    with CrawlProfiler(str(output), mode="cprofile", top=5):
+        _busy_signing(0.05)
+    stats = pstats.Stats(str(tmp_path / "profile.pstats"))
+    assert any(func[2] == "_busy_signing" for func in stats.stats)
+    with pytest.raises(ValueError):
+        CrawlProfiler(str(output), mode="perf")
+
+
+def test_main_cli_profile_flag(tmp_path, monkeypatch):
+    ran = []
+    monkeypatch.setattr(main, "run_cli", lambda args: ran.append(_busy_signing(0.05)))
+    monkeypatch.setattr(sys, "argv", ["main.py", "--profile", "--profile-output", str(tmp_path / "job")])
+    main.cli()
+    assert ran
+    assert (tmp_path / "job.collapsed").exists() and (tmp_path / "job.txt").exists()
+
+
+def test_enhanced_cli_profile_run(tmp_path, monkeypatch):
+    from click.testing import CliRunner
+    from optimizations.enhanced_cli import cli
+
+    monkeypatch.chdir(tmp_path)
+    result = CliRunner().invoke(cli, ["crawl", "--profile-run", "--profile-mode", "cprofile",
+                                      "--output", str(tmp_path / "out")], input="n\n")
+    assert result.exit_code == 0, result.output
+    assert (tmp_path / "out" / "profile.pstats").exists()
+    assert (tmp_path / "out" / "profile.txt").exists()
@@ -0,0 +1,112 @@
+import sys, pathlib; sys.path.insert(0, str(pathlib.Path(__file__).resolve().parents[2]))
+from types import SimpleNamespace
+
+from xhs_utils.search_filter import SearchItemFilter, parse_count
+
+
+def _item(note_id, likes, note_type="normal", title="title", user_id="u1"):
+    return {
+        "id": note_id,
+        "model_type": "note",
+        "note_card": {
+            "type": note_type,
+            "display_title": title,
+            "user": {"user_id": user_id, "nickname": f"nick_{user_id}"},
+            "interact_info": {"liked_count": likes},
+        },
+    }
+
+
+def test_parse_count():
+    assert parse_count("1.2万") == 12000
+    assert parse_count("10w+") == 100000
+    assert parse_count("3k") == 3000
+    assert parse_count("856") == 856
+    assert parse_count(42) == 42
+    assert parse_count("") == 0
+    assert parse_count("abc") == 0
+
+
+def test_filter_rejects_before_detail_fetch():
+    items = [
+        _item("a", "1.1万"),
+        _item("b", "12"),
+        _item("c", "500", note_type="video"),
+        _item("d", "500", title="广告 AD"),
+        _item("e", "500", user_id="other"),
+        {"id": "hot", "model_type": "hot_query"},
+    ]
+    item_filter = SearchItemFilter(
+        min_likes=100, content_types=["image"], exclude_keywords=["ad"], users=["u1"]
+    )
+    kept = [item["id"] for item in item_filter.apply(items)]
+    assert kept == ["a", "hot"]
+    assert item_filter.stats == {"accepted": 2, "likes": 1, "content_type": 1, "keyword": 1, "user": 1}
+
+
+def test_from_search_config_and_nickname_match():
+    config = SimpleNamespace(min_likes=0, content_types=["image", "video"], exclude_keywords=[], users=["nick_u2"])
+    item_filter = SearchItemFilter.from_search_config(config)
+    assert item_filter.accept(_item("a", "1", note_type="video", user_id="u2"))
+    assert not item_filter.accept(_item("b", "1", user_id="u3"))
+
+
+def test_parse_publish_text():
+    from xhs_utils.search_filter import parse_publish_text
+
+    now = 1_700_000_000
+    assert parse_publish_text("刚刚", now) == now
+    assert parse_publish_text("5分钟前", now) == now - 300
+    assert parse_publish_text("3小时前", now) == now - 3 * 3600
+    assert parse_publish_text("2天前", now) == now - 2 * 86400
+    assert parse_publish_text("2023-01-05", now) < now
+    assert parse_publish_text("unknown", now) is None
+
+
+def test_time_sorted_search_stops_at_cutoff(monkeypatch):
+    import time
+    from apis.xhs_pc_apis import XHS_Apis
+
+    api = XHS_Apis()
+    requested = []
+    labels = {1: ["1小时前", "2小时前"], 2: ["3小时前", "9小时前"], 3: ["10小时前", "11小时前"], 4: ["12小时前"]}
+
+    def fake_search(query, cookies_str, page=1, *args, **kwargs):
+        requested.append(page)
+        items = [
+            {"id": f"{page}-{i}", "model_type": "note",
+             "note_card": {"corner_tag_info": [{"type": "publish_time", "text": text}]}}
+            for i, text in enumerate(labels[page])
+        ]
+        return True, "ok", {"data": {"items": items, "has_more": page < 4}}
+
+    monkeypatch.setattr(api, "search_note", fake_search)
+    cutoff = time.time() - 5 * 3600
+    success, msg, notes = api.search_some_note("q", 100, "a1=x", sort_type_choice=1, min_publish_time=cutoff)
+    assert success
+    assert [n["id"] for n in notes] == ["1-0", "1-1", "2-0"]
+    assert requested == [1, 2, 3]
+
+
+def test_rejected_hits_do_not_count_toward_num(monkeypatch):
+    from main import Data_Spider
+
+    spider = Data_Spider()
+    requested, crawled = [], []
+    pages = {
+        1: [_item("1-0", "5"), _item("1-1", "500"), _item("1-2", "1"), {"id": "hot", "model_type": "hot_query"}],
+        2: [_item("2-0", "900"), _item("2-1", "2"), _item("2-2", "1000")],
+    }
+
+    def fake_search(query, cookies_str, page=1, *args, **kwargs):
+        requested.append(page)
+        items = [dict(item, xsec_token="t") for item in pages[page]]
+        return True, "ok", {"data": {"items": items, "has_more": page < 2}}
+
+    monkeypatch.setattr(spider.xhs_apis, "search_note", fake_search)
+    monkeypatch.setattr(spider, "spider_some_note", lambda notes, *a, **k: crawled.extend(notes))
+    item_filter = SearchItemFilter(min_likes=100)
+    spider.spider_some_search_note("q", 3, "a1=x", {}, "media", item_filter=item_filter)
+    assert [url.split("/")[-1].split("?")[0] for url in crawled] == ["1-1", "2-0", "2-2"]
+    assert requested == [1, 2]
+    assert item_filter.stats["likes"] == 3
@@ -74,3 +74,48 @@ def test_smoke_all_api_methods(monkeypatch):
             method(*args)
         except Exception:
             pass
+
+
+def test_signature_cache_reuses_recent_signature():
+    from freezegun import freeze_time
+    from xhs_utils import xhs_util
+
+    calls = []
+
+    def counting_generate(a1, api, data=''):
+        calls.append((a1, api))
+        return 'xs', int(xhs_util.time.time() * 1000), 'common'
+
+    xhs_util.configure_signature_cache(ttl=30)
+    api = "/api/sns/web/unread_count"
+    with patch('xhs_utils.xhs_util.generate_xs_xs_common', counting_generate):
+        with freeze_time("2024-01-01 00:00:00"):
+            xhs_util.generate_request_params("a1=one", api)
+            xhs_util.generate_request_params("a1=one", api)
+            xhs_util.generate_request_params("a1=two", api)
+        with freeze_time("2024-01-01 00:00:31"):
+            xhs_util.generate_request_params("a1=one", api)
+    assert calls == [("one", api), ("two", api), ("one", api)]
+    xhs_util.configure_signature_cache(ttl=0)
+
+
+def test_signature_cache_is_opt_in_and_get_only():
+    from xhs_utils import xhs_util
+
+    calls = []
+
+    def counting_generate(a1, api, data=''):
+        calls.append(data)
+        return 'xs', int(xhs_util.time.time() * 1000), 'common'
+
+    body = {"keyword": "k", "search_id": "s1"}
+    with patch('xhs_utils.xhs_util.generate_xs_xs_common', counting_generate):
+        xhs_util.generate_request_params("a1=one", "/api/sns/web/unread_count")
+        xhs_util.generate_request_params("a1=one", "/api/sns/web/unread_count")
+        xhs_util.configure_signature_cache(ttl=30)
+        try:
+            xhs_util.generate_request_params("a1=one", "/api/sns/web/v1/search/notes", body)
+            xhs_util.generate_request_params("a1=one", "/api/sns/web/v1/search/notes", body)
+        finally:
+            xhs_util.configure_signature_cache(ttl=0)
+    assert len(calls) == 4
@@ -0,0 +1,103 @@
+import sys, pathlib; sys.path.insert(0, str(pathlib.Path(__file__).resolve().parents[2]))
+import json
+import threading
+
+import pytest
+import requests_mock
+
+from xhs_utils import tracing, xhs_util
+from xhs_utils.data_util import download_note
+from main import Data_Spider
+
+
+@pytest.fixture
+def trace_file(tmp_path):
+    path = tmp_path / "trace.jsonl"
+    tracing.configure_tracing(str(path))
+    yield path
+    tracing.tracer.shutdown()
+
+
+def _spans(path):
+    return [json.loads(line) for line in path.read_text(encoding="utf-8").splitlines()]
+
+
+def test_disabled_tracing_is_a_noop(tmp_path):
+    assert not tracing.tracer.enabled
+    with tracing.span("noop", a=1) as span:
+        span.set_attribute("b", 2)
+    func = lambda: None
+    assert tracing.propagate(func) is func
+
+
+def test_nesting_and_thread_propagation(trace_file):
+    def pooled():
+        with tracing.span("pooled"):
+            pass
+
+    with tracing.span("outer", note_id="n1"):
+        with tracing.span("inner"):
+            pass
+        worker = threading.Thread(target=tracing.propagate(pooled))
+        worker.start()
+        worker.join()
+    with pytest.raises(ValueError):
+        with tracing.span("failing"):
+            raise ValueError("boom")
+    spans = {s["name"]: s for s in _spans(trace_file)}
+    outer = spans["outer"]
+    assert outer["parent_id"] is None and outer["attributes"] == {"note_id": "n1"}
+    for name in ("inner", "pooled"):
+        assert spans[name]["parent_id"] == outer["span_id"]
+        assert spans[name]["trace_id"] == outer["trace_id"]
+    assert spans["failing"]["error"] == "ValueError: boom"
+    assert spans["failing"]["trace_id"] != outer["trace_id"]
+
+
+def test_otlp_format(tmp_path):
+    path = tmp_path / "trace.otlp.jsonl"
+    tracing.configure_tracing(str(path), format="otlp")
+    try:
+        with tracing.span("stage", count=3, ok=True):
+            pass
+    finally:
+        tracing.tracer.shutdown()
+    record = json.loads(path.read_text(encoding="utf-8"))
+    span = record["resourceSpans"][0]["scopeSpans"][0]["spans"][0]
+    assert span["name"] == "stage" and len(span["traceId"]) == 32 and len(span["spanId"]) == 16
+    assert {"key": "count", "value": {"intValue": "3"}} in span["attributes"]
+    assert {"key": "ok", "value": {"boolValue": True}} in span["attributes"]
+
+
+def test_spider_note_and_download_stages(trace_file, tmp_path, monkeypatch):
+    monkeypatch.setattr(xhs_util, "generate_xs_xs_common", lambda a1, api, data='': ("xs", 1, "xsc"))
+    monkeypatch.setattr(xhs_util, "generate_xray_traceid", lambda: "trace")
+    xhs_util.signature_cache.clear()
+    spider = Data_Spider()
+    card = {
+        "type": "normal", "user": {"user_id": "u1", "nickname": "nick", "avatar": "a.jpg"},
+        "title": "title", "desc": "desc",
+        "interact_info": {"liked_count": 1, "collected_count": 2, "comment_count": 3, "share_count": 4},
+        "image_list": [{"info_list": [{}, {"url": f"http://img.test/{i}.jpg"}]} for i in range(2)],
+        "tag_list": [], "time": 1609459200000,
+    }
+    with requests_mock.Mocker() as m:
+        m.post(spider.xhs_apis.base_url + "/api/sns/web/v1/feed",
+               json={"success": True, "msg": "ok", "data": {"items": [{"id": "n1", "note_card": card}]}})
+        m.get(requests_mock.ANY, content=b"jpeg")
+        success, msg, note_info = spider.spider_note("https://www.xiaohongshu.com/explore/n1?xsec_token=t", "a1=demo")
+        assert success, msg
+        download_note(note_info, str(tmp_path), "media")
+
+    spans = _spans(trace_file)
+    by_id = {s["span_id"]: s for s in spans}
+    names = [s["name"] for s in spans]
+    for name in ("sign", "request", "parse", "handle", "spider_note", "download_note"):
+        assert name in names
+    for s in spans:
+        if s["name"] in ("sign", "request", "parse", "handle"):
+            assert by_id[s["parent_id"]]["name"] == "spider_note"
+    downloads = [s for s in spans if s["name"] == "download"]
+    assert len(downloads) == 2
+    assert all(by_id[s["parent_id"]]["name"] == "download_note" for s in downloads)
+    assert all(s["attributes"]["bytes"] == 4 for s in downloads)
@@ -0,0 +1,225 @@
+"""TTL response cache for XHS API calls (in-memory LRU with optional SQLite tier)"""
+import copy
+import hashlib
+import json
+import sqlite3
+import threading
+import time
+from collections import OrderedDict
+from typing import Any, Callable, Dict, Optional, Tuple
+
+from loguru import logger
+
+# Seconds a cached response stays valid, per endpoint
+DEFAULT_TTLS = {
+    '/api/sns/web/v1/feed': 1800,
+    '/api/sns/web/v1/user/otherinfo': 1800,
+    '/api/sns/web/v1/search/notes': 600,
+}
+
+# Request fields that change on every call without changing the result
+VOLATILE_PARAMS = {'search_id', 'request_id'}
+
+
+def make_cache_key(endpoint: str, params: Dict[str, Any]) -> str:
+    """Build a stable key from an endpoint and its normalized parameters."""
+    normalized = {k: v for k, v in params.items() if k not in VOLATILE_PARAMS}
+    payload = json.dumps(normalized, sort_keys=True, separators=(',', ':'), ensure_ascii=False, default=str)
+    return f"{endpoint}:{hashlib.sha1(payload.encode('utf-8')).hexdigest()}"
+
+
+class MemoryCache:
+    """
+    Size-bounded LRU mapping key -> (expires_at, value)
+
+    Values are copied in and out so callers may modify what they stored or got back.
+    """
+
+    def __init__(self, maxsize: int = 1024):
+        self.maxsize = maxsize
+        self._data: OrderedDict = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, key: str, now: float) -> Tuple[bool, Any]:
+        with self._lock:
+            entry = self._data.get(key)
+            if entry is None:
+                return False, None
+            expires_at, value = entry
+            if expires_at <= now:
+                del self._data[key]
+                return False, None
+            self._data.move_to_end(key)
+        return True, copy.deepcopy(value)
+
+    def set(self, key: str, value: Any, expires_at: float) -> None:
+        value = copy.deepcopy(value)
+        with self._lock:
+            self._data[key] = (expires_at, value)
+            self._data.move_to_end(key)
+            while len(self._data) > self.maxsize:
+                self._data.popitem(last=False)
+
+    def __len__(self) -> int:
+        return len(self._data)
+
+
+class DiskCache:
+    """
+    SQLite-backed cache tier that survives between runs
+
+    The row count is tracked in memory. Once it passes ``max_entries`` the
+    expired rows and then the oldest ones are deleted down to
+    ``evict_ratio * max_entries``, so eviction runs once per batch of inserts.
+    """
+
+    def __init__(self, path: str, max_entries: int = 100000, evict_ratio: float = 0.9):
+        self.path = path
+        self.max_entries = max_entries
+        self.evict_ratio = evict_ratio
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(path, check_same_thread=False)
+        self._conn.execute(
+            "CREATE TABLE IF NOT EXISTS responses ("
+            "key TEXT PRIMARY KEY, expires_at REAL, stored_at REAL, value TEXT)"
+        )
+        self._conn.execute("CREATE INDEX IF NOT EXISTS idx_stored_at ON responses(stored_at)")
+        self._conn.commit()
+        self._count = self._conn.execute("SELECT COUNT(*) FROM responses").fetchone()[0]
+
+    def get(self, key: str, now: float) -> Tuple[bool, Any, float]:
+        with self._lock:
+            row = self._conn.execute(
+                "SELECT expires_at, value FROM responses WHERE key = ?", (key,)
+            ).fetchone()
+            if row is None:
+                return False, None, 0.0
+            if row[0] <= now:
+                self._conn.execute("DELETE FROM responses WHERE key = ?", (key,))
+                self._conn.commit()
+                self._count -= 1
+                return False, None, 0.0
+        return True, json.loads(row[1]), row[0]
+
+    def set(self, key: str, value: Any, expires_at: float) -> None:
+        payload = json.dumps(value, ensure_ascii=False)
+        with self._lock:
+            exists = self._conn.execute("SELECT 1 FROM responses WHERE key = ?", (key,)).fetchone()
+            self._conn.execute(
+                "INSERT OR REPLACE INTO responses (key, expires_at, stored_at, value) VALUES (?, ?, ?, ?)",
+                (key, expires_at, time.time(), payload),
+            )
+            if exists is None:
+                self._count += 1
+            if self._count > self.max_entries:
+                self._evict()
+            self._conn.commit()
+
+    def _evict(self) -> None:
+        # drop expired rows first, then the oldest ones
+        target = int(self.max_entries * self.evict_ratio)
+        self._count -= self._conn.execute("DELETE FROM responses WHERE expires_at <= ?", (time.time(),)).rowcount
+        if self._count > target:
+            self._count -= self._conn.execute(
+                "DELETE FROM responses WHERE key IN ("
+                "SELECT key FROM responses ORDER BY stored_at ASC LIMIT ?)",
+                (self._count - target,),
+            ).rowcount
+
+    def __len__(self) -> int:
+        return self._count
+
+    def close(self) -> None:
+        with self._lock:
+            self._conn.close()
+
+
+class ResponseCache:
+    """
+    Two-tier response cache keyed by endpoint and normalized params.
+
+    Args:
+        memory_size: Maximum entries kept in the in-memory LRU
+        disk_path: SQLite file for the on-disk tier, None to disable it
+        disk_size: Maximum entries kept on disk
+        ttls: Per-endpoint TTL overrides in seconds
+        default_ttl: TTL for endpoints missing from ``ttls``
+    """
+
+    def __init__(
+        self,
+        memory_size: int = 1024,
+        disk_path: Optional[str] = None,
+        disk_size: int = 100000,
+        ttls: Optional[Dict[str, float]] = None,
+        default_ttl: float = 300,
+    ):
+        self.memory = MemoryCache(memory_size)
+        self.disk = DiskCache(disk_path, disk_size) if disk_path else None
+        self.ttls = dict(DEFAULT_TTLS)
+        if ttls:
+            self.ttls.update(ttls)
+        self.default_ttl = default_ttl
+        self._lock = threading.Lock()
+        self.stats = {'memory_hits': 0, 'disk_hits': 0, 'misses': 0, 'stores': 0}
+
+    def ttl_for(self, endpoint: str) -> float:
+        return self.ttls.get(endpoint, self.default_ttl)
+
+    def _count(self, name: str) -> None:
+        with self._lock:
+            self.stats[name] += 1
+
+    def get(self, endpoint: str, params: Dict[str, Any]) -> Tuple[bool, Any]:
+        """Return ``(hit, value)`` for a request."""
+        key = make_cache_key(endpoint, params)
+        now = time.time()
+        hit, value = self.memory.get(key, now)
+        if hit:
+            self._count('memory_hits')
+            return True, value
+        if self.disk is not None:
+            hit, value, expires_at = self.disk.get(key, now)
+            if hit:
+                self._count('disk_hits')
+                # promote to memory with the remaining lifetime
+                self.memory.set(key, value, expires_at)
+                return True, value
+        self._count('misses')
+        return False, None
+
+    def set(self, endpoint: str, params: Dict[str, Any], value: Any) -> None:
+        ttl = self.ttl_for(endpoint)
+        if ttl <= 0:
+            return
+        key = make_cache_key(endpoint, params)
+        expires_at = time.time() + ttl
+        self.memory.set(key, value, expires_at)
+        if self.disk is not None:
+            try:
+                self.disk.set(key, value, expires_at)
+            except (TypeError, ValueError, sqlite3.Error) as e:
+                logger.warning(f"Could not persist cached response for {endpoint}: {e}")
+        self._count('stores')
+
+    def fetch(self, endpoint: str, params: Dict[str, Any], func: Callable[[], Tuple[bool, str, Any]]) -> Tuple[bool, str, Any]:
+        """Return a cached ``(success, msg, data)`` result or call ``func`` and cache it on success."""
+        hit, value = self.get(endpoint, params)
+        if hit:
+            return True, 'cached', value
+        success, msg, data = func()
+        if success and data is not None:
+            self.set(endpoint, params, data)
+        return success, msg, data
+
+    def report(self) -> Dict[str, Any]:
+        with self._lock:
+            stats = dict(self.stats)
+        lookups = stats['memory_hits'] + stats['disk_hits'] + stats['misses']
+        stats['hit_rate'] = round((stats['memory_hits'] + stats['disk_hits']) / lookups, 3) if lookups else 0.0
+        stats['memory_entries'] = len(self.memory)
+        return stats
+
+    def close(self) -> None:
+        if self.disk is not None:
+            self.disk.close()
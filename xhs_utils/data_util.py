@@ -4,12 +4,14 @@ import re
 import time
 import unicodedata
 import subprocess
+from datetime import datetime, tzinfo
 import openpyxl
 import requests
 from loguru import logger
 from retry import retry
 from tqdm import tqdm
 from concurrent.futures import ThreadPoolExecutor, as_completed
+from xhs_utils import metrics, tracing
 
 
 def norm_str(text: str) -> str:
@@ -25,10 +27,30 @@ def norm_text(text):
     return text
 
 
-def timestamp_to_str(timestamp):
-    time_local = time.localtime(timestamp / 1000)
-    dt = time.strftime("%Y-%m-%d %H:%M:%S", time_local)
-    return dt
+_SECONDS = tuple(f"{second:02d}" for second in range(60))
+_minute_prefixes = {}
+
+
+def _minute_prefix(minute: int, tz: tzinfo | None) -> str:
+    if tz is None:
+        return time.strftime("%Y-%m-%d %H:%M:", time.localtime(minute * 60))
+    return datetime.fromtimestamp(minute * 60, tz).strftime("%Y-%m-%d %H:%M:")
+
+
+def timestamp_to_str(timestamp, tz: tzinfo | None = None):
+    """Format a millisecond timestamp in local time, or in ``tz`` when given.
+
+    UTC offsets are whole minutes, so each formatted minute is cached and
+    only the seconds are appended per call.
+    """
+    minute, second = divmod(int(timestamp // 1000), 60)
+    key = minute if tz is None else (minute, tz)
+    prefix = _minute_prefixes.get(key)
+    if prefix is None:
+        if len(_minute_prefixes) >= 65536:
+            _minute_prefixes.clear()
+        prefix = _minute_prefixes[key] = _minute_prefix(minute, tz)
+    return prefix + _SECONDS[second]
 
 def handle_user_info(data, user_id):
     home_url = f'https://www.xiaohongshu.com/user/profile/{user_id}'
@@ -69,119 +91,82 @@ def handle_user_info(data, user_id):
         'tags': tags,
     }
 
+def _info_urls(media_list):
+    """``info_list[1]['url']`` of every image or picture that has one"""
+    try:
+        # success, msg, img_url = XHS_Apis.get_note_no_water_img(media['info_list'][1]['url'])
+        return [media['info_list'][1]['url'] for media in media_list]
+    except (KeyError, IndexError, TypeError):
+        urls = []
+        for media in media_list:
+            try:
+                urls.append(media['info_list'][1]['url'])
+            except (KeyError, IndexError, TypeError):
+                pass
+        return urls
+
 def handle_note_info(data):
+    card = data['note_card']
+    user = card['user']
+    interact_info = card['interact_info']
     note_id = data['id']
     note_url = data['url']
-    note_type = data['note_card']['type']
-    if note_type == 'normal':
-        note_type = 'image_collection'
-    else:
-        note_type = 'video'
-    user_id = data['note_card']['user']['user_id']
+    note_type = 'image_collection' if card['type'] == 'normal' else 'video'
+    user_id = user['user_id']
     home_url = f'https://www.xiaohongshu.com/user/profile/{user_id}'
-    nickname = data['note_card']['user']['nickname']
-    avatar = data['note_card']['user']['avatar']
-    title = data['note_card']['title']
+    title = card['title']
     if title.strip() == '':
         title = 'Untitled'
-    desc = data['note_card']['desc']
-    liked_count = data['note_card']['interact_info']['liked_count']
-    collected_count = data['note_card']['interact_info']['collected_count']
-    comment_count = data['note_card']['interact_info']['comment_count']
-    share_count = data['note_card']['interact_info']['share_count']
-    image_list_temp = data['note_card']['image_list']
-    image_list = []
-    for image in image_list_temp:
-        try:
-            image_list.append(image['info_list'][1]['url'])
-            # success, msg, img_url = XHS_Apis.get_note_no_water_img(image['info_list'][1]['url'])
-            # image_list.append(img_url)
-        except:
-            pass
+    image_list = _info_urls(card['image_list'])
     if note_type == 'video':
         video_cover = image_list[0]
-        video_addr = f"https://sns-video-bd.xhscdn.com/{data['note_card']['video']['consumer']['origin_video_key']}"
+        video_addr = f"https://sns-video-bd.xhscdn.com/{card['video']['consumer']['origin_video_key']}"
         # success, msg, video_addr = XHS_Apis.get_note_no_water_video(note_id)
     else:
         video_cover = None
         video_addr = None
-    tags_temp = data['note_card']['tag_list']
-    tags = []
-    for tag in tags_temp:
-        try:
-            tags.append(tag['name'])
-        except:
-            pass
-    upload_time = timestamp_to_str(data['note_card']['time'])
-    if 'ip_location' in data['note_card']:
-        ip_location = data['note_card']['ip_location']
-    else:
-        ip_location = 'unknown'
     return {
         'note_id': note_id,
         'note_url': note_url,
         'note_type': note_type,
         'user_id': user_id,
         'home_url': home_url,
-        'nickname': nickname,
-        'avatar': avatar,
+        'nickname': user['nickname'],
+        'avatar': user['avatar'],
         'title': title,
-        'desc': desc,
-        'liked_count': liked_count,
-        'collected_count': collected_count,
-        'comment_count': comment_count,
-        'share_count': share_count,
+        'desc': card['desc'],
+        'liked_count': interact_info['liked_count'],
+        'collected_count': interact_info['collected_count'],
+        'comment_count': interact_info['comment_count'],
+        'share_count': interact_info['share_count'],
         'video_cover': video_cover,
         'video_addr': video_addr,
         'image_list': image_list,
-        'tags': tags,
-        'upload_time': upload_time,
-        'ip_location': ip_location,
+        'tags': [tag['name'] for tag in card.get('tag_list') or [] if isinstance(tag, dict) and 'name' in tag],
+        'upload_time': timestamp_to_str(card['time']),
+        'ip_location': card.get('ip_location', 'unknown'),
     }
 
 def handle_comment_info(data):
-    note_id = data['note_id']
-    note_url = data['note_url']
-    comment_id = data['id']
-    user_id = data['user_info']['user_id']
-    home_url = f'https://www.xiaohongshu.com/user/profile/{user_id}'
-    nickname = data['user_info']['nickname']
-    avatar = data['user_info']['image']
-    content = data['content']
-    show_tags = data['show_tags']
-    like_count = data['like_count']
-    upload_time = timestamp_to_str(data['create_time'])
-    try:
-        ip_location = data['ip_location']
-    except Exception:
-        ip_location = 'unknown'
-    pictures = []
-    try:
-        pictures_temp = data['pictures']
-        for picture in pictures_temp:
-            try:
-                pictures.append(picture['info_list'][1]['url'])
-                # success, msg, img_url = XHS_Apis.get_note_no_water_img(picture['info_list'][1]['url'])
-                # pictures.append(img_url)
-            except:
-                pass
-    except:
-        pass
+    user_info = data['user_info']
+    user_id = user_info['user_id']
+    pictures = data.get('pictures')
     return {
-        'note_id': note_id,
-        'note_url': note_url,
-        'comment_id': comment_id,
+        'note_id': data['note_id'],
+        'note_url': data['note_url'],
+        'comment_id': data['id'],
         'user_id': user_id,
-        'home_url': home_url,
-        'nickname': nickname,
-        'avatar': avatar,
-        'content': content,
-        'show_tags': show_tags,
-        'like_count': like_count,
-        'upload_time': upload_time,
-        'ip_location': ip_location,
-        'pictures': pictures,
+        'home_url': f'https://www.xiaohongshu.com/user/profile/{user_id}',
+        'nickname': user_info['nickname'],
+        'avatar': user_info['image'],
+        'content': data['content'],
+        'show_tags': data['show_tags'],
+        'like_count': data['like_count'],
+        'upload_time': timestamp_to_str(data['create_time']),
+        'ip_location': data.get('ip_location', 'unknown'),
+        'pictures': _info_urls(pictures) if pictures else [],
     }
+@tracing.traced('save_to_xlsx')
 def save_to_xlsx(datas, file_path, type='note'):
     wb = openpyxl.Workbook()
     ws = wb.active
@@ -211,25 +196,46 @@ def save_to_xlsx(datas, file_path, type='note'):
     wb.save(file_path)
     logger.info(f'Data saved to {file_path}')
 
-def download_media(path: str, name: str, url: str, type: str, failed: list | None = None) -> bool:
-    """Download an image or video file. Return True on success."""
-    try:
-        if type == 'image':
-            content = requests.get(url).content
-            with open(f"{path}/{name}.jpg", "wb") as f:
-                f.write(content)
-        elif type == 'video':
-            res = requests.get(url, stream=True)
-            chunk_size = 1024 * 1024
-            with open(f"{path}/{name}.mp4", "wb") as f:
-                for data in res.iter_content(chunk_size=chunk_size):
-                    f.write(data)
+def download_media(path: str, name: str, url: str, type: str, failed: list | None = None, frontier=None) -> bool:
+    """Download an image or video file. Return True on success.
+
+    With a ``CrawlFrontier`` urls downloaded in earlier runs are skipped.
+    """
+    if frontier is not None and frontier.seen('media', url):
+        logger.debug(f"Skipping already downloaded {url}")
         return True
-    except Exception as e:
-        logger.error(f"Download failed for {url}: {e}")
-        if failed is not None:
-            failed.append({"path": path, "name": name, "url": url, "type": type})
-        return False
+    with tracing.span('download', type=type, file=name) as span:
+        start = time.perf_counter()
+        nbytes = 0
+        try:
+            if type == 'image':
+                res = requests.get(url)
+                # an error page must not be saved as media or marked as downloaded
+                res.raise_for_status()
+                content = res.content
+                with open(f"{path}/{name}.jpg", "wb") as f:
+                    f.write(content)
+                nbytes = len(content)
+            elif type == 'video':
+                res = requests.get(url, stream=True)
+                res.raise_for_status()
+                chunk_size = 1024 * 1024
+                with open(f"{path}/{name}.mp4", "wb") as f:
+                    for data in res.iter_content(chunk_size=chunk_size):
+                        f.write(data)
+                        nbytes += len(data)
+            metrics.record_download(type, nbytes, time.perf_counter() - start)
+            span.set_attribute('bytes', nbytes)
+            if frontier is not None:
+                frontier.add('media', url)
+            return True
+        except Exception as e:
+            logger.error(f"Download failed for {url}: {e}")
+            span.set_attribute('error', str(e))
+            metrics.record_download(type, nbytes, time.perf_counter() - start, ok=False)
+            if failed is not None:
+                failed.append({"path": path, "name": name, "url": url, "type": type})
+            return False
 
 def transcode_to_h264(path: str) -> bool:
     """Transcode a video to H.264 using ffmpeg."""
@@ -246,7 +252,8 @@ def transcode_to_h264(path: str) -> bool:
         out_path,
     ]
     try:
-        subprocess.run(cmd, check=True, stdout=subprocess.PIPE, stderr=subprocess.PIPE)
+        with tracing.span('ffmpeg', path=path):
+            subprocess.run(cmd, check=True, stdout=subprocess.PIPE, stderr=subprocess.PIPE)
         os.remove(path)
         os.rename(out_path, path)
         return True
@@ -297,51 +304,59 @@ def save_note_detail(note, path):
 
 
 
+def _drain_images(futures) -> None:
+    """Wait for image downloads, publishing how many are still outstanding"""
+    remaining = len(futures)
+    metrics.QUEUE_DEPTH.set(remaining, queue='images')
+    for _ in tqdm(as_completed(futures), total=len(futures), desc="images"):
+        remaining -= 1
+        metrics.QUEUE_DEPTH.set(remaining, queue='images')
+
+
 @retry(tries=3, delay=1)
-def download_note(note_info, path, save_choice, transcode=False, failed: list | None = None):
+def download_note(note_info, path, save_choice, transcode=False, failed: list | None = None, frontier=None):
     note_id = note_info['note_id']
-    user_id = note_info['user_id']
-    title = norm_str(note_info['title'])
-    nickname = norm_str(note_info['nickname'])
-    if title.strip() == '':
-        title = 'Untitled'
-    note_type = note_info['note_type']
-
-    # flat mode: directly store media under base path
-    if save_choice == 'image-flat' and note_type == 'image_collection':
-        with ThreadPoolExecutor(max_workers=4) as ex:
-            futures = {
-                ex.submit(download_media, path, f"{note_id}_{idx}", url, 'image', failed): url
-                for idx, url in enumerate(note_info['image_list'])
-            }
-            for _ in tqdm(as_completed(futures), total=len(futures), desc="images"):
-                pass
-        return path
-    if save_choice == 'video-flat' and note_type == 'video':
-        download_media(path, note_id, note_info['video_addr'], 'video', failed)
-        if transcode:
-            transcode_to_h264(f"{path}/{note_id}.mp4")
-        return path
-
-    save_path = f'{path}/{nickname}_{user_id}/{title}_{note_id}'
-    check_and_create_path(save_path)
-    with open(f'{save_path}/info.json', mode='w', encoding='utf-8') as f:
-        f.write(json.dumps(note_info) + '\n')
-    save_note_detail(note_info, save_path)
-    if note_type == 'image_collection' and save_choice in ['media', 'media-image', 'all']:
-        with ThreadPoolExecutor(max_workers=4) as ex:
-            futures = {
-                ex.submit(download_media, save_path, f'image_{idx}', url, 'image', failed): url
-                for idx, url in enumerate(note_info['image_list'])
-            }
-            for _ in tqdm(as_completed(futures), total=len(futures), desc="images"):
-                pass
-    elif note_type == 'video' and save_choice in ['media', 'media-video', 'all']:
-        download_media(save_path, 'cover', note_info['video_cover'], 'image', failed)
-        download_media(save_path, 'video', note_info['video_addr'], 'video', failed)
-        if transcode:
-            transcode_to_h264(f"{save_path}/video.mp4")
-    return save_path
+    with tracing.span('download_note', note_id=note_id, save_choice=save_choice):
+        user_id = note_info['user_id']
+        title = norm_str(note_info['title'])
+        nickname = norm_str(note_info['nickname'])
+        if title.strip() == '':
+            title = 'Untitled'
+        note_type = note_info['note_type']
+
+        # flat mode: directly store media under base path
+        if save_choice == 'image-flat' and note_type == 'image_collection':
+            with ThreadPoolExecutor(max_workers=4) as ex:
+                futures = {
+                    ex.submit(tracing.propagate(download_media), path, f"{note_id}_{idx}", url, 'image', failed, frontier): url
+                    for idx, url in enumerate(note_info['image_list'])
+                }
+                _drain_images(futures)
+            return path
+        if save_choice == 'video-flat' and note_type == 'video':
+            download_media(path, note_id, note_info['video_addr'], 'video', failed, frontier)
+            if transcode:
+                transcode_to_h264(f"{path}/{note_id}.mp4")
+            return path
+
+        save_path = f'{path}/{nickname}_{user_id}/{title}_{note_id}'
+        check_and_create_path(save_path)
+        with open(f'{save_path}/info.json', mode='w', encoding='utf-8') as f:
+            f.write(json.dumps(note_info) + '\n')
+        save_note_detail(note_info, save_path)
+        if note_type == 'image_collection' and save_choice in ['media', 'media-image', 'all']:
+            with ThreadPoolExecutor(max_workers=4) as ex:
+                futures = {
+                    ex.submit(tracing.propagate(download_media), save_path, f'image_{idx}', url, 'image', failed, frontier): url
+                    for idx, url in enumerate(note_info['image_list'])
+                }
+                _drain_images(futures)
+        elif note_type == 'video' and save_choice in ['media', 'media-video', 'all']:
+            download_media(save_path, 'cover', note_info['video_cover'], 'image', failed, frontier)
+            download_media(save_path, 'video', note_info['video_addr'], 'video', failed, frontier)
+            if transcode:
+                transcode_to_h264(f"{save_path}/video.mp4")
+        return save_path
 
 
 def check_and_create_path(path):
@@ -13,6 +13,12 @@ except ImportError:
         def error(self, msg): print(f"ERROR: {msg}")
     logger = FallbackLogger()
 
+try:
+    import orjson
+except ImportError:
+    # Optional faster decoder, the stdlib json is used without it
+    orjson = None
+
 
 class XHSError(Exception):
     """Base exception for XHS Spider"""
@@ -39,6 +45,19 @@ class XHSAPIError(XHSError):
     pass
 
 
+def decode_json(response) -> Any:
+    """Decode a response body, with orjson when it is installed"""
+    if orjson is not None:
+        content = getattr(response, 'content', None)
+        if isinstance(content, (bytes, bytearray, memoryview, str)):
+            try:
+                return orjson.loads(content)
+            except orjson.JSONDecodeError:
+                # not UTF-8 or not JSON; let requests guess the encoding and report the error
+                pass
+    return response.json()
+
+
 def parse_response(response) -> Tuple[bool, str, Optional[Dict[Any, Any]]]:
     """Enhanced response parsing with proper error handling"""
     try:
@@ -63,7 +82,7 @@ def parse_response(response) -> Tuple[bool, str, Optional[Dict[Any, Any]]]:
         
         # Try to parse JSON
         try:
-            res_json = response.json()
+            res_json = decode_json(response)
         except json.JSONDecodeError:
             raise XHSAPIError(f"Invalid JSON response: {response.text[:200]}")
         
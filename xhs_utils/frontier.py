@@ -0,0 +1,201 @@
+"""Persistent crawl frontier backed by memory-mapped scalable Bloom filters"""
+import hashlib
+import math
+import mmap
+import os
+import struct
+import threading
+from typing import Dict, List
+
+from loguru import logger
+
+_MAGIC = b'XBLM'
+_HEADER = struct.Struct('<4sIQIQQd')
+_HEADER_SIZE = 64
+
+
+class BloomFilter:
+    """
+    Fixed-size Bloom filter stored in a memory-mapped file
+
+    Args:
+        path: File backing the bit array, created if missing
+        capacity: Number of keys the filter is sized for
+        error_rate: Target false-positive rate at ``capacity`` keys
+    """
+
+    def __init__(self, path: str, capacity: int = 1_000_000, error_rate: float = 0.001):
+        self.path = path
+        if os.path.exists(path):
+            self._open_existing()
+        else:
+            self.capacity = capacity
+            self.error_rate = error_rate
+            self.num_bits = max(8, math.ceil(-capacity * math.log(error_rate) / (math.log(2) ** 2)))
+            self.num_hashes = max(1, round(self.num_bits / capacity * math.log(2)))
+            self.count = 0
+            with open(path, 'wb') as f:
+                f.truncate(_HEADER_SIZE + (self.num_bits + 7) // 8)
+            self._map()
+            self._write_header()
+
+    def _map(self) -> None:
+        self._file = open(self.path, 'r+b')
+        self._mm = mmap.mmap(self._file.fileno(), 0)
+
+    def _open_existing(self) -> None:
+        self._map()
+        magic, _, self.num_bits, self.num_hashes, self.capacity, self.count, self.error_rate = \
+            _HEADER.unpack_from(self._mm, 0)
+        if magic != _MAGIC:
+            raise ValueError(f"{self.path} is not a bloom filter file")
+
+    def _write_header(self) -> None:
+        _HEADER.pack_into(self._mm, 0, _MAGIC, 1, self.num_bits, self.num_hashes,
+                          self.capacity, self.count, self.error_rate)
+
+    def _positions(self, key: str):
+        digest = hashlib.blake2b(key.encode('utf-8'), digest_size=16).digest()
+        h1 = int.from_bytes(digest[:8], 'little')
+        h2 = int.from_bytes(digest[8:], 'little') | 1
+        for i in range(self.num_hashes):
+            yield (h1 + i * h2) % self.num_bits
+
+    def __contains__(self, key: str) -> bool:
+        mm = self._mm
+        for pos in self._positions(key):
+            if not mm[_HEADER_SIZE + (pos >> 3)] & (1 << (pos & 7)):
+                return False
+        return True
+
+    def add(self, key: str) -> bool:
+        """Set the key's bits; return True if it was not present before."""
+        mm = self._mm
+        added = False
+        for pos in self._positions(key):
+            offset = _HEADER_SIZE + (pos >> 3)
+            bit = 1 << (pos & 7)
+            byte = mm[offset]
+            if not byte & bit:
+                mm[offset] = byte | bit
+                added = True
+        if added:
+            self.count += 1
+            self._write_header()
+        return added
+
+    @property
+    def is_full(self) -> bool:
+        return self.count >= self.capacity
+
+    def flush(self) -> None:
+        self._mm.flush()
+
+    def close(self) -> None:
+        self._mm.flush()
+        self._mm.close()
+        self._file.close()
+
+
+class ScalableBloomFilter:
+    """
+    Chain of Bloom filters that grows as keys are added
+
+    Each new filter has ``growth`` times the capacity and ``tightening`` times
+    the error rate of the previous one, so the overall false-positive rate
+    stays below ``error_rate / (1 - tightening)``.
+    """
+
+    def __init__(
+        self,
+        directory: str,
+        name: str,
+        initial_capacity: int = 100_000,
+        error_rate: float = 0.001,
+        growth: int = 2,
+        tightening: float = 0.5,
+    ):
+        os.makedirs(directory, exist_ok=True)
+        self.directory = directory
+        self.name = name
+        self.initial_capacity = initial_capacity
+        self.error_rate = error_rate
+        self.growth = growth
+        self.tightening = tightening
+        self._lock = threading.Lock()
+        self.filters: List[BloomFilter] = []
+        index = 0
+        while os.path.exists(self._path(index)):
+            self.filters.append(BloomFilter(self._path(index)))
+            index += 1
+        if not self.filters:
+            self._grow()
+
+    def _path(self, index: int) -> str:
+        return os.path.join(self.directory, f'{self.name}.{index}.bloom')
+
+    def _grow(self) -> None:
+        index = len(self.filters)
+        capacity = self.initial_capacity * self.growth ** index
+        # split the error budget so the chain converges to error_rate / (1 - tightening)
+        error = self.error_rate * (1 - self.tightening) * self.tightening ** index
+        self.filters.append(BloomFilter(self._path(index), capacity, error))
+
+    def __contains__(self, key: str) -> bool:
+        return any(key in f for f in reversed(self.filters))
+
+    def add(self, key: str) -> bool:
+        """Add ``key``; return False if it was (probably) already present."""
+        with self._lock:
+            if key in self:
+                return False
+            if self.filters[-1].is_full:
+                self._grow()
+            return self.filters[-1].add(key)
+
+    def __len__(self) -> int:
+        return sum(f.count for f in self.filters)
+
+    def flush(self) -> None:
+        for f in self.filters:
+            f.flush()
+
+    def close(self) -> None:
+        for f in self.filters:
+            f.close()
+
+
+class CrawlFrontier:
+    """
+    Persistent record of note ids and media urls already crawled
+
+    Check :meth:`seen` before a detail or media request and :meth:`add` once
+    its result is saved. False positives (a new key reported as seen) happen at the
+    configured ``error_rate``; false negatives never happen.
+    """
+
+    NAMESPACES = ('note', 'media')
+
+    def __init__(self, directory: str, initial_capacity: int = 100_000, error_rate: float = 0.001):
+        self.directory = directory
+        self.filters: Dict[str, ScalableBloomFilter] = {
+            ns: ScalableBloomFilter(directory, ns, initial_capacity, error_rate) for ns in self.NAMESPACES
+        }
+        logger.info(f"Crawl frontier loaded from {directory}: {self.stats()}")
+
+    def seen(self, namespace: str, key: str) -> bool:
+        return key in self.filters[namespace]
+
+    def add(self, namespace: str, key: str) -> bool:
+        return self.filters[namespace].add(key)
+
+    def stats(self) -> Dict[str, int]:
+        return {ns: len(f) for ns, f in self.filters.items()}
+
+    def flush(self) -> None:
+        for f in self.filters.values():
+            f.flush()
+
+    def close(self) -> None:
+        for f in self.filters.values():
+            f.close()
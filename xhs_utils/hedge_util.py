@@ -0,0 +1,216 @@
+"""Request hedging to cut tail latency on latency-critical calls"""
+import math
+import threading
+import time
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor, wait, FIRST_COMPLETED
+from typing import Any, Callable, Dict, List, Optional, Tuple
+
+from loguru import logger
+
+from xhs_utils import tracing
+
+
+def percentile(values: List[float], pct: float) -> float:
+    """Return the ``pct`` percentile (0-100) of ``values`` using nearest rank."""
+    if not values:
+        return 0.0
+    ordered = sorted(values)
+    rank = max(math.ceil(pct / 100.0 * len(ordered)) - 1, 0)
+    return ordered[min(rank, len(ordered) - 1)]
+
+
+class LatencyTracker:
+    """Rolling window of request latencies"""
+
+    def __init__(self, window: int = 200):
+        self._samples: deque = deque(maxlen=window)
+        self._lock = threading.Lock()
+
+    def record(self, latency: float) -> None:
+        with self._lock:
+            self._samples.append(latency)
+
+    def __len__(self) -> int:
+        return len(self._samples)
+
+    def percentile(self, pct: float) -> float:
+        with self._lock:
+            samples = list(self._samples)
+        return percentile(samples, pct)
+
+
+class HedgedRequester:
+    """
+    Send a duplicate request when the first one runs past the observed p95.
+
+    ``func`` is called as ``func(proxies)``. The primary call uses the proxies
+    passed to :meth:`call`; the hedge goes through the next entry of
+    ``alternates`` (a list of proxy dicts, ``None`` meaning a direct
+    connection). Whichever call finishes first wins. ``requests`` calls cannot
+    be interrupted, so the losing call is abandoned: it is cancelled if it has
+    not started yet, otherwise its result is discarded. ``func`` should pass
+    ``request_timeout`` to the request so an abandoned call frees its worker,
+    and no hedge is sent while abandoned calls hold half of the pool.
+
+    Args:
+        alternates: Proxy dicts used for hedge requests
+        hedge_percentile: Latency percentile that triggers a hedge
+        max_hedge_ratio: Upper bound of hedges per primary request
+        min_samples: Samples required before the percentile is trusted
+        initial_delay: Hedge delay in seconds used until enough samples exist
+        window: Number of latency samples kept for the percentile
+        request_timeout: Seconds ``func`` should allow each request before giving up
+    """
+
+    def __init__(
+        self,
+        alternates: List[Optional[Dict[str, str]]],
+        hedge_percentile: float = 95.0,
+        max_hedge_ratio: float = 0.1,
+        min_samples: int = 20,
+        initial_delay: float = 2.0,
+        window: int = 200,
+        request_timeout: float = 30.0,
+    ):
+        if not alternates:
+            raise ValueError("At least one alternate proxy (or None) is required for hedging")
+        self.alternates = list(alternates)
+        self.hedge_percentile = hedge_percentile
+        self.max_hedge_ratio = max_hedge_ratio
+        self.min_samples = min_samples
+        self.initial_delay = initial_delay
+        self.request_timeout = request_timeout
+        self.tracker = LatencyTracker(window)
+        self.max_workers = 2 * len(self.alternates) + 2
+        self._executor = ThreadPoolExecutor(max_workers=self.max_workers)
+        # losing calls still running after their caller returned
+        self._abandoned = 0
+        self._lock = threading.Lock()
+        self._next_alternate = 0
+        # latency of the primary call alone vs latency observed by the caller
+        self._primary_latencies: deque = deque(maxlen=window)
+        self._effective_latencies: deque = deque(maxlen=window)
+        self.stats = {
+            'requests': 0,
+            'hedges_sent': 0,
+            'hedges_won': 0,
+            'hedges_skipped': 0,
+            'abandoned': 0,
+        }
+
+    def hedge_delay(self) -> float:
+        """Seconds to wait for the primary before sending a hedge."""
+        if len(self.tracker) < self.min_samples:
+            return self.initial_delay
+        return self.tracker.percentile(self.hedge_percentile)
+
+    def _acquire_hedge(self) -> bool:
+        with self._lock:
+            budget = self.max_hedge_ratio * self.stats['requests']
+            if self.stats['hedges_sent'] + 1 > budget or self._abandoned >= self.max_workers // 2:
+                self.stats['hedges_skipped'] += 1
+                return False
+            self.stats['hedges_sent'] += 1
+            return True
+
+    def _pick_alternate(self, primary: Optional[Dict[str, str]]) -> Optional[Dict[str, str]]:
+        with self._lock:
+            for _ in range(len(self.alternates)):
+                candidate = self.alternates[self._next_alternate % len(self.alternates)]
+                self._next_alternate += 1
+                if candidate != primary or len(self.alternates) == 1:
+                    return candidate
+        return self.alternates[0]
+
+    def _timed(self, func: Callable[[Any], Any], proxies: Optional[Dict[str, str]]) -> Tuple[Any, float]:
+        start = time.perf_counter()
+        result = func(proxies)
+        return result, time.perf_counter() - start
+
+    def _on_primary_done(self, future) -> None:
+        if future.cancelled() or future.exception() is not None:
+            return
+        _, elapsed = future.result()
+        self.tracker.record(elapsed)
+        with self._lock:
+            self._primary_latencies.append(elapsed)
+
+    def _abandon(self, future) -> None:
+        if future.cancel():
+            return
+        with self._lock:
+            self._abandoned += 1
+            self.stats['abandoned'] += 1
+        future.add_done_callback(self._on_abandoned_done)
+
+    def _on_abandoned_done(self, future) -> None:
+        with self._lock:
+            self._abandoned -= 1
+
+    @staticmethod
+    def _succeeded(result: Any) -> bool:
+        return not (isinstance(result, tuple) and len(result) == 3 and not result[0])
+
+    def call(self, func: Callable[[Any], Any], proxies: Optional[Dict[str, str]] = None) -> Any:
+        """Run ``func(proxies)`` and hedge it if it is slower than the threshold."""
+        with self._lock:
+            self.stats['requests'] += 1
+        started = time.perf_counter()
+        delay = self.hedge_delay()
+        primary = self._executor.submit(tracing.propagate(self._timed), func, proxies)
+        primary.add_done_callback(self._on_primary_done)
+
+        done, _ = wait([primary], timeout=delay)
+        if done or not self._acquire_hedge():
+            result, _ = primary.result()
+            self._record_effective(started)
+            return result
+
+        alternate = self._pick_alternate(proxies)
+        logger.debug(f"Primary request exceeded {delay:.2f}s, sending hedge via {alternate}")
+        hedge = self._executor.submit(tracing.propagate(self._timed), func, alternate)
+        pending = {primary, hedge}
+        result = None
+        while pending:
+            done, pending = wait(pending, return_when=FIRST_COMPLETED)
+            for future in done:
+                if future.exception() is not None:
+                    result = result if result is not None else future.exception()
+                    continue
+                value, _ = future.result()
+                if self._succeeded(value):
+                    for other in pending:
+                        self._abandon(other)
+                    if future is hedge:
+                        with self._lock:
+                            self.stats['hedges_won'] += 1
+                    self._record_effective(started)
+                    return value
+                result = value
+        self._record_effective(started)
+        if isinstance(result, BaseException):
+            raise result
+        return result
+
+    def _record_effective(self, started: float) -> None:
+        with self._lock:
+            self._effective_latencies.append(time.perf_counter() - started)
+
+    def report(self) -> Dict[str, Any]:
+        """Return hedge counters and p50/p95/p99 latency with and without hedging."""
+        with self._lock:
+            primary = list(self._primary_latencies)
+            effective = list(self._effective_latencies)
+            stats = dict(self.stats)
+        latency = {}
+        for name, samples in (('primary', primary), ('effective', effective)):
+            latency[name] = {
+                f'p{p}': round(percentile(samples, p), 4) for p in (50, 95, 99)
+            }
+        stats['latency'] = latency
+        stats['p99_improvement'] = round(latency['primary']['p99'] - latency['effective']['p99'], 4)
+        return stats
+
+    def shutdown(self) -> None:
+        self._executor.shutdown(wait=False)
@@ -0,0 +1,243 @@
+"""In-process crawl metrics with a Prometheus text exporter"""
+import threading
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Dict, Iterable, List, Optional, Sequence, Tuple
+
+from loguru import logger
+
+CONTENT_TYPE = 'text/plain; version=0.0.4; charset=utf-8'
+DEFAULT_BUCKETS = (0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0, 60.0)
+
+
+def _escape(value: str) -> str:
+    return str(value).replace('\\', '\\\\').replace('"', '\\"').replace('\n', '\\n')
+
+
+def _format_value(value: float) -> str:
+    if value == float('inf'):
+        return '+Inf'
+    return repr(value) if isinstance(value, float) else str(value)
+
+
+class _Metric:
+    """Label bookkeeping shared by all metric types"""
+
+    kind = ''
+
+    def __init__(self, name: str, documentation: str, labelnames: Sequence[str] = ()):
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = tuple(labelnames)
+        self._values: Dict[Tuple[str, ...], object] = {}
+        self._lock = threading.Lock()
+
+    def _key(self, labels: Dict[str, object]) -> Tuple[str, ...]:
+        unknown = set(labels) - set(self.labelnames)
+        if unknown:
+            raise ValueError(f"{self.name} has no label(s) {', '.join(sorted(unknown))}")
+        return tuple(str(labels.get(name, '')) for name in self.labelnames)
+
+    def _labels(self, key: Tuple[str, ...], extra: Iterable[Tuple[str, str]] = ()) -> str:
+        pairs = list(zip(self.labelnames, key)) + list(extra)
+        if not pairs:
+            return ''
+        return '{' + ','.join(f'{name}="{_escape(value)}"' for name, value in pairs) + '}'
+
+    def clear(self) -> None:
+        with self._lock:
+            self._values.clear()
+
+    def samples(self) -> List[str]:
+        raise NotImplementedError
+
+    def render(self) -> str:
+        lines = [f"# HELP {self.name} {self.documentation}", f"# TYPE {self.name} {self.kind}"]
+        lines.extend(self.samples())
+        return '\n'.join(lines)
+
+
+class Counter(_Metric):
+    """Monotonically increasing count"""
+
+    kind = 'counter'
+
+    def inc(self, amount: float = 1, **labels: object) -> None:
+        if amount < 0:
+            raise ValueError('counters can only increase')
+        key = self._key(labels)
+        with self._lock:
+            self._values[key] = self._values.get(key, 0) + amount
+
+    def value(self, **labels: object) -> float:
+        return self._values.get(self._key(labels), 0)
+
+    def samples(self) -> List[str]:
+        with self._lock:
+            items = sorted(self._values.items())
+        return [f"{self.name}{self._labels(key)} {_format_value(value)}" for key, value in items]
+
+
+class Gauge(Counter):
+    """Value that can go up and down"""
+
+    kind = 'gauge'
+
+    def inc(self, amount: float = 1, **labels: object) -> None:
+        key = self._key(labels)
+        with self._lock:
+            self._values[key] = self._values.get(key, 0) + amount
+
+    def dec(self, amount: float = 1, **labels: object) -> None:
+        self.inc(-amount, **labels)
+
+    def set(self, value: float, **labels: object) -> None:
+        key = self._key(labels)
+        with self._lock:
+            self._values[key] = value
+
+
+class Histogram(_Metric):
+    """Observations counted into cumulative buckets, plus their sum and count"""
+
+    kind = 'histogram'
+
+    def __init__(self, name: str, documentation: str, labelnames: Sequence[str] = (),
+                 buckets: Sequence[float] = DEFAULT_BUCKETS):
+        super().__init__(name, documentation, labelnames)
+        self.buckets = tuple(sorted(float(b) for b in buckets)) + (float('inf'),)
+
+    def observe(self, value: float, **labels: object) -> None:
+        key = self._key(labels)
+        with self._lock:
+            state = self._values.get(key)
+            if state is None:
+                # per-bucket counts, then sum and count
+                state = self._values[key] = [[0] * len(self.buckets), 0.0, 0]
+            for i, bound in enumerate(self.buckets):
+                if value <= bound:
+                    state[0][i] += 1
+                    break
+            state[1] += value
+            state[2] += 1
+
+    def count(self, **labels: object) -> int:
+        state = self._values.get(self._key(labels))
+        return state[2] if state else 0
+
+    def sum(self, **labels: object) -> float:
+        state = self._values.get(self._key(labels))
+        return state[1] if state else 0.0
+
+    def samples(self) -> List[str]:
+        with self._lock:
+            items = sorted((key, ([*state[0]], state[1], state[2])) for key, state in self._values.items())
+        lines = []
+        for key, (counts, total, count) in items:
+            cumulative = 0
+            for bound, n in zip(self.buckets, counts):
+                cumulative += n
+                lines.append(f"{self.name}_bucket{self._labels(key, [('le', _format_value(bound))])} {cumulative}")
+            lines.append(f"{self.name}_sum{self._labels(key)} {_format_value(total)}")
+            lines.append(f"{self.name}_count{self._labels(key)} {count}")
+        return lines
+
+
+class MetricsRegistry:
+    """Named collection of metrics rendered together in the text exposition format"""
+
+    def __init__(self):
+        self._metrics: Dict[str, _Metric] = {}
+        self._lock = threading.Lock()
+
+    def _register(self, cls, name: str, documentation: str, labelnames: Sequence[str], **kwargs) -> _Metric:
+        with self._lock:
+            metric = self._metrics.get(name)
+            if metric is None:
+                metric = self._metrics[name] = cls(name, documentation, labelnames, **kwargs)
+            elif type(metric) is not cls:
+                raise ValueError(f"{name} is already registered as a {metric.kind}")
+            return metric
+
+    def counter(self, name: str, documentation: str, labelnames: Sequence[str] = ()) -> Counter:
+        return self._register(Counter, name, documentation, labelnames)
+
+    def gauge(self, name: str, documentation: str, labelnames: Sequence[str] = ()) -> Gauge:
+        return self._register(Gauge, name, documentation, labelnames)
+
+    def histogram(self, name: str, documentation: str, labelnames: Sequence[str] = (),
+                  buckets: Sequence[float] = DEFAULT_BUCKETS) -> Histogram:
+        return self._register(Histogram, name, documentation, labelnames, buckets=buckets)
+
+    def clear(self) -> None:
+        """Drop all recorded values, keeping the metric definitions"""
+        for metric in list(self._metrics.values()):
+            metric.clear()
+
+    def render(self) -> str:
+        return '\n'.join(metric.render() for metric in list(self._metrics.values())) + '\n'
+
+
+registry = MetricsRegistry()
+
+REQUESTS = registry.counter('xhs_requests_total', 'API requests by endpoint, method and HTTP status',
+                            ('endpoint', 'method', 'status'))
+REQUEST_SECONDS = registry.histogram('xhs_request_duration_seconds', 'API request latency by endpoint', ('endpoint',))
+RESPONSE_BYTES = registry.counter('xhs_response_bytes_total', 'API response body bytes by endpoint', ('endpoint',))
+ERRORS = registry.counter('xhs_errors_total', 'Request and API errors by endpoint and error class',
+                          ('endpoint', 'error'))
+DOWNLOADS = registry.counter('xhs_downloads_total', 'Media downloads by type and result', ('type', 'result'))
+DOWNLOAD_BYTES = registry.counter('xhs_download_bytes_total', 'Downloaded media bytes by type', ('type',))
+DOWNLOAD_SECONDS = registry.histogram('xhs_download_duration_seconds', 'Media download time by type', ('type',))
+DOWNLOAD_THROUGHPUT = registry.gauge('xhs_download_throughput_bytes_per_second',
+                                     'Throughput of the last finished download by type', ('type',))
+QUEUE_DEPTH = registry.gauge('xhs_queue_depth', 'Work items waiting in each crawl queue', ('queue',))
+
+
+def record_request(endpoint: str, method: str, response, seconds: float) -> None:
+    """Count one API response and its latency and size under ``endpoint``"""
+    content = getattr(response, 'content', None)
+    REQUESTS.inc(endpoint=endpoint, method=method, status=getattr(response, 'status_code', ''))
+    REQUEST_SECONDS.observe(seconds, endpoint=endpoint)
+    if isinstance(content, (bytes, bytearray)):
+        RESPONSE_BYTES.inc(len(content), endpoint=endpoint)
+
+
+def record_error(endpoint: str, error: BaseException) -> None:
+    ERRORS.inc(endpoint=endpoint, error=type(error).__name__)
+
+
+def record_download(media_type: str, nbytes: int, seconds: float, ok: bool = True) -> None:
+    DOWNLOADS.inc(type=media_type, result='ok' if ok else 'failed')
+    if not ok:
+        return
+    DOWNLOAD_BYTES.inc(nbytes, type=media_type)
+    DOWNLOAD_SECONDS.observe(seconds, type=media_type)
+    if seconds > 0:
+        DOWNLOAD_THROUGHPUT.set(nbytes / seconds, type=media_type)
+
+
+def start_metrics_server(port: int, host: str = '127.0.0.1',
+                         metrics: Optional[MetricsRegistry] = None) -> ThreadingHTTPServer:
+    """Serve ``/metrics`` from a daemon thread; call ``shutdown()`` on the result to stop it"""
+    metrics = metrics or registry
+
+    class Handler(BaseHTTPRequestHandler):
+        def do_GET(self):
+            if self.path.split('?')[0] != '/metrics':
+                self.send_error(404)
+                return
+            body = metrics.render().encode('utf-8')
+            self.send_response(200)
+            self.send_header('Content-Type', CONTENT_TYPE)
+            self.send_header('Content-Length', str(len(body)))
+            self.end_headers()
+            self.wfile.write(body)
+
+        def log_message(self, format, *args):
+            pass
+
+    server = ThreadingHTTPServer((host, port), Handler)
+    server.daemon_threads = True
+    threading.Thread(target=server.serve_forever, name='metrics-server', daemon=True).start()
+    logger.info(f"Serving metrics on http://{host}:{server.server_address[1]}/metrics")
+    return server
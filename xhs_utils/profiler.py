@@ -0,0 +1,246 @@
+"""Whole-job profiling for crawl runs: a sampling profiler or cProfile"""
+import cProfile
+import io
+import os
+import pstats
+import re
+import sys
+import threading
+import time
+from collections import Counter
+from typing import Dict, List, Optional, Tuple
+
+from loguru import logger
+
+MODES = ('sampling', 'cprofile')
+
+# (file, function) of leaf frames that block on a lock, queue, socket or selector
+IDLE_FRAMES = {
+    ('threading.py', 'wait'),
+    ('threading.py', '_wait_for_tstate_lock'),
+    ('thread.py', '_worker'),
+    ('queue.py', 'get'),
+    ('selectors.py', 'select'),
+    ('socket.py', 'readinto'),
+    ('socket.py', 'accept'),
+    ('ssl.py', 'read'),
+}
+
+_POOL_INDEX = re.compile(r'_\d+$')
+
+
+def _frame_label(frame) -> str:
+    code = frame.f_code
+    return f"{os.path.basename(code.co_filename)}:{code.co_name}:{code.co_firstlineno}"
+
+
+def is_idle(label: str) -> bool:
+    """Whether a ``file:function:line`` leaf frame is waiting rather than working"""
+    return tuple(label.split(':')[:2]) in IDLE_FRAMES
+
+
+def thread_group(name: str) -> str:
+    """Pool workers such as ``ThreadPoolExecutor-0_3`` are reported as their pool"""
+    return _POOL_INDEX.sub('', name)
+
+
+class SamplingProfiler:
+    """
+    Samples the stack of every thread at a fixed interval from a daemon thread
+
+    Overhead grows with the number of threads and the sampling rate rather
+    than with the number of calls, so it can stay on for a whole crawl.
+    Stacks are aggregated as collapsed stacks (``thread;outer;...;inner``),
+    the input format of flamegraph.pl and speedscope.
+    """
+
+    def __init__(self, interval: float = 0.005, max_depth: int = 128):
+        self.interval = interval
+        self.max_depth = max_depth
+        self.stacks: Counter = Counter()
+        self.samples = 0
+        self._stop = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+        self._lock = threading.Lock()
+
+    def start(self) -> None:
+        self._stop.clear()
+        self._thread = threading.Thread(target=self._run, name='sampling-profiler', daemon=True)
+        self._thread.start()
+
+    def stop(self) -> None:
+        self._stop.set()
+        if self._thread is not None:
+            self._thread.join()
+            self._thread = None
+
+    def _run(self) -> None:
+        own = threading.get_ident()
+        while not self._stop.wait(self.interval):
+            names = {t.ident: t.name for t in threading.enumerate()}
+            sampled = []
+            for ident, frame in sys._current_frames().items():
+                if ident == own:
+                    continue
+                labels = []
+                while frame is not None and len(labels) < self.max_depth:
+                    labels.append(_frame_label(frame))
+                    frame = frame.f_back
+                labels.append(names.get(ident, str(ident)))
+                sampled.append(';'.join(reversed(labels)))
+            with self._lock:
+                self.stacks.update(sampled)
+                self.samples += 1
+
+    def collapsed(self) -> str:
+        with self._lock:
+            items = sorted(self.stacks.items())
+        return ''.join(f"{stack} {count}\n" for stack, count in items)
+
+    def threads(self) -> Dict[str, Tuple[int, int]]:
+        """``thread group -> (samples, idle samples)``"""
+        groups: Dict[str, List[int]] = {}
+        with self._lock:
+            items = list(self.stacks.items())
+        for stack, count in items:
+            thread, _, leaf = stack.partition(';')
+            counts = groups.setdefault(thread_group(thread), [0, 0])
+            counts[0] += count
+            if not leaf or is_idle(leaf.rsplit(';', 1)[-1]):
+                counts[1] += count
+        return {group: (samples, idle) for group, (samples, idle) in groups.items()}
+
+    def top(self, n: int = 20) -> List[Tuple[str, str, int, int]]:
+        """
+        ``(thread group, function, self samples, total samples)`` of the ``n``
+        busiest functions, ranked by self samples
+
+        Stacks whose leaf frame is idle (see ``IDLE_FRAMES``) are left out, so
+        pool workers waiting for work do not crowd out the functions doing it.
+        """
+        own: Counter = Counter()
+        total: Counter = Counter()
+        with self._lock:
+            items = list(self.stacks.items())
+        for stack, count in items:
+            thread, *frames = stack.split(';')
+            if not frames or is_idle(frames[-1]):
+                continue
+            group = thread_group(thread)
+            own[group, frames[-1]] += count
+            # recursion must not count a function twice in one stack
+            for label in set(frames):
+                total[group, label] += count
+        return [(group, label, count, total[group, label]) for (group, label), count in own.most_common(n)]
+
+
+class CrawlProfiler:
+    """
+    Profile a whole crawl job and write the results next to ``output``
+
+    ``sampling`` writes ``<output>.collapsed`` and, with ``dump_interval``,
+    rewrites it periodically so long crawls can be inspected while they run.
+    ``cprofile`` profiles the calling thread with cProfile and writes
+    ``<output>.pstats``. Both write a top-N hot function summary to
+    ``<output>.txt`` and log it when the job ends.
+
+    Args:
+        output: Path prefix of the written files
+        mode: ``sampling`` or ``cprofile``
+        interval: Seconds between stack samples
+        top: Functions listed in the summary
+        dump_interval: Seconds between intermediate dumps in sampling mode, 0 disables
+    """
+
+    def __init__(self, output: str = 'profile', mode: str = 'sampling', interval: float = 0.005,
+                 top: int = 25, dump_interval: float = 0.0):
+        if mode not in MODES:
+            raise ValueError(f"mode must be one of {', '.join(MODES)}")
+        self.output = output
+        self.mode = mode
+        self.top_n = top
+        self.dump_interval = dump_interval
+        self.sampler = SamplingProfiler(interval) if mode == 'sampling' else None
+        self.profile = cProfile.Profile() if mode == 'cprofile' else None
+        self.started = 0.0
+        self.elapsed = 0.0
+        self._dumper: Optional[threading.Timer] = None
+        self._dump_lock = threading.Lock()
+
+    def __enter__(self) -> "CrawlProfiler":
+        self.start()
+        return self
+
+    def __exit__(self, *exc) -> None:
+        self.stop()
+
+    def start(self) -> None:
+        directory = os.path.dirname(os.path.abspath(self.output))
+        os.makedirs(directory, exist_ok=True)
+        self.started = time.perf_counter()
+        if self.sampler is not None:
+            self.sampler.start()
+            self._schedule_dump()
+        else:
+            self.profile.enable()
+
+    def _schedule_dump(self) -> None:
+        if self.dump_interval > 0:
+            self._dumper = threading.Timer(self.dump_interval, self._periodic_dump)
+            self._dumper.daemon = True
+            self._dumper.start()
+
+    def _periodic_dump(self) -> None:
+        with self._dump_lock:
+            if self._dumper is None:
+                # stop() already ran and writes the final dump itself
+                return
+            self._write(f"{self.output}.collapsed", self.sampler.collapsed())
+            self._schedule_dump()
+
+    def stop(self) -> Dict[str, str]:
+        """Stop profiling, write the output files and return their paths"""
+        self.elapsed = time.perf_counter() - self.started
+        with self._dump_lock:
+            if self._dumper is not None:
+                self._dumper.cancel()
+                self._dumper = None
+        files = {}
+        if self.sampler is not None:
+            self.sampler.stop()
+            files['collapsed'] = self._write(f"{self.output}.collapsed", self.sampler.collapsed())
+        else:
+            self.profile.disable()
+            files['pstats'] = f"{self.output}.pstats"
+            self.profile.dump_stats(files['pstats'])
+        summary = self.summary()
+        files['summary'] = self._write(f"{self.output}.txt", summary)
+        logger.info(f"Profile written to {', '.join(files.values())}\n{summary}")
+        return files
+
+    def summary(self) -> str:
+        """Hot functions as a share of their own thread group's samples, plus idle time per thread"""
+        if self.sampler is not None:
+            threads = self.sampler.threads()
+            lines = [f"{self.elapsed:.1f}s sampled {self.sampler.samples} times every "
+                     f"{self.sampler.interval * 1000:g} ms",
+                     f"{'samples':>8}{'idle %':>9}  thread"]
+            for group, (samples, idle) in sorted(threads.items(), key=lambda kv: -kv[1][0]):
+                lines.append(f"{samples:>8}{idle / samples:>9.1%}  {group}")
+            lines.append(f"{'self %':>8}{'total %':>9}  thread: function")
+            for group, label, own, total in self.sampler.top(self.top_n):
+                samples = threads[group][0]
+                lines.append(f"{own / samples:>8.1%}{total / samples:>9.1%}  {group}: {label}")
+            return '\n'.join(lines) + '\n'
+        stream = io.StringIO()
+        stats = pstats.Stats(self.profile, stream=stream)
+        stats.sort_stats(pstats.SortKey.CUMULATIVE).print_stats(self.top_n)
+        return f"{self.elapsed:.1f}s profiled with cProfile\n{stream.getvalue()}"
+
+    @staticmethod
+    def _write(path: str, text: str) -> str:
+        tmp = f"{path}.tmp"
+        with open(tmp, 'w', encoding='utf-8') as f:
+            f.write(text)
+        os.replace(tmp, path)
+        return path
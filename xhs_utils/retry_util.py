@@ -1,6 +1,7 @@
 """Retry utilities with exponential backoff and better error handling"""
 import time
 import random
+import threading
 from typing import Callable, Any, Tuple
 from functools import wraps
 from loguru import logger
@@ -101,4 +102,29 @@ def smart_delay(last_request_time: float, min_interval: float = 2.0) -> None:
         if elapsed < min_interval:
             delay = min_interval - elapsed + random.uniform(0.1, 0.5)
             logger.debug(f"Adding delay of {delay:.1f}s to avoid rate limiting")
-            time.sleep(delay)
\ No newline at end of file
+            time.sleep(delay)
+
+class RateLimiter:
+    """
+    Thread-safe limiter spacing calls at least ``60 / rate_per_minute`` seconds apart
+
+    Share one instance between worker threads so concurrent requests still
+    respect a single global request rate.
+    """
+
+    def __init__(self, rate_per_minute: float = 30):
+        self.min_interval = 60.0 / rate_per_minute if rate_per_minute > 0 else 0.0
+        self._lock = threading.Lock()
+        self._next_slot = 0.0
+
+    def acquire(self) -> None:
+        """Block until the caller may send its next request."""
+        if self.min_interval <= 0:
+            return
+        with self._lock:
+            now = time.monotonic()
+            slot = max(self._next_slot, now)
+            self._next_slot = slot + self.min_interval
+        delay = slot - now
+        if delay > 0:
+            time.sleep(delay)
@@ -0,0 +1,145 @@
+"""Push-down filtering of raw search result items before detail requests"""
+import re
+import time
+from datetime import datetime, timedelta
+from typing import Any, Dict, Iterable, List, Optional
+
+from loguru import logger
+
+_COUNT_RE = re.compile(r'^\s*([\d.]+)\s*([万wWkK千]?)\+?\s*$')
+_COUNT_UNITS = {'': 1, '万': 10000, 'w': 10000, 'W': 10000, '千': 1000, 'k': 1000, 'K': 1000}
+
+
+def parse_count(value: Any) -> int:
+    """Convert an interaction count such as ``"1.2万"`` or ``"10w+"`` to an int."""
+    if isinstance(value, bool):
+        return int(value)
+    if isinstance(value, (int, float)):
+        return int(value)
+    if not value:
+        return 0
+    match = _COUNT_RE.match(str(value))
+    if not match:
+        return 0
+    try:
+        return int(float(match.group(1)) * _COUNT_UNITS[match.group(2)])
+    except ValueError:
+        return 0
+
+
+_RELATIVE_RE = re.compile(r'^(\d+)\s*(分钟|小时|天)前')
+_RELATIVE_UNITS = {'分钟': 60, '小时': 3600, '天': 86400}
+_DAY_RE = re.compile(r'^(昨天|今天)\s*(\d{1,2}):(\d{2})')
+
+
+def parse_publish_text(text: str, now: Optional[float] = None) -> Optional[float]:
+    """Convert a search card time label such as ``"3小时前"`` or ``"05-12"`` to epoch seconds."""
+    now = time.time() if now is None else now
+    text = (text or '').strip()
+    if not text:
+        return None
+    if text.startswith('刚刚'):
+        return now
+    match = _RELATIVE_RE.match(text)
+    if match:
+        return now - int(match.group(1)) * _RELATIVE_UNITS[match.group(2)]
+    today = datetime.fromtimestamp(now)
+    match = _DAY_RE.match(text)
+    if match:
+        day = today - timedelta(days=1 if match.group(1) == '昨天' else 0)
+        return day.replace(hour=int(match.group(2)), minute=int(match.group(3)), second=0).timestamp()
+    for fmt, has_year in (('%Y-%m-%d', True), ('%m-%d', False)):
+        try:
+            parsed = datetime.strptime(text.split()[0], fmt)
+        except ValueError:
+            continue
+        if not has_year:
+            parsed = parsed.replace(year=today.year)
+            if parsed > today:
+                parsed = parsed.replace(year=today.year - 1)
+        return parsed.timestamp()
+    return None
+
+
+def item_publish_time(item: Dict[str, Any], now: Optional[float] = None) -> Optional[float]:
+    """Best-effort publish time (epoch seconds) of a search item, None if unknown."""
+    card = item.get('note_card') or {}
+    for key in ('time', 'last_update_time'):
+        if card.get(key):
+            return card[key] / 1000
+    for tag in card.get('corner_tag_info') or []:
+        if tag.get('type') == 'publish_time':
+            return parse_publish_text(tag.get('text', ''), now)
+    return None
+
+
+class SearchItemFilter:
+    """
+    Filter search items on the fields already present in the search response
+
+    Search items carry ``note_card.interact_info``, ``note_card.type`` and
+    ``note_card.user``, so likes, content type, title keywords and author can
+    be checked before any ``get_note_info`` request is made.
+
+    Args:
+        min_likes: Minimum liked_count
+        content_types: Allowed types out of 'image' and 'video', empty for all
+        exclude_keywords: Case-insensitive keywords rejected in the title
+        users: Allowed author user_ids or nicknames, empty for all
+    """
+
+    def __init__(
+        self,
+        min_likes: int = 0,
+        content_types: Optional[List[str]] = None,
+        exclude_keywords: Optional[List[str]] = None,
+        users: Optional[List[str]] = None,
+    ):
+        self.min_likes = min_likes
+        self.content_types = set(content_types or [])
+        self.exclude_keywords = [k.lower() for k in (exclude_keywords or []) if k]
+        self.users = set(users or [])
+        self.stats = {'accepted': 0, 'likes': 0, 'content_type': 0, 'keyword': 0, 'user': 0}
+
+    @classmethod
+    def from_search_config(cls, search_config) -> "SearchItemFilter":
+        """Build a filter from an ``optimizations.config_manager.SearchConfig``."""
+        return cls(
+            min_likes=search_config.min_likes,
+            content_types=search_config.content_types,
+            exclude_keywords=search_config.exclude_keywords,
+            users=search_config.users,
+        )
+
+    def reject_reason(self, item: Dict[str, Any]) -> Optional[str]:
+        """Return why ``item`` is rejected, or None when it passes."""
+        card = item.get('note_card')
+        if not card:
+            # not a note (hot queries, ads); left for the model_type filter
+            return None
+        if self.min_likes and parse_count(card.get('interact_info', {}).get('liked_count')) < self.min_likes:
+            return 'likes'
+        if self.content_types:
+            note_type = 'video' if card.get('type') == 'video' else 'image'
+            if note_type not in self.content_types:
+                return 'content_type'
+        if self.exclude_keywords:
+            title = (card.get('display_title') or card.get('title') or '').lower()
+            if any(keyword in title for keyword in self.exclude_keywords):
+                return 'keyword'
+        if self.users:
+            user = card.get('user', {})
+            if user.get('user_id') not in self.users and user.get('nickname') not in self.users:
+                return 'user'
+        return None
+
+    def accept(self, item: Dict[str, Any]) -> bool:
+        reason = self.reject_reason(item)
+        self.stats[reason or 'accepted'] += 1
+        return reason is None
+
+    def apply(self, items: Iterable[Dict[str, Any]]) -> List[Dict[str, Any]]:
+        """Return the items that pass, updating the per-reason counters."""
+        kept = [item for item in items if self.accept(item)]
+        logger.debug(f'Search pre-filter stats: {self.stats}')
+        return kept
@@ -0,0 +1,196 @@
+"""Lightweight span tracing for crawl stages, exported as JSON lines"""
+import contextvars
+import functools
+import json
+import os
+import threading
+import time
+from typing import Any, Callable, Dict, Optional
+
+from loguru import logger
+
+FORMATS = ('jsonl', 'otlp')
+
+_current_span: contextvars.ContextVar = contextvars.ContextVar('xhs_current_span', default=None)
+
+
+class Span:
+    """One timed stage; entering it makes it the parent of spans opened inside"""
+
+    __slots__ = ('tracer', 'name', 'trace_id', 'span_id', 'parent_id', 'attributes', 'start_ns', 'end_ns',
+                 'error', '_token')
+
+    def __init__(self, tracer: "Tracer", name: str, attributes: Dict[str, Any]):
+        parent = _current_span.get()
+        self.tracer = tracer
+        self.name = name
+        self.trace_id = parent.trace_id if parent is not None else os.urandom(16).hex()
+        self.span_id = os.urandom(8).hex()
+        self.parent_id = parent.span_id if parent is not None else None
+        self.attributes = attributes
+        self.start_ns = 0
+        self.end_ns = 0
+        self.error: Optional[str] = None
+        self._token = None
+
+    def set_attribute(self, key: str, value: Any) -> None:
+        self.attributes[key] = value
+
+    def __enter__(self) -> "Span":
+        self._token = _current_span.set(self)
+        self.start_ns = time.time_ns()
+        return self
+
+    def __exit__(self, exc_type, exc, tb) -> None:
+        self.end_ns = time.time_ns()
+        _current_span.reset(self._token)
+        if exc is not None:
+            self.error = f"{exc_type.__name__}: {exc}"
+        self.tracer.export(self)
+
+    def to_dict(self) -> Dict[str, Any]:
+        return {
+            'name': self.name,
+            'trace_id': self.trace_id,
+            'span_id': self.span_id,
+            'parent_id': self.parent_id,
+            'start_time_unix_nano': self.start_ns,
+            'end_time_unix_nano': self.end_ns,
+            'duration_ms': (self.end_ns - self.start_ns) / 1e6,
+            'attributes': self.attributes,
+            'error': self.error,
+        }
+
+    def to_otlp(self) -> Dict[str, Any]:
+        span = {
+            'traceId': self.trace_id,
+            'spanId': self.span_id,
+            'name': self.name,
+            'kind': 1,
+            'startTimeUnixNano': str(self.start_ns),
+            'endTimeUnixNano': str(self.end_ns),
+            'attributes': [{'key': key, 'value': _otlp_value(value)} for key, value in self.attributes.items()],
+            'status': {'code': 2, 'message': self.error} if self.error else {'code': 1},
+        }
+        if self.parent_id:
+            span['parentSpanId'] = self.parent_id
+        return span
+
+
+class _NoopSpan:
+    """Returned while tracing is off so instrumented code pays for one attribute check"""
+
+    __slots__ = ()
+
+    def set_attribute(self, key: str, value: Any) -> None:
+        pass
+
+    def __enter__(self) -> "_NoopSpan":
+        return self
+
+    def __exit__(self, exc_type, exc, tb) -> None:
+        pass
+
+
+_NOOP_SPAN = _NoopSpan()
+
+
+def _otlp_value(value: Any) -> Dict[str, Any]:
+    if isinstance(value, bool):
+        return {'boolValue': value}
+    if isinstance(value, int):
+        return {'intValue': str(value)}
+    if isinstance(value, float):
+        return {'doubleValue': value}
+    return {'stringValue': str(value)}
+
+
+class Tracer:
+    """
+    Collects finished spans into a JSON lines file
+
+    ``jsonl`` writes one flat span object per line. ``otlp`` writes one
+    OTLP/JSON ``ExportTraceServiceRequest`` per line, the layout of the
+    OpenTelemetry collector file exporter.
+    """
+
+    def __init__(self):
+        self.enabled = False
+        self.format = 'jsonl'
+        self.service_name = 'spider_xhs'
+        self._file = None
+        self._lock = threading.Lock()
+
+    def configure(self, path: str, format: str = 'jsonl', service_name: str = 'spider_xhs') -> None:
+        """Start appending spans to ``path``"""
+        if format not in FORMATS:
+            raise ValueError(f"format must be one of {', '.join(FORMATS)}")
+        self.shutdown()
+        directory = os.path.dirname(os.path.abspath(path))
+        os.makedirs(directory, exist_ok=True)
+        self._file = open(path, 'a', encoding='utf-8')
+        self.format = format
+        self.service_name = service_name
+        self.enabled = True
+        logger.info(f"Writing {format} trace spans to {path}")
+
+    def shutdown(self) -> None:
+        self.enabled = False
+        with self._lock:
+            if self._file is not None:
+                self._file.close()
+                self._file = None
+
+    def export(self, span: Span) -> None:
+        if self.format == 'otlp':
+            record = {'resourceSpans': [{
+                'resource': {'attributes': [{'key': 'service.name', 'value': {'stringValue': self.service_name}}]},
+                'scopeSpans': [{'scope': {'name': __name__}, 'spans': [span.to_otlp()]}],
+            }]}
+        else:
+            record = span.to_dict()
+        line = json.dumps(record, ensure_ascii=False, default=str)
+        with self._lock:
+            if self._file is not None:
+                self._file.write(line + '\n')
+                self._file.flush()
+
+
+tracer = Tracer()
+
+
+def configure_tracing(path: str, format: str = 'jsonl', service_name: str = 'spider_xhs') -> None:
+    tracer.configure(path, format, service_name)
+
+
+def span(name: str, **attributes: Any):
+    """Context manager timing ``name``; a shared no-op while tracing is off"""
+    if not tracer.enabled:
+        return _NOOP_SPAN
+    return Span(tracer, name, attributes)
+
+
+def traced(name: str) -> Callable:
+    """Decorator running the whole function inside ``span(name)``"""
+    def decorator(func: Callable) -> Callable:
+        @functools.wraps(func)
+        def wrapper(*args, **kwargs):
+            if not tracer.enabled:
+                return func(*args, **kwargs)
+            with Span(tracer, name, {}):
+                return func(*args, **kwargs)
+        return wrapper
+    return decorator
+
+
+def propagate(func: Callable) -> Callable:
+    """Bind ``func`` to the current span so pool threads nest their spans under it"""
+    if not tracer.enabled:
+        return func
+    context = contextvars.copy_context()
+
+    @functools.wraps(func)
+    def wrapper(*args, **kwargs):
+        # each call gets its own copy: one Context cannot be entered by two threads at once
+        return context.copy().run(func, *args, **kwargs)
+    return wrapper
@@ -1,8 +1,13 @@
+import hashlib
 import json
 import math
 import random
+import threading
+import time
+from collections import OrderedDict
 import execjs
 from xhs_utils.cookie_util import trans_cookies
+from xhs_utils import tracing
 
 try:
     js = execjs.compile(open(r'../static/xhs_xs_xsc_56.js', 'r', encoding='utf-8').read())
@@ -31,6 +36,73 @@ def generate_xs(a1: str, api: str, data: str | dict | None = '') -> tuple[str, i
     xs, xt = ret['X-s'], ret['X-t']
     return xs, xt
 
+class SignatureCache:
+    """
+    Short-lived memo of x-s/x-t/x-s-common keyed by (a1, api, payload hash).
+
+    An entry expires ``ttl`` seconds after its x-t timestamp, so a cached
+    signature is never reused outside the window it was issued for. Within
+    that window identical requests share one x-s/x-t, which the server may
+    notice, so the cache is off (``ttl=0``) until configured and only ever
+    holds GET signatures: POST bodies carry per-request ids such as
+    ``search_id`` and are always signed afresh.
+    """
+
+    def __init__(self, ttl: float = 0.0, maxsize: int = 256):
+        self.ttl = ttl
+        self.maxsize = maxsize
+        self._data: OrderedDict = OrderedDict()
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+
+    @staticmethod
+    def make_key(a1: str, api: str, data: str | dict | None) -> tuple:
+        if isinstance(data, (dict, list)):
+            data = json.dumps(data, separators=(',', ':'), ensure_ascii=False)
+        digest = hashlib.sha1((data or '').encode('utf-8')).hexdigest()
+        return a1, api, digest
+
+    def _expired(self, xt: int, now: float) -> bool:
+        return now - int(xt) / 1000 >= self.ttl
+
+    def get(self, key: tuple) -> tuple[str, int, str] | None:
+        now = time.time()
+        with self._lock:
+            entry = self._data.get(key)
+            if entry is not None and not self._expired(entry[1], now):
+                self._data.move_to_end(key)
+                self.hits += 1
+                return entry
+            if entry is not None:
+                del self._data[key]
+            self.misses += 1
+            return None
+
+    def set(self, key: tuple, value: tuple[str, int, str]) -> None:
+        if self.ttl <= 0 or self._expired(value[1], time.time()):
+            return
+        with self._lock:
+            self._data[key] = value
+            self._data.move_to_end(key)
+            while len(self._data) > self.maxsize:
+                self._data.popitem(last=False)
+
+    def clear(self) -> None:
+        with self._lock:
+            self._data.clear()
+
+
+signature_cache = SignatureCache()
+
+
+def configure_signature_cache(ttl: float = 30.0, maxsize: int = 256) -> None:
+    """Enable or resize the GET signature cache; ``ttl=0`` disables it."""
+    signature_cache.ttl = ttl
+    signature_cache.maxsize = maxsize
+    signature_cache.clear()
+
+
 def generate_xray_traceid() -> str:
     """Generate the X-Ray trace id using the bundled script."""
     return xray_js.call('traceId')
@@ -78,9 +150,19 @@ def get_request_headers_template():
     }
 
 def generate_headers(a1, api, data=''):
-    xs, xt, xs_common = generate_xs_xs_common(a1, api, data)
-    x_b3_traceid = generate_x_b3_traceid()
-    headers = get_request_headers_template()
+    with tracing.span('sign', api=api.split('?')[0]) as span:
+        # only GET requests (no body) may reuse a signature
+        cacheable = signature_cache.ttl > 0 and not data
+        key = SignatureCache.make_key(a1, api, data) if cacheable else None
+        signature = signature_cache.get(key) if cacheable else None
+        span.set_attribute('cached', signature is not None)
+        if signature is None:
+            signature = generate_xs_xs_common(a1, api, data)
+            if cacheable:
+                signature_cache.set(key, signature)
+        xs, xt, xs_common = signature
+        x_b3_traceid = generate_x_b3_traceid()
+        headers = get_request_headers_template()
     headers['x-s'] = xs
     headers['x-t'] = str(xt)
     headers['x-s-common'] = xs_common